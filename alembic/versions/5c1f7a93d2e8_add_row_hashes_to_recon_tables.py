@@ -0,0 +1,34 @@
+"""add ROW_KEY/ROW_HASH to recon tables for diff imports
+
+Revision ID: 5c1f7a93d2e8
+Revises: 00246fc934bf
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f7a93d2e8'
+down_revision: Union[str, None] = '00246fc934bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add business-key and content hash columns to both recon tables."""
+    op.add_column('ICE_CUBE_RECON_PERS', sa.Column('row_key', sa.BigInteger(), nullable=True))
+    op.add_column('ICE_CUBE_RECON_PERS', sa.Column('row_hash', sa.BigInteger(), nullable=True))
+    op.add_column('ICE_CUBE_RECON_STRS', sa.Column('ROW_KEY', sa.BigInteger(), nullable=True))
+    op.add_column('ICE_CUBE_RECON_STRS', sa.Column('ROW_HASH', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove the hash columns from both recon tables."""
+    op.drop_column('ICE_CUBE_RECON_STRS', 'ROW_HASH')
+    op.drop_column('ICE_CUBE_RECON_STRS', 'ROW_KEY')
+    op.drop_column('ICE_CUBE_RECON_PERS', 'row_hash')
+    op.drop_column('ICE_CUBE_RECON_PERS', 'row_key')
@@ -0,0 +1,33 @@
+"""add ICE_CUBE_STAGING_WATERMARK for incremental staging syncs
+
+Revision ID: 9a4e2b6c8f31
+Revises: 5c1f7a93d2e8
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e2b6c8f31'
+down_revision: Union[str, None] = '5c1f7a93d2e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the per-pay-end-date staging sync watermark table."""
+    op.create_table(
+        'ICE_CUBE_STAGING_WATERMARK',
+        sa.Column('PAY_END_DT', sa.Date(), primary_key=True),
+        sa.Column('ROW_COUNT', sa.Integer(), nullable=True),
+        sa.Column('SYNCED_AT', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Drop the staging sync watermark table."""
+    op.drop_table('ICE_CUBE_STAGING_WATERMARK')
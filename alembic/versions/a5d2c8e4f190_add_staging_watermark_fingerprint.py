@@ -0,0 +1,33 @@
+"""add FINGERPRINT to ICE_CUBE_STAGING_WATERMARK so settled pay end dates are pulled again when PeopleSoft changes
+
+Revision ID: a5d2c8e4f190
+Revises: f2b7d4a9c613
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d2c8e4f190'
+down_revision: Union[str, None] = 'f2b7d4a9c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add the per-date probe fingerprint to the staging watermark.
+
+    Existing rows have no fingerprint, so no pay end date counts as settled
+    until its next sync records one; every date in a window is pulled once more.
+    """
+    op.add_column('ICE_CUBE_STAGING_WATERMARK', sa.Column('FINGERPRINT', sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the watermark fingerprint."""
+    op.drop_column('ICE_CUBE_STAGING_WATERMARK', 'FINGERPRINT')
@@ -0,0 +1,47 @@
+"""add ICE_CUBE_RECON_EXCEPTIONS for server-side reconciliation
+
+Revision ID: b3d8e1f4a702
+Revises: 9a4e2b6c8f31
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8e1f4a702'
+down_revision: Union[str, None] = '9a4e2b6c8f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the reconciliation exceptions table and its period/plan index."""
+    op.create_table(
+        'ICE_CUBE_RECON_EXCEPTIONS',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=False),
+        sa.Column('EMPLID', sa.String(11), nullable=True),
+        sa.Column('REASON_CODE', sa.String(20), nullable=False),
+        sa.Column('ICE_CUBE_AMT', sa.Float(), nullable=True),
+        sa.Column('PS_AMT', sa.Float(), nullable=True),
+        sa.Column('DIFFERENCE', sa.Float(), nullable=True),
+        sa.Column('ICE_CUBE_ROWS', sa.Integer(), nullable=True),
+        sa.Column('PS_ROWS', sa.Integer(), nullable=True),
+        sa.Column('CREATED_AT', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'IX_ICE_CUBE_RECON_EXCEPTIONS_PERIOD_PLAN',
+        'ICE_CUBE_RECON_EXCEPTIONS',
+        ['RECON_PERIOD', 'PENSION_PLAN'],
+    )
+
+
+def downgrade() -> None:
+    """Drop the reconciliation exceptions table."""
+    op.drop_index('IX_ICE_CUBE_RECON_EXCEPTIONS_PERIOD_PLAN', table_name='ICE_CUBE_RECON_EXCEPTIONS')
+    op.drop_table('ICE_CUBE_RECON_EXCEPTIONS')
@@ -0,0 +1,50 @@
+"""add ICE_CUBE_RECON_WATERMARK recording the full reconciliations of each plan and period
+
+Revision ID: b8e4f1a7c352
+Revises: a5d2c8e4f190
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f1a7c352'
+down_revision: Union[str, None] = 'a5d2c8e4f190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Create the reconciliation watermark and mark the periods that already have exception rows.
+
+    A period with exception rows has been reconciled in full before, so its
+    next import stays incremental. Periods without any are rebuilt in full
+    on their next reconciliation, which backfills them.
+    """
+    op.create_table(
+        'ICE_CUBE_RECON_WATERMARK',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=False),
+        sa.Column('RECONCILED_AT', sa.DateTime(), nullable=False),
+    )
+    op.create_index('IX_ICE_CUBE_RECON_WATERMARK_PERIOD_PLAN', 'ICE_CUBE_RECON_WATERMARK', ['RECON_PERIOD', 'PENSION_PLAN'])
+
+    exceptions = sa.table('ICE_CUBE_RECON_EXCEPTIONS', sa.column('RECON_PERIOD'), sa.column('PENSION_PLAN'), sa.column('CREATED_AT'))
+    watermark = sa.table('ICE_CUBE_RECON_WATERMARK', sa.column('RECON_PERIOD'), sa.column('PENSION_PLAN'), sa.column('RECONCILED_AT'))
+    op.execute(watermark.insert().from_select(
+        ['RECON_PERIOD', 'PENSION_PLAN', 'RECONCILED_AT'],
+        sa.select(exceptions.c.RECON_PERIOD, exceptions.c.PENSION_PLAN, sa.func.max(exceptions.c.CREATED_AT))
+        .group_by(exceptions.c.RECON_PERIOD, exceptions.c.PENSION_PLAN),
+    ))
+
+
+def downgrade() -> None:
+    """Drop the reconciliation watermark."""
+    op.drop_index('IX_ICE_CUBE_RECON_WATERMARK_PERIOD_PLAN', table_name='ICE_CUBE_RECON_WATERMARK')
+    op.drop_table('ICE_CUBE_RECON_WATERMARK')
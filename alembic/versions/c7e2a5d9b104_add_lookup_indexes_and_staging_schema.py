@@ -0,0 +1,114 @@
+"""add recon_period/employee indexes and a model-owned ICE_CUBE_PAY_DATA_STAGING schema
+
+Revision ID: c7e2a5d9b104
+Revises: b3d8e1f4a702
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import IceCubeReconPers, IceCubeReconStrs
+from app.slices import apply_to_slices, is_sliced
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a5d9b104'
+down_revision: Union[str, None] = 'b3d8e1f4a702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _slice_index(bind, table: str, columns: list[str]) -> str | None:
+    # Slices keep the index names of the table they were created as (the
+    # original table or a load table), so an index is recognised by its columns
+    wanted = [column.lower() for column in columns]
+    for index in sa.inspect(bind).get_indexes(table):
+        if [column.lower() for column in index["column_names"]] == wanted:
+            return index["name"]
+    return None
+
+
+def _create_recon_index(model, name: str, columns: list[str], include: list[str] | None = None) -> None:
+    # A plan converted to sliced storage has a view under the table's name;
+    # each slice without the index gets one named with the slice's suffix
+    bind = op.get_bind()
+    if not is_sliced(bind, model):
+        op.create_index(name, model.__tablename__, columns, mssql_include=include)
+        return
+
+    def create(table: str, suffix: str) -> None:
+        if _slice_index(bind, table, columns) is None:
+            op.create_index(f"{name}{suffix}", table, columns, mssql_include=include)
+
+    apply_to_slices(bind, model, create)
+
+
+def _drop_recon_index(model, name: str, columns: list[str]) -> None:
+    bind = op.get_bind()
+    if not is_sliced(bind, model):
+        op.drop_index(name, table_name=model.__tablename__)
+        return
+
+    def drop(table: str, suffix: str) -> None:
+        index = _slice_index(bind, table, columns)
+        if index is not None:
+            op.drop_index(index, table_name=table)
+
+    apply_to_slices(bind, model, drop)
+
+
+def upgrade() -> None:
+    """
+    Index the recon tables on (recon_period, empl_id, empl_rcd) and rebuild staging with its index.
+
+    ICE_CUBE_PAY_DATA_STAGING was created by pandas to_sql, with inferred
+    types and no keys. It only holds PeopleSoft data, so it is dropped and
+    recreated from the model, and the sync watermark is cleared so the next
+    sync of each month pulls its window again.
+    """
+    _create_recon_index(
+        IceCubeReconPers,
+        'IX_ICE_CUBE_RECON_PERS_PERIOD_EMPL',
+        ['recon_period', 'empl_id', 'empl_rcd'],
+        ['contribution_amt', 'row_key', 'row_hash'],
+    )
+    _create_recon_index(
+        IceCubeReconStrs,
+        'IX_ICE_CUBE_RECON_STRS_PERIOD_EMPL',
+        ['RECON_PERIOD', 'EMPL_ID', 'EMPL_RCD'],
+        ['CONTRIBUTION_AMT', 'ROW_KEY', 'ROW_HASH'],
+    )
+
+    if sa.inspect(op.get_bind()).has_table('ICE_CUBE_PAY_DATA_STAGING'):
+        op.drop_table('ICE_CUBE_PAY_DATA_STAGING')
+    op.create_table(
+        'ICE_CUBE_PAY_DATA_STAGING',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('EMPLID', sa.String(11), nullable=False),
+        sa.Column('PAY_END_DT', sa.Date(), nullable=False),
+        sa.Column('PAGE_NUM', sa.Integer(), nullable=False),
+        sa.Column('LINE_NUM', sa.Integer(), nullable=False),
+        sa.Column('PAYGROUP', sa.String(10), nullable=False),
+        sa.Column('OFF_CYCLE', sa.String(10), nullable=False),
+        sa.Column('SEPCHK', sa.Integer(), nullable=False),
+        sa.Column('DEDCD', sa.String(10), nullable=True),
+        sa.Column('DED_CLASS', sa.String(10), nullable=True),
+        sa.Column('DED_CUR', sa.Float(), nullable=True),
+    )
+    op.create_index(
+        'IX_ICE_CUBE_PAY_DATA_STAGING_PAY_END_EMPL_DEDCD',
+        'ICE_CUBE_PAY_DATA_STAGING',
+        ['PAY_END_DT', 'EMPLID', 'DEDCD'],
+        mssql_include=['DED_CLASS', 'DED_CUR'],
+    )
+    op.execute('DELETE FROM ICE_CUBE_STAGING_WATERMARK')
+
+
+def downgrade() -> None:
+    """Drop the lookup indexes; the rebuilt staging table is kept, it is compatible with the previous code."""
+    op.drop_index('IX_ICE_CUBE_PAY_DATA_STAGING_PAY_END_EMPL_DEDCD', table_name='ICE_CUBE_PAY_DATA_STAGING')
+    _drop_recon_index(IceCubeReconStrs, 'IX_ICE_CUBE_RECON_STRS_PERIOD_EMPL', ['RECON_PERIOD', 'EMPL_ID', 'EMPL_RCD'])
+    _drop_recon_index(IceCubeReconPers, 'IX_ICE_CUBE_RECON_PERS_PERIOD_EMPL', ['recon_period', 'empl_id', 'empl_rcd'])
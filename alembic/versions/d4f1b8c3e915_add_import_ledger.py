@@ -0,0 +1,55 @@
+"""add ICE_CUBE_IMPORT_LEDGER for content-hash dedup of reuploads
+
+Revision ID: d4f1b8c3e915
+Revises: c7e2a5d9b104
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1b8c3e915'
+down_revision: Union[str, None] = 'c7e2a5d9b104'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the import ledger and its plan/period/status index."""
+    op.create_table(
+        'ICE_CUBE_IMPORT_LEDGER',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('CONTENT_HASH', sa.String(64), nullable=True),
+        sa.Column('SOURCE', sa.String(10), nullable=False),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=False),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('FILENAME', sa.String(1000), nullable=True),
+        sa.Column('SIZE_BYTES', sa.BigInteger(), nullable=True),
+        sa.Column('STATUS', sa.String(10), nullable=False),
+        sa.Column('ROW_COUNT', sa.Integer(), nullable=True),
+        sa.Column('ROWS_INSERTED', sa.Integer(), nullable=True),
+        sa.Column('ROWS_UPDATED', sa.Integer(), nullable=True),
+        sa.Column('ROWS_DELETED', sa.Integer(), nullable=True),
+        sa.Column('SECONDS', sa.Float(), nullable=True),
+        sa.Column('PHASES', sa.Text(), nullable=True),
+        sa.Column('PEAK_RSS_BYTES', sa.BigInteger(), nullable=True),
+        sa.Column('SUMMARY', sa.Text(), nullable=True),
+        sa.Column('ERROR', sa.Text(), nullable=True),
+        sa.Column('DUPLICATE_OF', sa.Integer(), nullable=True),
+        sa.Column('CREATED_AT', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'IX_ICE_CUBE_IMPORT_LEDGER_PLAN_PERIOD',
+        'ICE_CUBE_IMPORT_LEDGER',
+        ['PENSION_PLAN', 'RECON_PERIOD', 'STATUS'],
+    )
+
+
+def downgrade() -> None:
+    """Drop the import ledger."""
+    op.drop_index('IX_ICE_CUBE_IMPORT_LEDGER_PLAN_PERIOD', table_name='ICE_CUBE_IMPORT_LEDGER')
+    op.drop_table('ICE_CUBE_IMPORT_LEDGER')
@@ -0,0 +1,72 @@
+"""add (recon_period, id) indexes for keyset paging of the recon read API
+
+Revision ID: e8a3c6f1d027
+Revises: d4f1b8c3e915
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import IceCubeReconPers, IceCubeReconStrs
+from app.slices import apply_to_slices, is_sliced
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3c6f1d027'
+down_revision: Union[str, None] = 'd4f1b8c3e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _slice_index(bind, table: str, columns: list[str]) -> str | None:
+    # Slices keep the index names of the table they were created as (the
+    # original table or a load table), so an index is recognised by its columns
+    wanted = [column.lower() for column in columns]
+    for index in sa.inspect(bind).get_indexes(table):
+        if [column.lower() for column in index["column_names"]] == wanted:
+            return index["name"]
+    return None
+
+
+def _create_recon_index(model, name: str, columns: list[str], include: list[str] | None = None) -> None:
+    # A plan converted to sliced storage has a view under the table's name;
+    # each slice without the index gets one named with the slice's suffix
+    bind = op.get_bind()
+    if not is_sliced(bind, model):
+        op.create_index(name, model.__tablename__, columns, mssql_include=include)
+        return
+
+    def create(table: str, suffix: str) -> None:
+        if _slice_index(bind, table, columns) is None:
+            op.create_index(f"{name}{suffix}", table, columns, mssql_include=include)
+
+    apply_to_slices(bind, model, create)
+
+
+def _drop_recon_index(model, name: str, columns: list[str]) -> None:
+    bind = op.get_bind()
+    if not is_sliced(bind, model):
+        op.drop_index(name, table_name=model.__tablename__)
+        return
+
+    def drop(table: str, suffix: str) -> None:
+        index = _slice_index(bind, table, columns)
+        if index is not None:
+            op.drop_index(index, table_name=table)
+
+    apply_to_slices(bind, model, drop)
+
+
+def upgrade() -> None:
+    """Index the recon tables on (recon_period, id), so a page of one period is a range seek in id order."""
+    _create_recon_index(IceCubeReconPers, 'IX_ICE_CUBE_RECON_PERS_PERIOD_ID', ['recon_period', 'id'])
+    _create_recon_index(IceCubeReconStrs, 'IX_ICE_CUBE_RECON_STRS_PERIOD_ID', ['RECON_PERIOD', 'ID'])
+
+
+def downgrade() -> None:
+    """Drop the read API indexes."""
+    _drop_recon_index(IceCubeReconStrs, 'IX_ICE_CUBE_RECON_STRS_PERIOD_ID', ['RECON_PERIOD', 'ID'])
+    _drop_recon_index(IceCubeReconPers, 'IX_ICE_CUBE_RECON_PERS_PERIOD_ID', ['recon_period', 'id'])
@@ -0,0 +1,136 @@
+"""add the employee, period and staging rollup tables
+
+Revision ID: f2b7d4a9c613
+Revises: e8a3c6f1d027
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7d4a9c613'
+down_revision: Union[str, None] = 'e8a3c6f1d027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# PeopleSoft deduction codes per plan, as in app.reconcile.PLAN_DEDCDS at this revision
+PLAN_DEDCDS = {
+    "PERS": ["PERPB2", "PERPBD", "PERS", "PERSAJ", "PERSP", "PERSPB"],
+    "STRS": ["STRPB2", "STRPBY", "STRS", "STRSAJ", "STRSPB"],
+}
+
+
+def _recon_table(name: str, upper: bool) -> sa.Table:
+    column_names = ["recon_period", "empl_id", "earnings_code", "contribution_code", "earnings", "contribution_amt"]
+    return sa.table(name, *(sa.column(column.upper() if upper else column) for column in column_names))
+
+
+def _backfill_recon(plan: str, recon: sa.Table) -> None:
+    period, empl_id, earnings_code, contribution_code, earnings, contribution_amt = recon.c
+    employee = sa.table(
+        'ICE_CUBE_ROLLUP_EMPLOYEE', *(sa.column(name) for name in (
+            'PENSION_PLAN', 'RECON_PERIOD', 'EMPL_ID', 'ROW_COUNT', 'EARNINGS', 'CONTRIBUTION_AMT',
+        )),
+    )
+    op.execute(employee.insert().from_select(
+        list(employee.c),
+        sa.select(sa.literal(plan), period, empl_id, sa.func.count(), sa.func.sum(earnings), sa.func.sum(contribution_amt))
+        .group_by(period, empl_id),
+    ))
+    rollup = sa.table(
+        'ICE_CUBE_ROLLUP_PERIOD', *(sa.column(name) for name in (
+            'PENSION_PLAN', 'RECON_PERIOD', 'EARNINGS_CODE', 'CONTRIBUTION_CODE', 'EMPLOYEE_COUNT', 'ROW_COUNT',
+            'EARNINGS', 'CONTRIBUTION_AMT',
+        )),
+    )
+    op.execute(rollup.insert().from_select(
+        list(rollup.c),
+        sa.select(
+            sa.literal(plan), period, earnings_code, contribution_code, sa.func.count(empl_id.distinct()),
+            sa.func.count(), sa.func.sum(earnings), sa.func.sum(contribution_amt),
+        ).group_by(period, earnings_code, contribution_code),
+    ))
+
+
+def _backfill_staging() -> None:
+    staging = sa.table(
+        'ICE_CUBE_PAY_DATA_STAGING', *(sa.column(name) for name in ('EMPLID', 'PAY_END_DT', 'DEDCD', 'DED_CLASS', 'DED_CUR')),
+    )
+    rollup = sa.table(
+        'ICE_CUBE_ROLLUP_STAGING', *(sa.column(name) for name in (
+            'RECON_PERIOD', 'PENSION_PLAN', 'EMPLID', 'DEDCD', 'DED_CLASS', 'ROW_COUNT', 'DED_CUR',
+        )),
+    )
+    emplid, pay_end_dt, dedcd, ded_class, ded_cur = staging.c
+    if op.get_bind().dialect.name == "mssql":
+        period = sa.func.convert(sa.literal_column("CHAR(7)"), pay_end_dt, 120)
+    else:
+        period = sa.func.strftime('%Y-%m', pay_end_dt)
+    plan = sa.case(*((dedcd.in_(dedcds), sa.literal(name)) for name, dedcds in PLAN_DEDCDS.items()), else_=None)
+    op.execute(rollup.insert().from_select(
+        list(rollup.c),
+        sa.select(period, plan, emplid, dedcd, ded_class, sa.func.count(), sa.func.sum(ded_cur))
+        .where(dedcd.is_not(None))
+        .group_by(period, emplid, dedcd, ded_class),
+    ))
+
+
+def upgrade() -> None:
+    """Create the rollup tables and fill them from the recon and staging tables already loaded."""
+    op.create_table(
+        'ICE_CUBE_ROLLUP_EMPLOYEE',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=False),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('EMPL_ID', sa.String(10), nullable=True),
+        sa.Column('ROW_COUNT', sa.Integer(), nullable=False),
+        sa.Column('EARNINGS', sa.Float(), nullable=True),
+        sa.Column('CONTRIBUTION_AMT', sa.Float(), nullable=True),
+    )
+    op.create_index(
+        'IX_ICE_CUBE_ROLLUP_EMPLOYEE_PERIOD_PLAN_EMPL', 'ICE_CUBE_ROLLUP_EMPLOYEE', ['RECON_PERIOD', 'PENSION_PLAN', 'EMPL_ID'],
+    )
+    op.create_table(
+        'ICE_CUBE_ROLLUP_PERIOD',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=False),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('EARNINGS_CODE', sa.String(10), nullable=True),
+        sa.Column('CONTRIBUTION_CODE', sa.Integer(), nullable=True),
+        sa.Column('EMPLOYEE_COUNT', sa.Integer(), nullable=False),
+        sa.Column('ROW_COUNT', sa.Integer(), nullable=False),
+        sa.Column('EARNINGS', sa.Float(), nullable=True),
+        sa.Column('CONTRIBUTION_AMT', sa.Float(), nullable=True),
+    )
+    op.create_index('IX_ICE_CUBE_ROLLUP_PERIOD_PERIOD_PLAN', 'ICE_CUBE_ROLLUP_PERIOD', ['RECON_PERIOD', 'PENSION_PLAN'])
+    op.create_table(
+        'ICE_CUBE_ROLLUP_STAGING',
+        sa.Column('ID', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('RECON_PERIOD', sa.String(7), nullable=False),
+        sa.Column('PENSION_PLAN', sa.String(4), nullable=True),
+        sa.Column('EMPLID', sa.String(11), nullable=False),
+        sa.Column('DEDCD', sa.String(10), nullable=False),
+        sa.Column('DED_CLASS', sa.String(10), nullable=True),
+        sa.Column('ROW_COUNT', sa.Integer(), nullable=False),
+        sa.Column('DED_CUR', sa.Float(), nullable=True),
+    )
+    op.create_index('IX_ICE_CUBE_ROLLUP_STAGING_PERIOD_EMPL', 'ICE_CUBE_ROLLUP_STAGING', ['RECON_PERIOD', 'EMPLID'])
+
+    # Sliced storage keeps the recon tables' names as views, so they read the same
+    _backfill_recon('PERS', _recon_table('ICE_CUBE_RECON_PERS', upper=False))
+    _backfill_recon('STRS', _recon_table('ICE_CUBE_RECON_STRS', upper=True))
+    _backfill_staging()
+
+
+def downgrade() -> None:
+    """Drop the rollup tables."""
+    op.drop_index('IX_ICE_CUBE_ROLLUP_STAGING_PERIOD_EMPL', table_name='ICE_CUBE_ROLLUP_STAGING')
+    op.drop_table('ICE_CUBE_ROLLUP_STAGING')
+    op.drop_index('IX_ICE_CUBE_ROLLUP_PERIOD_PERIOD_PLAN', table_name='ICE_CUBE_ROLLUP_PERIOD')
+    op.drop_table('ICE_CUBE_ROLLUP_PERIOD')
+    op.drop_index('IX_ICE_CUBE_ROLLUP_EMPLOYEE_PERIOD_PLAN_EMPL', table_name='ICE_CUBE_ROLLUP_EMPLOYEE')
+    op.drop_table('ICE_CUBE_ROLLUP_EMPLOYEE')
@@ -0,0 +1,260 @@
+"""
+Parquet archive of normalized Ice Cube import batches.
+
+Every import writes the frames it inserted to one Parquet file per batch in a
+dataset partitioned by plan and recon_period:
+
+    <ARCHIVE_DIR>/pension_plan=STRS/recon_period=2024-04/<batch_id>.parquet
+
+Each chunk becomes a row group, and the file footer records the batch id,
+plan, period and the filename, SHA-256 and size of every source upload. The
+row_key/row_hash columns are not stored, since their random 64-bit values
+barely compress; they are recomputed when a batch is read back. A
+batch only appears under its final name once its import has committed, so
+replaying a listed batch always reloads data that was actually imported.
+
+Archiving needs pyarrow. When it is not installed, or ARCHIVE_DIR is empty,
+BatchArchive does nothing and imports run as before.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from importlib.util import find_spec
+from typing import Iterator
+
+import pandas as pd
+
+from app.config import ARCHIVE_DIR
+from app.transform import COLUMN_SPECS, DTYPE_PLANS, add_row_hashes
+
+# Footer key-value entry holding the batch metadata as JSON
+METADATA_KEY = b"ice_cube_batch"
+
+_BATCH_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+
+def file_checksum(path: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file, read in fixed-size blocks.
+
+    Args:
+        path (str): File to hash.
+        block_size (int): Bytes read per iteration.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while block := handle.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _arrow_schema(frame: pd.DataFrame, pension_plan: str):
+    # Fixed per-plan types, so an all-null chunk does not change the file schema;
+    # dates keep the frame's datetime64 unit and categoricals are stored
+    # dictionary-encoded, so both round-trip unchanged
+    import pyarrow as pa
+
+    types = {
+        "str": pa.string(), "strip": pa.string(), "zfill": pa.string(), "code": pa.string(),
+        "float": pa.float64(), "int": pa.int64(), "flag": pa.bool_(),
+    }
+    fields = []
+    for column, (kind, _) in COLUMN_SPECS[pension_plan].items():
+        dtype = frame[column].dtype
+        if kind == "date":
+            fields.append(pa.field(column, pa.from_numpy_dtype(dtype)))
+        elif isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), types[kind])))
+        else:
+            fields.append(pa.field(column, types[kind]))
+    return pa.schema(fields)
+
+
+class BatchArchive:
+    """
+    Writer for the normalized frames of one import.
+
+    Frames are written to a hidden temporary file as they are inserted.
+    publish() renames it into the dataset once the import has committed;
+    leaving the context without publishing removes it. When archiving is
+    unavailable every method is a no-op.
+    """
+
+    def __init__(self, pension_plan: str, recon_period: str, root: str = ARCHIVE_DIR):
+        self.pension_plan = pension_plan
+        self.recon_period = recon_period
+        self.root = root
+        self.sources = []
+        self._checksums = {}
+        self.batch_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.rows = 0
+        self._writer = None
+        self._published = False
+
+    @property
+    def enabled(self) -> bool:
+        """False when ARCHIVE_DIR is empty or pyarrow is missing, in which case nothing is written."""
+        return bool(self.root) and find_spec("pyarrow") is not None
+
+    @property
+    def path(self) -> str:
+        """Final location of the batch file in the dataset."""
+        return os.path.join(
+            self.root, f"pension_plan={self.pension_plan}", f"recon_period={self.recon_period}", f"{self.batch_id}.parquet",
+        )
+
+    @property
+    def _partial_path(self) -> str:
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, f".{name}.partial")
+
+    def add_source(self, path: str, filename: str, sheet: str | None = None) -> None:
+        """
+        Record an uploaded file in the batch metadata; call before the first write.
+
+        Args:
+            path (str): Spooled copy of the upload.
+            filename (str): Original upload name.
+            sheet (str): Worksheet name when the batch holds one sheet of a workbook.
+        """
+        if not self.enabled:
+            return
+        if path not in self._checksums:
+            self._checksums[path] = file_checksum(path)
+        self.sources.append({
+            "filename": filename, "sheet": sheet, "sha256": self._checksums[path], "size_bytes": os.path.getsize(path),
+        })
+
+    def write(self, frame: pd.DataFrame) -> None:
+        """
+        Append one normalized chunk as a row group.
+
+        Args:
+            frame (pd.DataFrame): Output of transform.normalize_frame.
+        """
+        if not self.enabled or frame.empty:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(frame, self.pension_plan)
+        table = pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False)
+        if self._writer is None:
+            metadata = {
+                "batch_id": self.batch_id,
+                "pension_plan": self.pension_plan,
+                "recon_period": self.recon_period,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "sources": self.sources,
+            }
+            schema = table.schema.with_metadata({**table.schema.metadata, METADATA_KEY: json.dumps(metadata)})
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(self._partial_path, schema, compression="zstd")
+        self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def publish(self) -> dict | None:
+        """
+        Finish the file and move it into the dataset; call after the import commits.
+
+        Returns:
+            dict | None: batch_id, path and rows, or None when nothing was archived.
+        """
+        if self._writer is None:
+            return None
+        self._writer.close()
+        os.replace(self._partial_path, self.path)
+        self._published = True
+        return {"batch_id": self.batch_id, "path": self.path, "rows": self.rows}
+
+    def discard(self) -> None:
+        """Remove the unpublished file of a failed import."""
+        if self._writer is not None and not self._published:
+            self._writer.close()
+            os.remove(self._partial_path)
+        self._writer = None
+
+    def __enter__(self) -> "BatchArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.discard()
+
+
+def _batch_info(path: str) -> dict:
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_metadata(path)
+    info = json.loads(metadata.metadata[METADATA_KEY])
+    return {**info, "rows": metadata.num_rows, "size_bytes": os.path.getsize(path), "path": path}
+
+
+def list_batches(pension_plan: str | None = None, recon_period: str | None = None, root: str = ARCHIVE_DIR) -> list[dict]:
+    """
+    List archived batches from their Parquet footers, newest first.
+
+    Args:
+        pension_plan (str): Only batches of this plan.
+        recon_period (str): Only batches of this 'YYYY-MM' period.
+        root (str): Dataset directory.
+
+    Returns:
+        list[dict]: batch_id, pension_plan, recon_period, created_at, sources,
+        rows, size_bytes and path of each batch.
+    """
+    if not root or find_spec("pyarrow") is None:
+        return []
+    pattern = os.path.join(
+        root, f"pension_plan={glob.escape(pension_plan) if pension_plan else '*'}",
+        f"recon_period={glob.escape(recon_period) if recon_period else '*'}", "*.parquet",
+    )
+    batches = [_batch_info(path) for path in glob.glob(pattern)]
+    return sorted(batches, key=lambda batch: batch["batch_id"], reverse=True)
+
+
+def find_batch(batch_id: str, root: str = ARCHIVE_DIR) -> dict | None:
+    """
+    Look up one archived batch.
+
+    Args:
+        batch_id (str): Id reported by the import that archived it.
+        root (str): Dataset directory.
+
+    Returns:
+        dict | None: Batch details as in list_batches, or None if unknown.
+    """
+    if not _BATCH_ID.match(batch_id) or not root or find_spec("pyarrow") is None:
+        return None
+    paths = glob.glob(os.path.join(root, "pension_plan=*", "recon_period=*", f"{batch_id}.parquet"))
+    return _batch_info(paths[0]) if paths else None
+
+
+def read_batch(path: str) -> Iterator[pd.DataFrame]:
+    """
+    Yield an archived batch as normalized frames, one per row group.
+
+    The pandas metadata stored with each file restores the nullable dtypes
+    normalize_frame produced, the plan's dtype plan is reapplied, and
+    row_key/row_hash are added back, so the frames can go straight to the
+    loader.
+
+    Args:
+        path (str): Batch file from list_batches or find_batch.
+
+    Yields:
+        pd.DataFrame: Consecutive normalized chunks.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    pension_plan = json.loads(parquet.schema_arrow.metadata[METADATA_KEY])["pension_plan"]
+    for index in range(parquet.num_row_groups):
+        frame = parquet.read_row_group(index).to_pandas().astype(DTYPE_PLANS[pension_plan])
+        yield add_row_hashes(frame, pension_plan)
@@ -0,0 +1,98 @@
+"""
+Small in-process caches shared by worker threads.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire ttl seconds after they were stored.
+
+    Each entry can carry a fingerprint from a cheap freshness probe, so a
+    caller can re-run the probe and discard an entry whose source changed
+    before it expired.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, object, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    @property
+    def enabled(self) -> bool:
+        """False when maxsize or ttl is 0, in which case nothing is stored."""
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> tuple[object, object] | None:
+        """
+        Look up an unexpired entry and mark it most recently used.
+
+        Args:
+            key (Hashable): Cache key.
+
+        Returns:
+            tuple | None: (value, fingerprint), or None when missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[1]
+
+    def put(self, key: Hashable, value, fingerprint=None) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Drop an entry the caller found stale through its fingerprint."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stale += 1
+
+    def invalidate(self, match: Callable[[Hashable], bool] | None = None) -> int:
+        """
+        Drop entries whose key satisfies match, or every entry.
+
+        Args:
+            match (Callable): Predicate on the key; None drops everything.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if match is None or match(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        """Entry count, limits and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale": self.stale,
+            }
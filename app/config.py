@@ -6,4 +6,65 @@ import os
 
 load_dotenv()
 
-PASSPHRASE = os.getenv("PASSPHRASE", "default_passphrase")
\ No newline at end of file
+PASSPHRASE = os.getenv("PASSPHRASE", "default_passphrase")
+
+# Rows per executemany batch when bulk-inserting Ice Cube records
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "5000"))
+
+# Rows per DataFrame chunk when streaming CSV uploads
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "50000"))
+
+# Rows per DataFrame chunk when streaming XLSX uploads
+XLSX_CHUNK_SIZE = int(os.getenv("XLSX_CHUNK_SIZE", "50000"))
+
+# XLSX reader engine: "auto" (python-calamine if installed, else openpyxl), "calamine" or "openpyxl"
+XLSX_ENGINE = os.getenv("XLSX_ENGINE", "auto")
+
+# Worker threads running queued imports, and how many finished jobs stay pollable
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "200"))
+
+# Processes parsing and transforming batch uploads in parallel; 0 uses every CPU core
+BATCH_PROCESSES = int(os.getenv("BATCH_PROCESSES", "0"))
+
+# Days after a pay end date before PeopleSoft stops changing it; settled dates are skipped by incremental staging syncs
+STAGING_SETTLE_DAYS = int(os.getenv("STAGING_SETTLE_DAYS", "45"))
+
+# PeopleSoft window cache: seconds an entry stays valid (0 disables) and how many windows are kept
+PS_CACHE_TTL = int(os.getenv("PS_CACHE_TTL", "900"))
+PS_CACHE_SIZE = int(os.getenv("PS_CACHE_SIZE", "12"))
+
+# Reconciliation: largest Ice Cube vs PeopleSoft difference still treated as a match, and the
+# PeopleSoft DED_CLASS values compared against contribution_amt (comma-separated; empty compares every class)
+RECON_TOLERANCE = float(os.getenv("RECON_TOLERANCE", "0.01"))
+RECON_DED_CLASSES = [ded_class.strip() for ded_class in os.getenv("RECON_DED_CLASSES", "").split(",") if ded_class.strip()]
+
+# Recon table storage: "table" (one table per plan, reimports delete the period) or "sliced"
+# (one table per plan and recon_period behind a view, reimports swap the period's table; see app/slices.py).
+# Converting a plan to sliced storage is one-way.
+RECON_STORAGE = os.getenv("RECON_STORAGE", "table").lower()
+
+# Recon read API: rows per page by default and at most
+READ_PAGE_SIZE = int(os.getenv("READ_PAGE_SIZE", "1000"))
+READ_MAX_PAGE_SIZE = int(os.getenv("READ_MAX_PAGE_SIZE", "10000"))
+
+# Rows fetched and encoded per chunk by the streaming export (see app/export.py)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Directory of the Parquet archive of imported batches (see app/archive.py); empty disables archiving
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# Threads running background staging syncs alongside imports
+STAGING_WORKERS = int(os.getenv("STAGING_WORKERS", "2"))
+
+# Connection pool settings per database target ("local" is DATABASE_URL, "ps" is PS_DB_URL)
+POOL_SETTINGS = {
+    target: {
+        "pool_size": int(os.getenv(f"{prefix}_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv(f"{prefix}_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv(f"{prefix}_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv(f"{prefix}_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv(f"{prefix}_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+    for target, prefix in (("local", "DB"), ("ps", "PS_DB"))
+}
@@ -1,32 +1,68 @@
 """
 Database engine and session utilities.
+
+Engines are created once per target ("local" for DATABASE_URL, "ps" for
+PS_DB_URL) and shared process-wide, so every import, staging sync and
+session reuses pooled connections instead of opening new ones.
 """
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
 
+from app.config import POOL_SETTINGS
+
 # Load environment variables from .env file
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(bind=engine)
+# Environment variable holding the URL of each engine target
+ENGINE_URLS = {"local": "DATABASE_URL", "ps": "PS_DB_URL"}
 
-Base = declarative_base()
+# Seconds a SQLite connection waits for the database write lock. SQLite allows a
+# single writer, so a background staging sync waits for a running import's
+# transaction instead of failing after pysqlite's 5 second default.
+SQLITE_BUSY_TIMEOUT = 600
 
-def get_db():
-    """Dependency to get a database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def engine_options(db_url, name="local"):
+    """
+    Dialect-specific and pool create_engine keyword arguments.
+
+    pyodbc targets get fast_executemany so Core executemany batches are sent
+    as a single parameter array instead of one round trip per row. Pool
+    sizing comes from POOL_SETTINGS for the target; in-memory SQLite keeps
+    its single-connection pool, which takes no sizing arguments, and file
+    SQLite databases wait SQLITE_BUSY_TIMEOUT for the write lock.
+
+    Args:
+        db_url (str): Database URL the engine will connect to.
+        name (str): Engine target whose pool settings apply.
+
+    Returns:
+        dict: Extra keyword arguments for create_engine.
+    """
+    options = dict(POOL_SETTINGS.get(name, POOL_SETTINGS["local"]))
+    if db_url and db_url.startswith("mssql+pyodbc"):
+        options["fast_executemany"] = True
+    if db_url and make_url(db_url).get_backend_name() == "sqlite":
+        if make_url(db_url).database in (None, "", ":memory:"):
+            for key in ("pool_size", "max_overflow", "pool_timeout"):
+                options.pop(key)
+        else:
+            options["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT}
+    return options
+
+_engines = {}
+_engines_lock = threading.Lock()
 
 def get_engine(name="local"):
     """
-    Create and return a SQLAlchemy Engine.
+    Return the shared SQLAlchemy Engine for a target, creating it on first use.
 
     Args:
         name (str): 'local' for primary DATABASE_URL or 'ps' for PS_DB_URL.
@@ -34,5 +70,54 @@ def get_engine(name="local"):
     Returns:
         sqlalchemy.Engine: Engine instance for the specified database.
     """
-    db_url = os.getenv("DATABASE_URL") if name == "local" else os.getenv("PS_DB_URL")
-    return create_engine(db_url, fast_executemany=True)
\ No newline at end of file
+    with _engines_lock:
+        if name not in _engines:
+            db_url = os.getenv(ENGINE_URLS.get(name, "PS_DB_URL"))
+            _engines[name] = create_engine(db_url, echo=False, **engine_options(db_url, name))
+        return _engines[name]
+
+def dispose_engines():
+    """Close every pooled connection; called on application shutdown."""
+    with _engines_lock:
+        for db_engine in _engines.values():
+            db_engine.dispose()
+
+def pool_status(name):
+    """
+    Pool checkout statistics for one engine target, with a round-trip check.
+
+    Args:
+        name (str): Engine target, 'local' or 'ps'.
+
+    Returns:
+        dict: Pool class, size, checked in/out and overflow counts, plus
+            whether a SELECT 1 succeeded and how long it took.
+    """
+    pool = get_engine(name).pool
+    status = {"pool": type(pool).__name__}
+    for stat in ("size", "checkedin", "checkedout", "overflow"):
+        if callable(getattr(pool, stat, None)):
+            status[stat] = getattr(pool, stat)()
+    started = time.perf_counter()
+    try:
+        with get_engine(name).connect() as connection:
+            connection.execute(text("SELECT 1"))
+        status["ok"] = True
+    except Exception as exc:
+        status["ok"] = False
+        status["error"] = str(exc)
+    status["ping_seconds"] = round(time.perf_counter() - started, 4)
+    return status
+
+engine = get_engine("local")
+SessionLocal = sessionmaker(bind=engine)
+
+Base = declarative_base()
+
+def get_db():
+    """Dependency to get a database session."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
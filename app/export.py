@@ -0,0 +1,190 @@
+"""
+Streaming bulk export of the recon and staging tables as gzip CSV or Arrow IPC.
+
+Rows are read through a streaming cursor in EXPORT_CHUNK_SIZE batches and
+each batch is encoded and handed to the response before the next one is
+fetched, so an export of any size holds about one chunk in memory. Recon
+tables are filtered by recon_period; the staging table by the pay end dates
+of the same months (see reconcile.recon_window).
+
+Arrow output needs pyarrow; when it is not installed only CSV is offered.
+"""
+import csv
+import io
+import logging
+import time
+import zlib
+from importlib.util import find_spec
+from typing import Iterator
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from sqlalchemy.sql import Select
+
+from app.config import EXPORT_CHUNK_SIZE
+from app.db import get_engine
+from app.models import IceCubePayDataStaging, IceCubeReconPers, IceCubeReconStrs
+from app.reconcile import recon_window
+
+logger = logging.getLogger(__name__)
+
+# Exportable tables by name
+EXPORT_TABLES = {model.__tablename__: model for model in (IceCubeReconPers, IceCubeReconStrs, IceCubePayDataStaging)}
+
+# Response content type and file extension per format
+EXPORT_FORMATS = {
+    "csv": ("application/gzip", "csv.gz"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def export_formats() -> list[str]:
+    """Formats usable here: 'arrow' only when pyarrow is installed."""
+    return [name for name in EXPORT_FORMATS if name != "arrow" or find_spec("pyarrow") is not None]
+
+
+def export_columns(model) -> list[str]:
+    """Exportable attribute names of a model, in table order; the diff-import hashes are left out."""
+    return [attr.key for attr in model.__mapper__.column_attrs if attr.key not in ("row_key", "row_hash")]
+
+
+def export_query(model, start_period: str | None = None, end_period: str | None = None, empl_id: str | None = None, columns: list[str] | None = None) -> Select:
+    """
+    Build the select for an export, in index order.
+
+    Args:
+        model: ORM model from EXPORT_TABLES.
+        start_period (str): First recon_period ('YYYY-MM') to include.
+        end_period (str): Last recon_period to include.
+        empl_id (str): Only rows of this employee.
+        columns (list[str]): Attributes to select, from export_columns; all when None.
+
+    Returns:
+        Select: Query whose result columns are labelled with the attribute names.
+    """
+    query = select(*(getattr(model, column).label(column) for column in columns or export_columns(model)))
+    if model is IceCubePayDataStaging:
+        if start_period:
+            query = query.where(model.pay_end_dt >= recon_window(start_period)[0])
+        if end_period:
+            query = query.where(model.pay_end_dt < recon_window(end_period)[1])
+        if empl_id is not None:
+            query = query.where(model.emplid == empl_id)
+        return query.order_by(model.pay_end_dt, model.emplid, model.dedcd)
+    if start_period:
+        query = query.where(model.recon_period >= start_period)
+    if end_period:
+        query = query.where(model.recon_period <= end_period)
+    if empl_id is not None:
+        query = query.where(model.empl_id == empl_id)
+    return query.order_by(model.recon_period, model.id)
+
+
+def _chunks(query: Select, chunk_size: int) -> Iterator[list]:
+    # stream_results keeps the driver from buffering the whole result
+    with get_engine().connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        yield list(result.keys())
+        for partition in result.partitions():
+            yield partition
+
+
+def _csv_gzip(chunks: Iterator[list]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip header
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(next(chunks))
+    for rows in chunks:
+        # csv writes str() of each value: ISO dates, and Python's shortest float repr
+        writer.writerows(rows)
+        data = compressor.compress(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            yield data
+    yield compressor.compress(buffer.getvalue().encode("utf-8")) + compressor.flush()
+
+
+def _arrow_type(column):
+    import pyarrow as pa
+
+    kind = column.type
+    if isinstance(kind, Boolean):
+        return pa.bool_()
+    if isinstance(kind, Integer):
+        return pa.int64()
+    if isinstance(kind, Float):
+        return pa.float64()
+    if isinstance(kind, DateTime):
+        return pa.timestamp("us")
+    if isinstance(kind, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class _Sink(io.RawIOBase):
+    # Collects what the IPC writer emits, so it can be yielded batch by batch
+    def __init__(self):
+        self.parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _arrow_stream(model, chunks: Iterator[list]) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    names = next(chunks)
+    schema = pa.schema([pa.field(name, _arrow_type(getattr(model, name).property.columns[0])) for name in names])
+    sink = _Sink()
+    # Buffers are zstd-compressed; every Arrow IPC reader decompresses them transparently
+    with pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_export(table: str, export_format: str = "csv", start_period: str | None = None, end_period: str | None = None, empl_id: str | None = None, columns: list[str] | None = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield an export as encoded byte chunks, one per fetched batch of rows.
+
+    The database connection is held while the iterator is consumed and
+    released when it is exhausted or closed, e.g. by a client disconnecting.
+
+    Args:
+        table (str): Table name from EXPORT_TABLES.
+        export_format (str): 'csv' (gzip-compressed) or 'arrow' (IPC stream).
+        start_period (str): First recon_period ('YYYY-MM') to include.
+        end_period (str): Last recon_period to include.
+        empl_id (str): Only rows of this employee.
+        columns (list[str]): Attributes to export; all when None.
+        chunk_size (int): Rows fetched and encoded at a time.
+
+    Yields:
+        bytes: Consecutive pieces of the gzip file or Arrow stream.
+    """
+    model = EXPORT_TABLES[table]
+    started = time.perf_counter()
+    sent = 0
+    chunks = _chunks(export_query(model, start_period, end_period, empl_id, columns), chunk_size)
+    encoded = _arrow_stream(model, chunks) if export_format == "arrow" else _csv_gzip(chunks)
+    try:
+        for data in encoded:
+            sent += len(data)
+            yield data
+    finally:
+        encoded.close()
+        chunks.close()
+        logger.info(
+            "Exported %s %s-%s as %s: %d bytes in %.2fs",
+            table, start_period or "", end_period or "", export_format, sent, time.perf_counter() - started,
+        )
@@ -0,0 +1,138 @@
+"""
+In-process import job queue backed by a local worker pool.
+
+Uploads are handed to submit_job and run on a ThreadPoolExecutor, off the
+event loop. Batch imports additionally fan CPU-bound parsing out to a
+ProcessPoolExecutor shared through process_pool(). Each job tracks its current import phase and row counts so the
+API and the HTMX UI can poll for progress.
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.config import BATCH_PROCESSES, IMPORT_WORKERS, JOB_HISTORY_SIZE
+from app.metrics import QUEUE_WAIT_SECONDS
+
+# Import phases in the order process_ice_cube_chunks reports them
+PHASES = ("parse", "transform", "delete", "insert", "swap", "rollup", "stage", "reconcile")
+
+
+class ImportJob:
+    """
+    Status of one queued import, updated from the worker thread.
+    """
+
+    def __init__(self, description: dict):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.status = "queued"
+        self.phase = None
+        self.counts = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def report(self, phase: str, **counts) -> None:
+        """Record the phase the import has reached and any updated row counts."""
+        with self._lock:
+            self.phase = phase
+            self.counts.update(counts)
+
+    def to_dict(self) -> dict:
+        """Snapshot of the job for the status endpoint."""
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "phase": self.phase,
+                "counts": dict(self.counts),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                **self.description,
+            }
+
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import-job")
+_jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _run(job: ImportJob, target, args, kwargs) -> None:
+    with job._lock:
+        job.status = "running"
+        job.started_at = time.time()
+    QUEUE_WAIT_SECONDS.observe(job.started_at - job.created_at)
+    try:
+        result = target(*args, progress=job.report, **kwargs)
+    except Exception as exc:
+        with job._lock:
+            job.status = "failed"
+            job.error = str(exc.detail if isinstance(exc, HTTPException) else exc)
+            job.finished_at = time.time()
+        return
+    with job._lock:
+        job.status = "succeeded"
+        job.result = result
+        job.finished_at = time.time()
+
+
+def submit_job(target, *args, description: dict | None = None, **kwargs) -> ImportJob:
+    """
+    Queue target(*args, progress=job.report, **kwargs) on the worker pool.
+
+    Args:
+        target: Callable doing the import; must accept a progress keyword.
+        description (dict): Extra fields (file name, plan, month) echoed in the job status.
+
+    Returns:
+        ImportJob: The queued job; poll get_job(job.id) for progress.
+    """
+    job = ImportJob(description or {})
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > JOB_HISTORY_SIZE:
+            _jobs.popitem(last=False)
+    _executor.submit(_run, job, target, args, kwargs)
+    return job
+
+
+def get_job(job_id: str) -> ImportJob | None:
+    """Look up a job by id; finished jobs are kept for the last JOB_HISTORY_SIZE submissions."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared process pool for CPU-bound batch parsing, starting it on first use.
+
+    Returns:
+        ProcessPoolExecutor: Pool with BATCH_PROCESSES workers (every core when 0).
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn, not fork: the server process holds threads and pooled connections
+            _process_pool = ProcessPoolExecutor(max_workers=BATCH_PROCESSES or None, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def shutdown_jobs() -> None:
+    """Stop accepting jobs and wait for running imports to finish."""
+    _executor.shutdown(wait=True, cancel_futures=True)
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
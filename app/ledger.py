@@ -0,0 +1,216 @@
+"""
+Import ledger and content-hash dedup of identical reuploads.
+
+Every import, batch plan and archive replay is recorded in
+ICE_CUBE_IMPORT_LEDGER with its sizes, phase timings, row counts and the
+summary returned to the caller. An import's row is inserted in the
+import's own transaction, just before its commit (see record_commit), with
+status 'committed', and completed once the import finishes. So the ledger
+records every committed import even if completing the row later fails,
+and an import that fails before its commit leaves no 'committed' row
+behind. An upload's content hash is the SHA-256 of
+its plan, recon_period and file bytes, computed while the upload is spooled.
+When it matches the latest committed import of the same plan and period, the
+upload would write exactly the rows already stored, so the upload endpoints
+return that import's summary instead of importing again. Any later import of
+the period supersedes the match, and a failed import leaves the period (and
+the match) untouched.
+
+The id and time of the latest committed import of a period also serve as
+that period's data version, which the read API turns into ETags. Since the
+row commits with the data, every process sees a new version exactly when it
+sees the new rows.
+"""
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import insert, select, update
+
+from app.db import get_engine
+from app.metrics import ImportMetrics, track_import
+from app.models import IceCubeImportLedger
+
+logger = logging.getLogger(__name__)
+
+# Statuses of imports whose rows were committed: 'committed' until the ledger row is completed
+COMMITTED_STATUSES = ("committed", "succeeded")
+
+
+def content_digest(pension_plan: str, recon_period: str):
+    """
+    Start the content hash of an upload; spool_upload feeds it the file bytes.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Period in 'YYYY-MM' format.
+
+    Returns:
+        hashlib._Hash: SHA-256 already fed with the plan and period.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{pension_plan}\n{recon_period}\n".encode())
+    return digest
+
+
+def _write(values: dict, ledger_id: int | None = None) -> None:
+    # Completing the ledger is bookkeeping: a failed write is logged, never raised into the import
+    ledger = IceCubeImportLedger
+    try:
+        with get_engine().begin() as connection:
+            if ledger_id is None:
+                connection.execute(insert(ledger).values(**values))
+            else:
+                connection.execute(update(ledger).where(ledger.id == ledger_id).values(**values))
+    except Exception:
+        logger.exception("Could not record %s import of %s %s in the ledger", values.get("status"), values.get("pension_plan"), values.get("recon_period"))
+
+
+def record_commit(connection, metrics: ImportMetrics | None) -> None:
+    """
+    Insert the import's ledger row in the import's transaction; call just before its commit.
+
+    The row commits or rolls back with the imported rows, and ledger_import
+    completes it when the import finishes. Does nothing for imports not run
+    under ledger_import.
+
+    Args:
+        connection: Connection inside the import's transaction.
+        metrics (ImportMetrics): Import yielded by ledger_import.
+    """
+    if metrics is None or metrics.ledger is None:
+        return
+    result = connection.execute(insert(IceCubeImportLedger).values(**metrics.ledger, status="committed"))
+    metrics.ledger_id = result.inserted_primary_key[0]
+
+
+def find_duplicate(pension_plan: str, recon_period: str, content_hash: str) -> dict | None:
+    """
+    Look up the latest committed import of a plan and period if it had this content hash.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Period in 'YYYY-MM' format.
+        content_hash (str): Hex digest from content_digest.
+
+    Returns:
+        dict | None: ledger_id and the cached summary, or None when the period
+        was last imported from different content (or never), or that import
+        did not finish.
+    """
+    ledger = IceCubeImportLedger
+    with get_engine().connect() as connection:
+        latest = connection.execute(
+            select(ledger.id, ledger.content_hash, ledger.summary)
+            .where(ledger.pension_plan == pension_plan, ledger.recon_period == recon_period, ledger.status.in_(COMMITTED_STATUSES))
+            .order_by(ledger.id.desc())
+            .limit(1)
+        ).first()
+    if latest is None:
+        return None
+    ledger_id, latest_hash, summary = latest
+    if latest_hash != content_hash or summary is None:
+        return None
+    return {"ledger_id": ledger_id, "summary": json.loads(summary)}
+
+
+def import_version(pension_plan: str, recon_period: str | None = None) -> dict | None:
+    """
+    Data version of a period: its latest committed import.
+
+    Read from the ledger on every call, so all processes agree on it; the
+    lookup is a seek on the ledger's plan/period/status index.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Period in 'YYYY-MM' format; None for the latest
+            import of any period of the plan.
+
+    Returns:
+        dict | None: ledger_id and imported_at of that import, or None when
+        the ledger has no committed import of it.
+    """
+    ledger = IceCubeImportLedger
+    query = select(ledger.id, ledger.created_at).where(
+        ledger.pension_plan == pension_plan, ledger.status.in_(COMMITTED_STATUSES),
+    )
+    if recon_period is not None:
+        query = query.where(ledger.recon_period == recon_period)
+    with get_engine().connect() as connection:
+        latest = connection.execute(query.order_by(ledger.id.desc()).limit(1)).first()
+    return None if latest is None else {"ledger_id": latest[0], "imported_at": latest[1]}
+
+
+def cached_import(pension_plan: str, recon_period: str, content_hash: str, filename: str | None = None, size_bytes: int | None = None) -> dict | None:
+    """
+    Short-circuit an upload identical to the period's latest committed import.
+
+    A hit is recorded in the ledger as a 'duplicate' row pointing at the
+    import whose summary was returned.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Period in 'YYYY-MM' format.
+        content_hash (str): Hex digest from content_digest.
+        filename (str): Original upload name.
+        size_bytes (int): Size of the upload.
+
+    Returns:
+        dict | None: The cached summary plus duplicate_of (the ledger id of
+        the original import), or None when the upload must be imported.
+    """
+    started = time.perf_counter()
+    duplicate = find_duplicate(pension_plan, recon_period, content_hash)
+    if duplicate is None:
+        return None
+    _write({
+        "content_hash": content_hash, "source": "upload", "pension_plan": pension_plan, "recon_period": recon_period,
+        "filename": filename, "size_bytes": size_bytes, "status": "duplicate", "duplicate_of": duplicate["ledger_id"],
+        "seconds": round(time.perf_counter() - started, 4),
+    })
+    return {**duplicate["summary"], "duplicate_of": duplicate["ledger_id"]}
+
+
+@contextmanager
+def ledger_import(pension_plan: str, recon_period: str, filename: str | None = None, size_bytes: int | None = None, content_hash: str | None = None, source: str = "upload"):
+    """
+    track_import that also records the import in the ledger when the block exits.
+
+    Set metrics.summary to the import result before leaving the block; a
+    succeeded import's summary is what later duplicates of it return. An
+    import that reached record_commit has its row completed as 'succeeded',
+    since its rows are in place, with any later error recorded alongside;
+    one that failed before its commit gets a new 'failed' row.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Period in 'YYYY-MM' format.
+        filename (str): Original upload name(s).
+        size_bytes (int): Size of the upload(s).
+        content_hash (str): Hex digest from content_digest; None for imports
+            that can't be deduplicated, such as batches and replays.
+        source (str): 'upload', 'batch' or 'replay'.
+    """
+    metrics = None
+    identity = {
+        "content_hash": content_hash, "source": source, "pension_plan": pension_plan, "recon_period": recon_period,
+        "filename": filename, "size_bytes": size_bytes,
+    }
+    try:
+        with track_import(pension_plan, recon_period, filename, size_bytes) as metrics:
+            metrics.ledger = identity
+            yield metrics
+    finally:
+        record = metrics.record if metrics is not None else None
+        if record is not None:
+            succeeded = record["status"] == "succeeded" and metrics.summary is not None
+            _write({
+                **identity, "status": "succeeded" if metrics.ledger_id is not None else record["status"],
+                "row_count": record["rows"], "rows_inserted": record.get("rows_inserted"),
+                "rows_updated": record.get("rows_updated"), "rows_deleted": record.get("rows_deleted"),
+                "seconds": record["seconds"], "phases": json.dumps(record["phases"]),
+                "peak_rss_bytes": record["peak_rss_bytes"], "error": record["error"],
+                "summary": json.dumps(metrics.summary, default=str) if succeeded else None,
+            }, metrics.ledger_id)
@@ -0,0 +1,138 @@
+"""
+Core-level bulk loading of normalized Ice Cube frames.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Table, bindparam, delete, insert, select, update
+from sqlalchemy.engine import Connection
+
+from app.transform import frame_to_records
+
+
+def insert_frame(connection: Connection, model, frame: pd.DataFrame, batch_size: int, table: Table | None = None) -> list[dict]:
+    """
+    Insert a normalized frame into the model's table in executemany batches.
+
+    Rows go straight to insert(Table) through SQLAlchemy Core, so no ORM
+    instances are created; only one batch of parameter dicts is materialized
+    at a time.
+
+    Args:
+        connection (Connection): Connection inside the caller's transaction.
+        model: ORM model class whose table receives the rows.
+        frame (pd.DataFrame): Output of transform.normalize_frame.
+        batch_size (int): Number of rows per executemany batch.
+        table (Table): Table with the model's columns to insert into instead,
+            such as a period slice from slices.create_load_slice.
+
+    Returns:
+        list[dict]: One entry per batch with its row count and elapsed seconds.
+    """
+    statement = insert(model.__table__ if table is None else table)
+    keys = {attr: model.__mapper__.columns[attr].key for attr in frame.columns}
+    frame = frame.rename(columns=keys)
+
+    timings = []
+    for start in range(0, len(frame), batch_size):
+        started = time.perf_counter()
+        batch = frame_to_records(frame.iloc[start:start + batch_size])
+        connection.execute(statement, batch)
+        timings.append({"rows": len(batch), "seconds": round(time.perf_counter() - started, 4)})
+    return timings
+
+
+# Ids per DELETE ... WHERE id IN (...) statement; stays under SQL Server's 2100 parameter limit
+DELETE_BATCH_SIZE = 1000
+
+
+class PeriodDiff:
+    """
+    Apply an import to an existing recon_period as inserts, updates and deletes.
+
+    Incoming rows are matched to stored rows on (row_key, occurrence of that
+    key), so repeated business keys pair up in file order. Matched rows whose
+    row_hash changed are updated in place, unmatched incoming rows are
+    inserted, and stored rows never matched are deleted by finish(). Rows
+    stored before hashes existed have a NULL row_key and are replaced.
+    """
+
+    def __init__(self, connection: Connection, model, recon_period: str, batch_size: int):
+        self.connection = connection
+        self.model = model
+        self.batch_size = batch_size
+        self.table = model.__table__
+        self.pk = model.__mapper__.primary_key[0]
+        self.counts = {"rows_inserted": 0, "rows_updated": 0, "rows_deleted": 0, "rows_unchanged": 0}
+        self.timings = []
+
+        columns = model.__mapper__.columns
+        stored = connection.execute(
+            select(self.pk, columns["row_key"], columns["row_hash"])
+            .where(columns["recon_period"] == recon_period)
+            .order_by(self.pk)
+        ).all()
+        existing = pd.DataFrame(stored, columns=["id", "row_key", "row_hash"])
+        self.stored_ids = existing["id"].to_numpy()
+        existing = existing.dropna(subset=["row_key"]).astype({"row_key": "int64"})
+        existing["seq"] = existing.groupby("row_key").cumcount()
+        self.existing = existing.rename(columns={"row_hash": "stored_hash"})
+        self.matched_ids = []
+        self.seen = pd.Series(dtype="int64")
+
+    def apply(self, frame: pd.DataFrame) -> None:
+        """
+        Diff one normalized chunk against the stored period and write the changes.
+
+        Args:
+            frame (pd.DataFrame): Output of transform.normalize_frame.
+        """
+        keys = frame["row_key"].reset_index(drop=True)
+        offset = keys.map(self.seen).fillna(0).astype("int64")
+        incoming = pd.DataFrame({
+            "row_key": keys,
+            "seq": keys.groupby(keys).cumcount() + offset,
+            "row_hash": frame["row_hash"].to_numpy(),
+        })
+        self.seen = self.seen.add(keys.value_counts(), fill_value=0).astype("int64")
+
+        merged = incoming.merge(self.existing, on=["row_key", "seq"], how="left")
+        new = merged["id"].isna().to_numpy()
+        changed = ~new & (merged["stored_hash"] != merged["row_hash"]).to_numpy()
+        self.matched_ids.append(merged.loc[~new, "id"].to_numpy())
+
+        if new.any():
+            self.timings.extend(insert_frame(self.connection, self.model, frame[new], self.batch_size))
+        if changed.any():
+            self._update(frame[changed], merged.loc[changed, "id"].astype("int64").to_numpy())
+        self.counts["rows_inserted"] += int(new.sum())
+        self.counts["rows_updated"] += int(changed.sum())
+        self.counts["rows_unchanged"] += int((~new & ~changed).sum())
+
+    def _update(self, frame: pd.DataFrame, ids: np.ndarray) -> None:
+        statement = update(self.table).where(self.pk == bindparam("_id"))
+        keys = {attr: self.model.__mapper__.columns[attr].key for attr in frame.columns}
+        frame = frame.rename(columns=keys)
+        for start in range(0, len(frame), self.batch_size):
+            started = time.perf_counter()
+            batch = frame_to_records(frame.iloc[start:start + self.batch_size])
+            for record, row_id in zip(batch, ids[start:start + self.batch_size]):
+                record["_id"] = int(row_id)
+            self.connection.execute(statement, batch)
+            self.timings.append({"rows": len(batch), "seconds": round(time.perf_counter() - started, 4)})
+
+    def finish(self) -> dict:
+        """
+        Delete stored rows that no incoming row matched.
+
+        Returns:
+            dict: rows_inserted, rows_updated, rows_deleted and rows_unchanged counts.
+        """
+        matched = np.concatenate(self.matched_ids) if self.matched_ids else np.array([], dtype="int64")
+        stale = np.setdiff1d(self.stored_ids, matched)
+        for start in range(0, len(stale), DELETE_BATCH_SIZE):
+            batch = [int(row_id) for row_id in stale[start:start + DELETE_BATCH_SIZE]]
+            self.connection.execute(delete(self.table).where(self.pk.in_(batch)))
+        self.counts["rows_deleted"] = len(stale)
+        return self.counts
@@ -1,14 +1,45 @@
 """
 FastAPI application entrypoint and router registration.
 """
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.db import dispose_engines
+from app.jobs import shutdown_jobs
+from app.staging import shutdown_staging
+from app.routes.admin import router as admin_router
+from app.routes.archive import router as archive_router
+from app.routes.export import router as export_router
+from app.routes.health import metrics_router, router as health_router
 from app.routes.recon_import import router
+from app.routes.recon_read import router as recon_read_router
+from app.routes.reconcile import router as reconcile_router
 from app.routes.ui_router import router as ui_router
 
-app = FastAPI(title="Ice Cube Data Import API", version="1.0.0")
+# Per-import JSON log lines from app.metrics are emitted at INFO
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logging.getLogger("app").setLevel(logging.INFO)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: let queued imports and staging syncs finish, then close pooled connections."""
+    yield
+    shutdown_jobs()
+    shutdown_staging()
+    dispose_engines()
+
+app = FastAPI(title="Ice Cube Data Import API", version="1.0.0", lifespan=lifespan)
 
 app.include_router(router, prefix="/api", tags=["ice_cube"])
+app.include_router(reconcile_router, prefix="/api", tags=["ice_cube"])
+app.include_router(recon_read_router, prefix="/api", tags=["ice_cube"])
+app.include_router(archive_router, prefix="/api", tags=["ice_cube"])
+app.include_router(export_router, prefix="/api", tags=["ice_cube"])
+app.include_router(admin_router, prefix="/api", tags=["admin"])
+app.include_router(health_router, prefix="/api", tags=["health"])
+app.include_router(metrics_router, tags=["health"])
 app.include_router(ui_router, tags=["ui"])
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+"""
+In-process import metrics rendered in the Prometheus text exposition format.
+
+Each import is tracked by an ImportMetrics object: the hot path wraps its
+phases in timed(), and finishing the import observes the totals into the
+module-level histograms and writes one structured log line. GET /metrics
+renders every histogram for scraping.
+
+Memory is the process's current resident set, sampled when each phase
+starts and ends. An import reports the highest sample taken while it ran
+and its growth over the sample taken when it started, so a large import does
+not raise the figures of every later one. Imports running at the same time
+share the process, so each one's samples include the others' memory too.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+ROW_BUCKETS = (100, 1000, 10000, 50000, 100000, 250000, 500000, 1000000, 2500000)
+BYTE_BUCKETS = tuple(1 << shift for shift in range(16, 32, 2))    # 64 KiB .. 1 GiB
+MEMORY_BUCKETS = tuple(1 << shift for shift in range(20, 34))     # 1 MiB .. 8 GiB
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels, safe to observe from worker threads.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: tuple, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Add one observation to the series identified by labels."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        """Exposition lines for every series of the histogram."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            for bound, count in zip(self.buckets, counts):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = ",".join(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {counts[-1]}")
+        return lines
+
+
+PHASE_SECONDS = Histogram(
+    "ice_cube_phase_seconds", "Time spent in each import or staging phase.", DURATION_BUCKETS, ("phase",)
+)
+IMPORT_SECONDS = Histogram(
+    "ice_cube_import_seconds", "End-to-end duration of an import.", DURATION_BUCKETS, ("pension_plan", "status")
+)
+IMPORT_ROWS = Histogram("ice_cube_import_rows", "Rows parsed per import.", ROW_BUCKETS, ("pension_plan",))
+IMPORT_BYTES = Histogram("ice_cube_import_bytes", "Uploaded file size per import.", BYTE_BUCKETS, ("pension_plan",))
+IMPORT_RSS_GROWTH = Histogram(
+    "ice_cube_import_rss_growth_bytes", "Highest resident memory sampled during an import, above its starting RSS.",
+    MEMORY_BUCKETS, ("pension_plan",),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "ice_cube_job_queue_seconds", "Time a queued job waited for a free worker.", DURATION_BUCKETS
+)
+
+REGISTRY = (PHASE_SECONDS, IMPORT_SECONDS, IMPORT_ROWS, IMPORT_BYTES, IMPORT_RSS_GROWTH, QUEUE_WAIT_SECONDS)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Process resident memory right now in bytes, or 0 where /proc is unavailable."""
+    try:
+        # Second field of statm is the resident page count
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ImportMetrics:
+    """
+    Phase durations, row counts and memory of one import.
+    """
+
+    def __init__(self, pension_plan: str, recon_period: str, filename: str | None = None, size_bytes: int | None = None):
+        self.pension_plan = pension_plan
+        self.recon_period = recon_period
+        self.filename = filename
+        self.size_bytes = size_bytes
+        self.phases = {}
+        self.phase_peak_rss = {}
+        self.rows = 0
+        self.counts = {}
+        self.started = time.perf_counter()
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        # Result handed back to the caller, and the record logged by finish()
+        self.summary = None
+        self.record = None
+        # Ledger identity of the import and the id of its row (see app.ledger)
+        self.ledger = None
+        self.ledger_id = None
+
+    def sample_rss(self) -> int:
+        """Sample the current RSS into the import's peak and return it."""
+        rss = current_rss_bytes()
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def finish(self, status: str, error: str | None = None) -> dict:
+        """
+        Observe the import into the histograms and log it as one JSON line.
+
+        Args:
+            status (str): 'succeeded' or 'failed'.
+            error (str): Failure message, if any.
+
+        Returns:
+            dict: The logged record.
+        """
+        seconds = time.perf_counter() - self.started
+        self.sample_rss()
+        peak = self.peak_rss
+        IMPORT_SECONDS.observe(seconds, pension_plan=self.pension_plan, status=status)
+        IMPORT_ROWS.observe(self.rows, pension_plan=self.pension_plan)
+        if self.size_bytes is not None:
+            IMPORT_BYTES.observe(self.size_bytes, pension_plan=self.pension_plan)
+        if peak:
+            IMPORT_RSS_GROWTH.observe(peak - self.start_rss, pension_plan=self.pension_plan)
+
+        record = {
+            "event": "ice_cube_import",
+            "status": status,
+            "pension_plan": self.pension_plan,
+            "recon_period": self.recon_period,
+            "filename": self.filename,
+            "bytes": self.size_bytes,
+            "rows": self.rows,
+            **self.counts,
+            "seconds": round(seconds, 4),
+            "phases": {phase: round(elapsed, 4) for phase, elapsed in self.phases.items()},
+            "peak_rss_bytes": peak,
+            "rss_growth_bytes": peak - self.start_rss,
+            "error": error,
+        }
+        logger.info(json.dumps(record, default=str))
+        self.record = record
+        return record
+
+
+@contextmanager
+def timed(phase: str, metrics: ImportMetrics | None = None):
+    """
+    Time a block into the phase histogram and, if given, the import's phase totals.
+
+    Phases entered once per chunk accumulate, so an import reports the
+    total time it spent in each phase. The import's RSS is sampled when the
+    phase starts and ends, and it keeps the highest end-of-phase sample per
+    phase, so the phase that holds the most memory can be found.
+
+    Args:
+        phase (str): Phase name used as the histogram label.
+        metrics (ImportMetrics): Import the time is added to.
+    """
+    if metrics is not None:
+        metrics.sample_rss()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.observe(elapsed, phase=phase)
+        if metrics is not None:
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + elapsed
+            metrics.phase_peak_rss[phase] = max(metrics.phase_peak_rss.get(phase, 0), metrics.sample_rss())
+
+
+@contextmanager
+def track_import(pension_plan: str, recon_period: str, filename: str | None = None, size_bytes: int | None = None):
+    """
+    Yield an ImportMetrics and finish it as succeeded or failed when the block exits.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Recon period in 'YYYY-MM' format.
+        filename (str): Original upload name.
+        size_bytes (int): Size of the uploaded file.
+    """
+    metrics = ImportMetrics(pension_plan, recon_period, filename, size_bytes)
+    try:
+        yield metrics
+    except Exception as exc:
+        metrics.finish("failed", error=str(exc.detail if isinstance(exc, HTTPException) else exc))
+        raise
+    metrics.finish("succeeded")
+
+
+def render_metrics() -> str:
+    """Render every registered histogram in the Prometheus text format."""
+    return "\n".join(line for histogram in REGISTRY for line in histogram.render()) + "\n"
@@ -1,13 +1,24 @@
 """
 SQLAlchemy ORM models defining Ice Cube reconciliation and staging tables.
 """
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, Index, Text
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
 class IceCubeReconPers(Base):
     __tablename__ = 'ICE_CUBE_RECON_PERS'
+    # Imports delete and reconcile by recon_period; INCLUDE covers the reconcile and diff-import reads on SQL Server
+    __table_args__ = (
+        Index(
+            "IX_ICE_CUBE_RECON_PERS_PERIOD_EMPL", "recon_period", "empl_id", "empl_rcd",
+            mssql_include=["contribution_amt", "row_key", "row_hash"],
+        ),
+        # Read API pages through a period in primary key order
+        Index("IX_ICE_CUBE_RECON_PERS_PERIOD_ID", "recon_period", "id"),
+    )
     extend_existing = True  # Allow extending existing table
 
     """
@@ -32,9 +43,18 @@ class IceCubeReconPers(Base):
     retirement_code = Column(String(10))
     check_date = Column(Date)
     recon_period = Column(String(7)) 
+    row_key = Column(BigInteger, nullable=True)   # hash of the business key, for diff imports
+    row_hash = Column(BigInteger, nullable=True)  # hash of the full normalized row
 
 class IceCubeReconStrs(Base):
     __tablename__ = "ICE_CUBE_RECON_STRS"
+    __table_args__ = (
+        Index(
+            "IX_ICE_CUBE_RECON_STRS_PERIOD_EMPL", "RECON_PERIOD", "EMPL_ID", "EMPL_RCD",
+            mssql_include=["CONTRIBUTION_AMT", "ROW_KEY", "ROW_HASH"],
+        ),
+        Index("IX_ICE_CUBE_RECON_STRS_PERIOD_ID", "RECON_PERIOD", "ID"),
+    )
     extend_existing = True
 
     """
@@ -64,23 +84,187 @@ class IceCubeReconStrs(Base):
     verified = Column("VERIFIED", Boolean, nullable=True)
     recon_period = Column("RECON_PERIOD", String(7), nullable=True)
     assign_type = Column("ASSIGN_TYPE", String(10), nullable=True)
+    row_key = Column("ROW_KEY", BigInteger, nullable=True)
+    row_hash = Column("ROW_HASH", BigInteger, nullable=True)
 
 class IceCubePayDataStaging(Base):
     __tablename__ = "ICE_CUBE_PAY_DATA_STAGING"
+    # Syncs and reconciliation filter on the pay end date window, then employee and deduction code
+    __table_args__ = (
+        Index(
+            "IX_ICE_CUBE_PAY_DATA_STAGING_PAY_END_EMPL_DEDCD", "PAY_END_DT", "EMPLID", "DEDCD",
+            mssql_include=["DED_CLASS", "DED_CUR"],
+        ),
+    )
     extend_existing = True
 
     """
-    ORM model for staging payroll data table ICE_CUBE_PAY_DATA_STAGING.
+    ORM model for staging payroll data table ICE_CUBE_PAY_DATA_STAGING: one row per
+    PeopleSoft pay check line and deduction (app.staging.STAGING_KEY). DEDCD,
+    DED_CLASS and DED_CUR are NULL for checks without a matching deduction.
     """
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    emplid = Column(String(10), nullable=True)
-    pay_end_dt = Column(Date, nullable=True)
-    page_num = Column(Integer, nullable=True)
-    line_num = Column(Integer, nullable=True)
-    paygroup = Column(String(10), nullable=True)
-    off_cycle = Column(String(10), nullable=True)
-    sepchk = Column(Integer, nullable=True)
-    dedcd = Column(String(10), nullable=True)
-    ded_class = Column(String(10), nullable=True)
-    ded_cur = Column(Float, nullable=True)
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    emplid = Column("EMPLID", String(11), nullable=False)
+    pay_end_dt = Column("PAY_END_DT", Date, nullable=False)
+    page_num = Column("PAGE_NUM", Integer, nullable=False)
+    line_num = Column("LINE_NUM", Integer, nullable=False)
+    paygroup = Column("PAYGROUP", String(10), nullable=False)
+    off_cycle = Column("OFF_CYCLE", String(10), nullable=False)
+    sepchk = Column("SEPCHK", Integer, nullable=False)
+    dedcd = Column("DEDCD", String(10), nullable=True)
+    ded_class = Column("DED_CLASS", String(10), nullable=True)
+    ded_cur = Column("DED_CUR", Float, nullable=True)
+
+class IceCubeStagingWatermark(Base):
+    __tablename__ = "ICE_CUBE_STAGING_WATERMARK"
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_STAGING_WATERMARK: one row per PeopleSoft pay end date
+    synced into ICE_CUBE_PAY_DATA_STAGING, with its row count, sync time and
+    PeopleSoft fingerprint.
+    """
+
+    pay_end_dt = Column("PAY_END_DT", Date, primary_key=True)
+    row_count = Column("ROW_COUNT", Integer, nullable=True)
+    synced_at = Column("SYNCED_AT", DateTime, nullable=False)
+    # Probe fingerprint of the pay end date when it was synced (see staging.date_fingerprints)
+    fingerprint = Column("FINGERPRINT", String(64), nullable=True)
+
+# Recon table per pension plan
+RECON_MODELS = {"PERS": IceCubeReconPers, "STRS": IceCubeReconStrs}
+
+class IceCubeReconException(Base):
+    __tablename__ = "ICE_CUBE_RECON_EXCEPTIONS"
+    __table_args__ = (Index("IX_ICE_CUBE_RECON_EXCEPTIONS_PERIOD_PLAN", "RECON_PERIOD", "PENSION_PLAN"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_RECON_EXCEPTIONS: one row per employee whose Ice Cube
+    contributions and PeopleSoft deductions disagree for a recon_period, with
+    the reason code. Rebuilt for a plan and period by app.reconcile.
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=False)
+    emplid = Column("EMPLID", String(11), nullable=True)
+    reason_code = Column("REASON_CODE", String(20), nullable=False)
+    ice_cube_amt = Column("ICE_CUBE_AMT", Float, nullable=True)
+    ps_amt = Column("PS_AMT", Float, nullable=True)
+    difference = Column("DIFFERENCE", Float, nullable=True)
+    ice_cube_rows = Column("ICE_CUBE_ROWS", Integer, nullable=True)
+    ps_rows = Column("PS_ROWS", Integer, nullable=True)
+    created_at = Column("CREATED_AT", DateTime, nullable=False, default=datetime.now)
+
+class IceCubeReconWatermark(Base):
+    __tablename__ = "ICE_CUBE_RECON_WATERMARK"
+    __table_args__ = (Index("IX_ICE_CUBE_RECON_WATERMARK_PERIOD_PLAN", "RECON_PERIOD", "PENSION_PLAN"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_RECON_WATERMARK: the last full reconciliation of a
+    plan and recon_period. Until a period has one, app.reconcile rebuilds it
+    in full instead of recomputing only the changed employees.
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=False)
+    reconciled_at = Column("RECONCILED_AT", DateTime, nullable=False, default=datetime.now)
+
+class IceCubeImportLedger(Base):
+    __tablename__ = "ICE_CUBE_IMPORT_LEDGER"
+    # Duplicate checks read the latest committed import of a plan and period
+    __table_args__ = (Index("IX_ICE_CUBE_IMPORT_LEDGER_PLAN_PERIOD", "PENSION_PLAN", "RECON_PERIOD", "STATUS"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_IMPORT_LEDGER: one row per import, batch plan,
+    archive replay or short-circuited duplicate upload, with its content hash,
+    sizes, timings, row counts and the summary returned to the caller.
+    Written by app.ledger.
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    content_hash = Column("CONTENT_HASH", String(64), nullable=True)
+    source = Column("SOURCE", String(10), nullable=False)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=False)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    filename = Column("FILENAME", String(1000), nullable=True)
+    size_bytes = Column("SIZE_BYTES", BigInteger, nullable=True)
+    status = Column("STATUS", String(10), nullable=False)
+    row_count = Column("ROW_COUNT", Integer, nullable=True)
+    rows_inserted = Column("ROWS_INSERTED", Integer, nullable=True)
+    rows_updated = Column("ROWS_UPDATED", Integer, nullable=True)
+    rows_deleted = Column("ROWS_DELETED", Integer, nullable=True)
+    seconds = Column("SECONDS", Float, nullable=True)
+    phases = Column("PHASES", Text, nullable=True)
+    peak_rss_bytes = Column("PEAK_RSS_BYTES", BigInteger, nullable=True)
+    summary = Column("SUMMARY", Text, nullable=True)
+    error = Column("ERROR", Text, nullable=True)
+    duplicate_of = Column("DUPLICATE_OF", Integer, nullable=True)
+    created_at = Column("CREATED_AT", DateTime, nullable=False, default=datetime.now)
+
+class IceCubeRollupEmployee(Base):
+    __tablename__ = "ICE_CUBE_ROLLUP_EMPLOYEE"
+    # Imports replace a plan's period; reports read one period, optionally one employee
+    __table_args__ = (Index("IX_ICE_CUBE_ROLLUP_EMPLOYEE_PERIOD_PLAN_EMPL", "RECON_PERIOD", "PENSION_PLAN", "EMPL_ID"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_ROLLUP_EMPLOYEE: Ice Cube row counts and earnings
+    and contribution totals per plan, recon_period and employee. Replaced for
+    a plan and period by every import (see app.rollups).
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=False)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    empl_id = Column("EMPL_ID", String(10), nullable=True)
+    row_count = Column("ROW_COUNT", Integer, nullable=False)
+    earnings = Column("EARNINGS", Float, nullable=True)
+    contribution_amt = Column("CONTRIBUTION_AMT", Float, nullable=True)
+
+class IceCubeRollupPeriod(Base):
+    __tablename__ = "ICE_CUBE_ROLLUP_PERIOD"
+    __table_args__ = (Index("IX_ICE_CUBE_ROLLUP_PERIOD_PERIOD_PLAN", "RECON_PERIOD", "PENSION_PLAN"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_ROLLUP_PERIOD: Ice Cube totals per plan, recon_period,
+    earnings code and contribution code, with the number of employees.
+    Replaced for a plan and period by every import (see app.rollups).
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=False)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    earnings_code = Column("EARNINGS_CODE", String(10), nullable=True)
+    contribution_code = Column("CONTRIBUTION_CODE", Integer, nullable=True)
+    employee_count = Column("EMPLOYEE_COUNT", Integer, nullable=False)
+    row_count = Column("ROW_COUNT", Integer, nullable=False)
+    earnings = Column("EARNINGS", Float, nullable=True)
+    contribution_amt = Column("CONTRIBUTION_AMT", Float, nullable=True)
+
+class IceCubeRollupStaging(Base):
+    __tablename__ = "ICE_CUBE_ROLLUP_STAGING"
+    __table_args__ = (Index("IX_ICE_CUBE_ROLLUP_STAGING_PERIOD_EMPL", "RECON_PERIOD", "EMPLID"),)
+    extend_existing = True
+
+    """
+    ORM model for ICE_CUBE_ROLLUP_STAGING: staged PeopleSoft DED_CUR totals per
+    recon_period (the month of PAY_END_DT), employee, DEDCD and DED_CLASS,
+    with the plan the DEDCD belongs to (NULL for other codes). Replaced for
+    the months of its window by every staging sync (see app.rollups).
+    """
+
+    id = Column("ID", Integer, primary_key=True, autoincrement=True)
+    recon_period = Column("RECON_PERIOD", String(7), nullable=False)
+    pension_plan = Column("PENSION_PLAN", String(4), nullable=True)
+    emplid = Column("EMPLID", String(11), nullable=False)
+    dedcd = Column("DEDCD", String(10), nullable=False)
+    ded_class = Column("DED_CLASS", String(10), nullable=True)
+    row_count = Column("ROW_COUNT", Integer, nullable=False)
+    ded_cur = Column("DED_CUR", Float, nullable=True)
@@ -0,0 +1,389 @@
+"""
+Readers that turn uploaded Ice Cube exports into DataFrames.
+
+CSV files are parsed with pandas, either buffered or in chunks. XLSX files go
+through a pluggable row-iterator layer: python-calamine when it is installed,
+otherwise openpyxl in read-only streaming mode. Both feed the same chunker,
+so either engine yields the same DataFrames.
+"""
+import io
+import logging
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+from importlib.util import find_spec
+from typing import Iterable, Iterator
+
+import pandas as pd
+from fastapi import UploadFile
+from pandas.io.parsers import TextParser
+
+from app.config import CSV_CHUNK_SIZE, XLSX_CHUNK_SIZE, XLSX_ENGINE
+from app.transform import text_headers
+
+logger = logging.getLogger(__name__)
+
+
+def _csv_dtype(text, pension_plan: str) -> dict:
+    """Read the header row of a CSV text stream, rewind it, and map the plan's text columns to str."""
+    headers = pd.read_csv(text, nrows=0).columns
+    text.seek(0)
+    return {header: str for header in text_headers(headers, pension_plan)}
+
+
+def read_csv_frame(stream, pension_plan: str) -> pd.DataFrame:
+    """
+    Read a whole CSV file into one DataFrame.
+
+    Text columns are read as strings, as in iter_csv_chunks, so a file gives
+    the same values whether it is read buffered or streamed.
+
+    Args:
+        stream: Binary file object positioned at the start of the CSV.
+        pension_plan (str): 'PERS' or 'STRS', used to pick the text columns.
+
+    Returns:
+        pd.DataFrame: The whole file.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        return pd.read_csv(text, dtype=_csv_dtype(text, pension_plan))
+    finally:
+        text.detach()
+
+
+def iter_csv_chunks(stream, pension_plan: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file as DataFrame chunks without buffering the whole payload.
+
+    Text columns are read as strings so their values do not depend on which
+    chunk a row lands in.
+
+    Args:
+        stream: Binary file object positioned at the start of the CSV, e.g. UploadFile.file.
+        pension_plan (str): 'PERS' or 'STRS', used to pick the text columns.
+        chunksize (int): Rows per yielded DataFrame.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the file.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        with pd.read_csv(text, chunksize=chunksize, dtype=_csv_dtype(text, pension_plan)) as reader:
+            yield from reader
+    finally:
+        # Leave the underlying upload spool open for FastAPI to clean up.
+        text.detach()
+
+
+def _openpyxl_rows(stream, sheet: int = 0) -> Iterator[tuple]:
+    """Yield raw cell values of one worksheet using openpyxl's read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[sheet]
+        sheet.reset_dimensions()
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _calamine_rows(stream, sheet: int = 0) -> Iterator[list]:
+    """Yield raw cell values of one worksheet using python-calamine."""
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_filelike(stream)
+    try:
+        yield from workbook.get_sheet_by_index(sheet).iter_rows()
+    finally:
+        workbook.close()
+
+
+# Row iterators by engine name, in order of preference for "auto"
+XLSX_ENGINES = {
+    "calamine": (_calamine_rows, "python_calamine"),
+    "openpyxl": (_openpyxl_rows, "openpyxl"),
+}
+
+
+def available_xlsx_engines() -> list[str]:
+    """
+    List the XLSX engines whose backing package is importable, fastest first.
+
+    Returns:
+        list[str]: Engine names usable with iter_xlsx_chunks.
+    """
+    return [name for name, (_, module) in XLSX_ENGINES.items() if find_spec(module) is not None]
+
+
+def xlsx_sheet_names(stream) -> list[str]:
+    """
+    List the worksheet names of a workbook in tab order.
+
+    Args:
+        stream: Seekable binary file object holding the workbook.
+
+    Returns:
+        list[str]: Sheet names; positions match the sheet argument of iter_xlsx_chunks.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        stream.seek(0)
+
+
+def _excel_value(val):
+    """Convert a raw cell the way pandas' Excel readers do before type inference."""
+    if val is None:
+        return ""
+    if isinstance(val, float) and val.is_integer():
+        return int(val)
+    if isinstance(val, date) and not isinstance(val, datetime):
+        return pd.Timestamp(val)
+    return val
+
+
+def _chunk_rows(rows: Iterable, pension_plan: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Group spreadsheet rows into DataFrames, using the first row as the header.
+
+    Each chunk goes through pandas' TextParser, which is what read_excel uses,
+    so NA strings and numeric inference match a regular read_excel call. Text
+    columns skip inference to keep values stable across chunks. Blank rows
+    become all-NaN rows, except trailing ones, which read_excel drops too.
+    """
+    rows = iter(rows)
+    header = list(next(rows, None) or [])
+    while header and header[-1] in (None, ""):
+        header.pop()
+    if not header:
+        return
+    header = [f"Unnamed: {i}" if col in (None, "") else col for i, col in enumerate(header)]
+    width = len(header)
+    # Code columns keep their raw cells too: a chunk of only "03"-style text
+    # would otherwise be inferred as numbers and lose the padding
+    dtype = {col: object for col in text_headers(header, pension_plan, kinds=("str", "strip", "zfill", "code"))}
+
+    batch = []
+    # Blank rows are kept, as read_excel keeps them, unless nothing follows them
+    blank_rows = 0
+    for row in rows:
+        values = [_excel_value(val) for val in row[:width]]
+        if all(val == "" for val in values):
+            blank_rows += 1
+            continue
+        batch.extend([[""] * width for _ in range(blank_rows)])
+        blank_rows = 0
+        values.extend([""] * (width - len(values)))
+        batch.append(values)
+        if len(batch) >= chunksize:
+            yield TextParser([header] + batch, header=0, dtype=dtype, skip_blank_lines=False).read()
+            batch = []
+    if batch:
+        yield TextParser([header] + batch, header=0, dtype=dtype, skip_blank_lines=False).read()
+
+
+def iter_xlsx_chunks(stream, pension_plan: str, chunksize: int = XLSX_CHUNK_SIZE, engine: str = XLSX_ENGINE, sheet: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Stream one worksheet of an XLSX file as DataFrame chunks.
+
+    With engine="auto" the fastest installed engine is tried first. If it
+    fails before producing any rows, the next engine is tried.
+
+    Args:
+        stream: Seekable binary file object holding the workbook.
+        pension_plan (str): 'PERS' or 'STRS', used to pick the text columns.
+        chunksize (int): Rows per yielded DataFrame.
+        engine (str): 'auto', 'calamine' or 'openpyxl'.
+        sheet (int): Zero-based worksheet position; the first sheet by default.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the worksheet.
+    """
+    engines = available_xlsx_engines() if engine == "auto" else [engine]
+    for position, name in enumerate(engines):
+        read_rows = XLSX_ENGINES[name][0]
+        started = False
+        try:
+            for chunk in _chunk_rows(read_rows(stream, sheet), pension_plan, chunksize):
+                started = True
+                yield chunk
+            return
+        except Exception:
+            if started or position == len(engines) - 1:
+                raise
+            logger.warning("XLSX engine %s failed, falling back to %s", name, engines[position + 1], exc_info=True)
+            stream.seek(0)
+
+
+def _local(tag: str) -> str:
+    # Element name without its namespace, so transitional and strict OOXML both match
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column_position(reference: str) -> int:
+    # "C1" -> 2
+    position = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        position = position * 26 + ord(char.upper()) - 64
+    return position - 1
+
+
+def _xlsx_header_cells(stream, sheet: int = 0) -> list:
+    """
+    Read the first row of one worksheet straight from the XLSX package.
+
+    openpyxl and calamine both load the whole shared-strings table before
+    the first row is available, which takes seconds on a large export. This
+    parses the worksheet XML only up to the end of its first row, and the
+    shared strings only up to the highest index that row uses.
+    """
+    from xml.etree.ElementTree import iterparse
+
+    with zipfile.ZipFile(stream) as package:
+        names = set(package.namelist())
+        relations = {}
+        with package.open("xl/_rels/workbook.xml.rels") as rels:
+            for _, element in iterparse(rels):
+                if _local(element.tag) == "Relationship":
+                    relations[element.get("Id")] = element.get("Target")
+        with package.open("xl/workbook.xml") as workbook:
+            sheets = [
+                next(value for key, value in element.attrib.items() if _local(key) == "id")
+                for _, element in iterparse(workbook) if _local(element.tag) == "sheet"
+            ]
+        target = relations[sheets[sheet]]
+        path = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+        cells = {}
+        with package.open(path) as worksheet:
+            for _, element in iterparse(worksheet):
+                tag = _local(element.tag)
+                if tag == "c":
+                    kind = element.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(node.text or "" for node in element.iter() if _local(node.tag) == "t")
+                    else:
+                        value = next((node.text for node in element if _local(node.tag) == "v"), None)
+                    cells[_column_position(element.get("r", ""))] = (kind, value)
+                elif tag == "row":
+                    if element.get("r", "1") != "1":
+                        cells = {}
+                    break
+
+        indexes = {int(value) for kind, value in cells.values() if kind == "s" and value is not None}
+        strings = []
+        if indexes and "xl/sharedStrings.xml" in names:
+            with package.open("xl/sharedStrings.xml") as shared:
+                for _, element in iterparse(shared):
+                    if _local(element.tag) == "si":
+                        # Plain text is a direct <t>, rich text a run of <r><t>; phonetic <rPh> runs are skipped
+                        texts = [
+                            node for child in element if _local(child.tag) in ("t", "r")
+                            for node in child.iter() if _local(node.tag) == "t"
+                        ]
+                        strings.append("".join(node.text or "" for node in texts))
+                        element.clear()
+                        if len(strings) > max(indexes):
+                            break
+
+    row = [None] * (max(cells) + 1 if cells else 0)
+    for position, (kind, value) in cells.items():
+        row[position] = strings[int(value)] if kind == "s" and value is not None else value
+    return row
+
+
+def read_headers(stream, filename: str, sheet: int = 0) -> list[str]:
+    """
+    Read only the header row of an upload, e.g. to validate it before parsing.
+
+    XLSX headers are read from the worksheet XML without loading the rest of
+    the workbook, so this takes milliseconds even for a large export; a
+    package the direct reader cannot follow falls back to openpyxl.
+
+    Args:
+        stream: Seekable binary file object holding the upload; rewound afterwards.
+        filename (str): Original upload name, used to pick Excel vs CSV.
+        sheet (int): Worksheet position to read from XLSX files.
+
+    Returns:
+        list[str]: Column headers, empty for a blank sheet.
+
+    Raises:
+        zipfile.BadZipFile: If an .xlsx upload is not a workbook at all.
+    """
+    try:
+        if not filename.endswith(".xlsx"):
+            return list(pd.read_csv(stream, nrows=0, encoding="utf-8").columns)
+        try:
+            header = _xlsx_header_cells(stream, sheet)
+        except zipfile.BadZipFile:
+            raise
+        except Exception:
+            logger.warning("Could not read the XLSX header row directly, falling back to openpyxl", exc_info=True)
+            stream.seek(0)
+            rows = _openpyxl_rows(stream, sheet)
+            header = next(rows, None) or ()
+            rows.close()
+        return [str(col) for col in header if col not in (None, "")]
+    finally:
+        stream.seek(0)
+
+
+def open_chunks(stream, filename: str, pension_plan: str, chunked_csv: bool = False, sheet: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Turn an uploaded file into an iterable of DataFrames for process_ice_cube_chunks.
+
+    XLSX files are always streamed through iter_xlsx_chunks. CSV files are
+    parsed in one go unless chunked_csv is set; both CSV modes read text
+    columns as strings, so they give the same values.
+
+    Args:
+        stream: Seekable binary file object holding the upload.
+        filename (str): Original upload name, used to pick Excel vs CSV.
+        pension_plan (str): 'PERS' or 'STRS'.
+        chunked_csv (bool): Read CSV files in chunks instead of all at once.
+        sheet (int): Worksheet position to read from XLSX files.
+
+    Returns:
+        Iterator[pd.DataFrame]: One frame for a whole-file read, several for streamed ones.
+    """
+    if filename.endswith(".xlsx"):
+        return iter_xlsx_chunks(stream, pension_plan, sheet=sheet)
+    if chunked_csv:
+        return iter_csv_chunks(stream, pension_plan)
+    return iter([read_csv_frame(stream, pension_plan)])
+
+
+async def spool_upload(file: UploadFile, block_size: int = 1 << 20, digest=None) -> str:
+    """
+    Copy an UploadFile to a temporary file that outlives the request.
+
+    The copy is done in fixed-size blocks so the payload is never held in
+    memory as a whole. The caller owns the returned path and must remove it.
+
+    Args:
+        file (UploadFile): Excel (.xlsx) or CSV file upload.
+        block_size (int): Bytes read from the upload per iteration.
+        digest: Optional hashlib object updated with every block, so the
+            upload is hashed in the same pass (see ledger.content_digest).
+
+    Returns:
+        str: Path of the temporary copy.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    await file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="ice-cube-", suffix=suffix, delete=False) as spool:
+        while block := await file.read(block_size):
+            spool.write(block)
+            if digest is not None:
+                digest.update(block)
+    return spool.name
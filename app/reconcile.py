@@ -0,0 +1,309 @@
+"""
+Server-side reconciliation of Ice Cube contributions against staged PeopleSoft deductions.
+
+Both sides are aggregated per employee in SQL, compared with one vectorized
+pandas merge, and every discrepancy is written to ICE_CUBE_RECON_EXCEPTIONS
+with a reason code, so reports read the small exceptions set instead of
+joining the full tables themselves. After an upload or a staging sync only
+the employees whose totals changed are recomputed, unless the period was
+never reconciled in full (ICE_CUBE_RECON_WATERMARK), e.g. one imported
+before reconciliation existed; that period is rebuilt in full once.
+"""
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert, select
+
+from app.config import INSERT_BATCH_SIZE, RECON_DED_CLASSES, RECON_TOLERANCE
+from app.db import get_engine
+from app.loader import insert_frame
+from app.models import RECON_MODELS, IceCubePayDataStaging, IceCubeReconException, IceCubeReconWatermark
+
+# PeopleSoft deduction codes belonging to each plan
+PLAN_DEDCDS = {
+    "PERS": ["PERPB2", "PERPBD", "PERS", "PERSAJ", "PERSP", "PERSPB"],
+    "STRS": ["STRPB2", "STRPBY", "STRS", "STRSAJ", "STRSPB"],
+}
+
+# Reason codes written to ICE_CUBE_RECON_EXCEPTIONS.REASON_CODE
+NO_EMPLID = "NO_EMPLID"                      # Ice Cube rows without an employee id
+MISSING_IN_PS = "MISSING_IN_PS"              # contributions with no staged deduction
+MISSING_IN_ICE_CUBE = "MISSING_IN_ICE_CUBE"  # staged deductions with no Ice Cube row
+AMOUNT_MISMATCH = "AMOUNT_MISMATCH"          # both sides present, totals differ
+REASON_CODES = (NO_EMPLID, MISSING_IN_PS, MISSING_IN_ICE_CUBE, AMOUNT_MISMATCH)
+
+# Employee ids per IN (...) list; stays under SQL Server's 2100 parameter limit
+EMPLID_BATCH_SIZE = 1000
+
+
+def recon_window(month: str) -> tuple[date, date]:
+    """
+    Pay end date window compared with a recon_period: the calendar month itself.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format.
+
+    Returns:
+        tuple[date, date]: Inclusive start and exclusive end of the window.
+    """
+    start_window = datetime.strptime(month, "%Y-%m").date()
+    return start_window, start_window + relativedelta(months=1)
+
+
+def _employee_clauses(column, empl_ids: set) -> list:
+    # One IN (...) clause per batch of ids, plus IS NULL when None is among them
+    ids = sorted(empl_id for empl_id in empl_ids if empl_id is not None)
+    clauses = [column.in_(ids[start:start + EMPLID_BATCH_SIZE]) for start in range(0, len(ids), EMPLID_BATCH_SIZE)]
+    if None in empl_ids:
+        clauses.append(column.is_(None))
+    return clauses
+
+
+def _scoped_rows(connection, query, column, empl_ids: set | None) -> list:
+    if empl_ids is None:
+        return connection.execute(query).all()
+    return [row for clause in _employee_clauses(column, empl_ids) for row in connection.execute(query.where(clause)).all()]
+
+
+def ice_cube_totals(connection, pension_plan: str, recon_period: str, empl_ids: set | None = None) -> pd.DataFrame:
+    """
+    Sum contribution_amt per employee for one plan and recon_period.
+
+    Args:
+        connection: Connection to the local database.
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Recon period in 'YYYY-MM' format.
+        empl_ids (set): Employees to include, None standing for rows without
+            an id; None includes everyone.
+
+    Returns:
+        pd.DataFrame: emplid, ice_cube_amt and ice_cube_rows; rows without an
+        employee id are grouped under a NULL emplid.
+    """
+    model = RECON_MODELS[pension_plan]
+    query = (
+        select(model.empl_id, func.sum(model.contribution_amt), func.count())
+        .where(model.recon_period == recon_period)
+        .group_by(model.empl_id)
+    )
+    rows = _scoped_rows(connection, query, model.empl_id, empl_ids)
+    return pd.DataFrame(rows, columns=["emplid", "ice_cube_amt", "ice_cube_rows"]).astype(
+        {"ice_cube_amt": "float64", "ice_cube_rows": "int64"}
+    )
+
+
+def peoplesoft_totals(connection, pension_plan: str, start_window: date, end_window: date, empl_ids: set | None = None) -> pd.DataFrame:
+    """
+    Sum staged DED_CUR per employee for the plan's deduction codes in a pay end date window.
+
+    Only the DED_CLASS values in RECON_DED_CLASSES are summed when it is set.
+
+    Args:
+        connection: Connection to the local database.
+        pension_plan (str): 'PERS' or 'STRS'.
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        empl_ids (set): Employees to include; None includes everyone.
+
+    Returns:
+        pd.DataFrame: emplid, ps_amt and ps_rows.
+    """
+    staging = IceCubePayDataStaging
+    query = (
+        select(staging.emplid, func.sum(staging.ded_cur), func.count())
+        .where(
+            staging.pay_end_dt >= start_window,
+            staging.pay_end_dt < end_window,
+            staging.dedcd.in_(PLAN_DEDCDS[pension_plan]),
+            staging.emplid.is_not(None),
+        )
+        .group_by(staging.emplid)
+    )
+    if RECON_DED_CLASSES:
+        query = query.where(staging.ded_class.in_(RECON_DED_CLASSES))
+    rows = _scoped_rows(connection, query, staging.emplid, None if empl_ids is None else empl_ids - {None})
+    return pd.DataFrame(rows, columns=["emplid", "ps_amt", "ps_rows"]).astype(
+        {"ps_amt": "float64", "ps_rows": "int64"}
+    )
+
+
+def employee_totals(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sum contribution_amt per employee of normalized Ice Cube rows, as ice_cube_totals does in SQL.
+
+    Args:
+        frame (pd.DataFrame): Normalized rows with empl_id and contribution_amt.
+
+    Returns:
+        pd.DataFrame: emplid, ice_cube_amt and ice_cube_rows.
+    """
+    return (
+        frame.groupby("empl_id", dropna=False, sort=False)["contribution_amt"]
+        .agg(ice_cube_amt="sum", ice_cube_rows="size")
+        .rename_axis("emplid")
+        .reset_index()
+    )
+
+
+def changed_employees(before: pd.DataFrame, after: pd.DataFrame) -> set:
+    """
+    Employees whose Ice Cube contribution total or row count differs between two sets of totals.
+
+    Args:
+        before (pd.DataFrame): Stored totals from ice_cube_totals, read before the import.
+        after (pd.DataFrame): Totals of the imported rows from employee_totals.
+
+    Returns:
+        set: Changed employee ids; None stands for the rows without an id.
+    """
+    merged = before.merge(after, on="emplid", how="outer", suffixes=("_before", "_after"))
+    amounts_differ = merged["ice_cube_amt_before"].fillna(0).round(2) != merged["ice_cube_amt_after"].fillna(0).round(2)
+    rows_differ = merged["ice_cube_rows_before"].fillna(0) != merged["ice_cube_rows_after"].fillna(0)
+    return {None if pd.isna(empl_id) else empl_id for empl_id in merged.loc[amounts_differ | rows_differ, "emplid"]}
+
+
+def staging_changes(changed: pd.DataFrame) -> dict[tuple[str, str], set]:
+    """
+    Group the staging rows a sync wrote by the plan and recon_period they reconcile against.
+
+    Args:
+        changed (pd.DataFrame): EMPLID, PAY_END_DT and DEDCD of the rows merge_staging wrote.
+
+    Returns:
+        dict: Employee ids per (pension_plan, recon_period).
+    """
+    plans = {dedcd: plan for plan, dedcds in PLAN_DEDCDS.items() for dedcd in dedcds}
+    changed = changed.assign(
+        plan=changed["DEDCD"].map(plans),
+        period=pd.to_datetime(changed["PAY_END_DT"]).dt.strftime("%Y-%m"),
+    ).dropna(subset=["plan", "EMPLID"])
+    return {key: set(group["EMPLID"]) for key, group in changed.groupby(["plan", "period"])}
+
+
+def find_exceptions(ice_cube: pd.DataFrame, peoplesoft: pd.DataFrame, tolerance: float = RECON_TOLERANCE) -> pd.DataFrame:
+    """
+    Outer-merge the per-employee totals and keep the employees whose totals differ.
+
+    A missing side counts as 0, so an employee with no staged deductions and
+    zero contributions is not a discrepancy.
+
+    Args:
+        ice_cube (pd.DataFrame): Output of ice_cube_totals.
+        peoplesoft (pd.DataFrame): Output of peoplesoft_totals.
+        tolerance (float): Largest absolute difference still treated as a match.
+
+    Returns:
+        pd.DataFrame: emplid, reason_code, ice_cube_amt, ps_amt, difference,
+        ice_cube_rows and ps_rows for every discrepancy.
+    """
+    unassigned = ice_cube["emplid"].isna()
+    merged = pd.concat([
+        ice_cube[~unassigned].merge(peoplesoft, on="emplid", how="outer"),
+        ice_cube[unassigned],
+    ], ignore_index=True)
+    difference = (merged["ice_cube_amt"].fillna(0) - merged["ps_amt"].fillna(0)).round(2)
+    merged["difference"] = difference
+    merged["reason_code"] = np.select(
+        [merged["emplid"].isna(), merged["ps_rows"].isna(), merged["ice_cube_rows"].isna()],
+        [NO_EMPLID, MISSING_IN_PS, MISSING_IN_ICE_CUBE],
+        default=AMOUNT_MISMATCH,
+    )
+    exceptions = merged[difference.abs() > tolerance]
+    return exceptions[["emplid", "reason_code", "ice_cube_amt", "ps_amt", "difference", "ice_cube_rows", "ps_rows"]].astype(
+        {"ice_cube_rows": "Int64", "ps_rows": "Int64"}
+    )
+
+
+# Serializes reconciliations of the same plan and recon_period
+_reconcile_locks = {}
+_reconcile_locks_guard = threading.Lock()
+
+def _reconcile_lock(pension_plan: str, recon_period: str) -> threading.Lock:
+    with _reconcile_locks_guard:
+        return _reconcile_locks.setdefault((pension_plan, recon_period), threading.Lock())
+
+
+def period_reconciled(connection, pension_plan: str, recon_period: str) -> bool:
+    """Whether the plan and recon_period were ever reconciled in full."""
+    watermark = IceCubeReconWatermark
+    query = select(watermark.id).where(watermark.recon_period == recon_period, watermark.pension_plan == pension_plan).limit(1)
+    return connection.execute(query).first() is not None
+
+
+def reconcile_period(pension_plan: str, recon_period: str, empl_ids: set | None = None) -> dict:
+    """
+    Rebuild the ICE_CUBE_RECON_EXCEPTIONS rows of one plan and recon_period.
+
+    With empl_ids, only those employees are recomputed and their exception
+    rows replaced; everyone else's rows are kept. A period that was never
+    reconciled in full is recomputed in full instead, which backfills
+    periods imported before reconciliation existed; every full run is
+    recorded in ICE_CUBE_RECON_WATERMARK. Both aggregates are read
+    and the old exceptions replaced in a single transaction, so readers
+    never see a half-written set.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Recon period in 'YYYY-MM' format.
+        empl_ids (set): Employees to recompute, None standing for rows
+            without an id; None recomputes the whole period.
+
+    Returns:
+        dict: Scope ('period' or 'employees'), employees compared, exceptions
+        written and their count per reason code.
+    """
+    start_window, end_window = recon_window(recon_period)
+    table = IceCubeReconException.__table__
+    with _reconcile_lock(pension_plan, recon_period), get_engine().begin() as connection:
+        if empl_ids is not None and not period_reconciled(connection, pension_plan, recon_period):
+            empl_ids = None
+        ice_cube = ice_cube_totals(connection, pension_plan, recon_period, empl_ids)
+        peoplesoft = peoplesoft_totals(connection, pension_plan, start_window, end_window, empl_ids)
+        exceptions = find_exceptions(ice_cube, peoplesoft)
+
+        replaced = delete(table).where(table.c.RECON_PERIOD == recon_period, table.c.PENSION_PLAN == pension_plan)
+        for clause in [None] if empl_ids is None else _employee_clauses(table.c.EMPLID, empl_ids):
+            connection.execute(replaced if clause is None else replaced.where(clause))
+        frame = exceptions.assign(recon_period=recon_period, pension_plan=pension_plan)
+        insert_frame(connection, IceCubeReconException, frame, INSERT_BATCH_SIZE)
+        if empl_ids is None:
+            watermark = IceCubeReconWatermark
+            connection.execute(
+                delete(watermark).where(watermark.recon_period == recon_period, watermark.pension_plan == pension_plan)
+            )
+            connection.execute(insert(watermark).values(recon_period=recon_period, pension_plan=pension_plan, reconciled_at=datetime.now()))
+
+    by_reason = exceptions["reason_code"].value_counts()
+    return {
+        "scope": "period" if empl_ids is None else "employees",
+        "employees_compared": len(set(ice_cube["emplid"].dropna()) | set(peoplesoft["emplid"])),
+        "exceptions": len(exceptions),
+        "by_reason": {reason: int(by_reason.get(reason, 0)) for reason in REASON_CODES},
+    }
+
+
+def period_imported(pension_plan: str, recon_period: str) -> bool:
+    """Whether the plan's recon table holds any rows for recon_period."""
+    model = RECON_MODELS[pension_plan]
+    with get_engine().connect() as connection:
+        return connection.execute(select(model.id).where(model.recon_period == recon_period).limit(1)).first() is not None
+
+
+def reconcile_changes(changes: dict[tuple[str, str], set]) -> dict:
+    """
+    Recompute the employees a staging sync changed, in every imported plan and period they affect.
+
+    Args:
+        changes (dict): Output of staging_changes.
+
+    Returns:
+        dict: reconcile_period result per 'PLAN YYYY-MM'.
+    """
+    return {
+        f"{pension_plan} {recon_period}": reconcile_period(pension_plan, recon_period, empl_ids)
+        for (pension_plan, recon_period), empl_ids in sorted(changes.items())
+        if period_imported(pension_plan, recon_period)
+    }
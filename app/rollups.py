@@ -0,0 +1,156 @@
+"""
+Pre-aggregated rollups of the recon and staging tables for reporting.
+
+ICE_CUBE_ROLLUP_EMPLOYEE holds Ice Cube row counts and earnings and
+contribution totals per plan, recon_period and employee;
+ICE_CUBE_ROLLUP_PERIOD the same per plan, period, earnings code and
+contribution code, with the number of employees. Imports build both from the
+normalized chunks with pandas group-bys as the chunks stream through, and
+replace the plan's period in the import's own transaction, so the rollups
+change exactly when the rows they summarize do.
+
+ICE_CUBE_ROLLUP_STAGING holds the staged DED_CUR totals per month, employee,
+DEDCD and DED_CLASS. A staging sync pulls only the pay end dates that are
+not settled, so each month of its window is re-aggregated from the staging
+table itself, with one grouped INSERT ... SELECT inside the merge transaction.
+"""
+from datetime import date
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import case, delete, func, insert, literal, select
+
+from app.config import INSERT_BATCH_SIZE
+from app.loader import insert_frame
+from app.models import IceCubePayDataStaging, IceCubeRollupEmployee, IceCubeRollupPeriod, IceCubeRollupStaging
+from app.reconcile import PLAN_DEDCDS
+
+# Grain the chunks are reduced to, and the columns summed
+ROLLUP_KEYS = ["empl_id", "earnings_code", "contribution_code"]
+ROLLUP_SUMS = ["earnings", "contribution_amt"]
+
+
+class ImportRollup:
+    """
+    Employee and period rollups of one import, accumulated chunk by chunk.
+
+    add() reduces each normalized chunk to its totals per employee and
+    codes, which are small next to the chunk; replace() combines them into
+    both rollups and swaps the plan's period in the rollup tables.
+    """
+
+    def __init__(self, pension_plan: str, recon_period: str):
+        self.pension_plan = pension_plan
+        self.recon_period = recon_period
+        self._partials = []
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """
+        Add the group totals of one chunk.
+
+        Args:
+            frame (pd.DataFrame): Output of transform.normalize_frame.
+        """
+        if frame.empty:
+            return
+        # Codes are categorical in the dtype plan; plain values let chunks with different categories combine
+        keys = frame[ROLLUP_KEYS].astype(object)
+        grouped = frame[ROLLUP_SUMS].groupby([keys[key] for key in ROLLUP_KEYS], dropna=False, sort=False)
+        partial = grouped.sum(min_count=1)
+        partial["row_count"] = grouped.size()
+        self._partials.append(partial.reset_index())
+
+    def totals(self, keys: list[str]) -> pd.DataFrame:
+        """
+        Combine the chunks into totals per some of ROLLUP_KEYS.
+
+        Args:
+            keys (list[str]): Columns to group by.
+
+        Returns:
+            pd.DataFrame: keys, employee_count (distinct employee ids), row_count
+            and ROLLUP_SUMS; sums are NaN where every row of a group was empty.
+        """
+        if not self._partials:
+            return pd.DataFrame(columns=keys + ["employee_count", "row_count"] + ROLLUP_SUMS)
+        grouped = pd.concat(self._partials, ignore_index=True).groupby(keys, dropna=False, sort=False)
+        totals = grouped[ROLLUP_SUMS].sum(min_count=1)
+        totals.insert(0, "row_count", grouped["row_count"].sum())
+        totals.insert(0, "employee_count", grouped["empl_id"].nunique())
+        return totals.reset_index()
+
+    def replace(self, connection, batch_size: int = INSERT_BATCH_SIZE) -> dict:
+        """
+        Replace the plan's period in both rollup tables; call inside the import's transaction.
+
+        Args:
+            connection: Connection inside the import's transaction.
+            batch_size (int): Rows per executemany insert batch.
+
+        Returns:
+            dict: employee_rows and period_rows written.
+        """
+        employees = self.totals(["empl_id"]).drop(columns="employee_count")
+        periods = self.totals(["earnings_code", "contribution_code"])
+        written = {}
+        for model, frame, name in ((IceCubeRollupEmployee, employees, "employee_rows"), (IceCubeRollupPeriod, periods, "period_rows")):
+            connection.execute(
+                delete(model).where(model.recon_period == self.recon_period, model.pension_plan == self.pension_plan)
+            )
+            frame = frame.assign(pension_plan=self.pension_plan, recon_period=self.recon_period)
+            insert_frame(connection, model, frame, batch_size)
+            written[name] = len(frame)
+        return written
+
+
+def staging_rollup_query(recon_period: str, start: date, end: date):
+    """
+    Select the staging rollup rows of one month.
+
+    Args:
+        recon_period (str): 'YYYY-MM' written to RECON_PERIOD.
+        start (date): First pay end date of the month.
+        end (date): First pay end date after it.
+
+    Returns:
+        Select: Columns in IceCubeRollupStaging insert order.
+    """
+    staging = IceCubePayDataStaging
+    plan = case(
+        *((staging.dedcd.in_(dedcds), literal(plan)) for plan, dedcds in PLAN_DEDCDS.items()),
+        else_=None,
+    )
+    return (
+        select(
+            literal(recon_period), plan, staging.emplid, staging.dedcd, staging.ded_class,
+            func.count(), func.sum(staging.ded_cur),
+        )
+        .where(staging.pay_end_dt >= start, staging.pay_end_dt < end, staging.dedcd.is_not(None))
+        .group_by(staging.emplid, staging.dedcd, staging.ded_class)
+    )
+
+
+def refresh_staging_rollup(connection, start_window: date, end_window: date) -> int:
+    """
+    Rebuild the staging rollup for every month of a sync window; call inside the merge transaction.
+
+    Args:
+        connection: Connection inside the staging merge transaction.
+        start_window (date): Inclusive window start, the first of a month.
+        end_window (date): Exclusive window end, the first of a month.
+
+    Returns:
+        int: Rollup rows written.
+    """
+    rollup = IceCubeRollupStaging
+    columns = [rollup.recon_period, rollup.pension_plan, rollup.emplid, rollup.dedcd, rollup.ded_class, rollup.row_count, rollup.ded_cur]
+    written = 0
+    month = start_window
+    while month < end_window:
+        following = month + relativedelta(months=1)
+        recon_period = month.strftime("%Y-%m")
+        connection.execute(delete(rollup).where(rollup.recon_period == recon_period))
+        result = connection.execute(insert(rollup).from_select(columns, staging_rollup_query(recon_period, month, following)))
+        written += max(result.rowcount, 0)
+        month = following
+    return written
@@ -0,0 +1,47 @@
+"""
+Admin routes for the PeopleSoft window cache.
+"""
+from fastapi import APIRouter, Form, Header, HTTPException
+
+from app.config import PASSPHRASE
+from app.staging import invalidate_peoplesoft_cache, ps_window_cache
+
+router = APIRouter()
+
+@router.get("/admin/ps-cache")
+async def ps_cache_stats(x_passphrase: str | None = Header(None)):
+    """
+    Report the PeopleSoft window cache size, limits and hit/miss counters.
+
+    Args:
+        x_passphrase (str): Secret passphrase, sent as the X-Passphrase header.
+
+    Returns:
+        dict: TTLCache.stats() of the window cache.
+
+    Raises:
+        HTTPException: If the passphrase is invalid.
+    """
+    if x_passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    return ps_window_cache.stats()
+
+@router.post("/admin/ps-cache/invalidate")
+async def invalidate_ps_cache(passphrase: str = Form(...), month: str | None = Form(None)):
+    """
+    Drop cached PeopleSoft windows so the next staging sync re-runs the full query.
+
+    Args:
+        passphrase (str): Secret passphrase to authorize the request.
+        month (str): Optional recon period in 'YYYY-MM' format; only its window is dropped.
+
+    Returns:
+        dict: Message and number of cached windows dropped.
+
+    Raises:
+        HTTPException: If passphrase is invalid.
+    """
+    if passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    dropped = invalidate_peoplesoft_cache(month)
+    return {"message": "PeopleSoft cache invalidated", "invalidated": dropped}
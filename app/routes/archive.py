@@ -0,0 +1,76 @@
+"""
+Routes for listing and replaying archived Ice Cube import batches.
+"""
+from fastapi import APIRouter, Form, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from app.archive import find_batch, list_batches
+from app.config import PASSPHRASE
+from app.jobs import submit_job
+from app.routes.recon_import import reject_sliced_diff, run_archive_replay
+
+router = APIRouter()
+
+@router.get("/archive/batches")
+async def archive_batches(pension_plan: str | None = None, month: str | None = None, x_passphrase: str | None = Header(None)):
+    """
+    API endpoint listing the batches in the Parquet archive, newest first.
+
+    Args:
+        pension_plan (str): Optional 'PERS' or 'STRS' filter.
+        month (str): Optional recon period filter in 'YYYY-MM' format.
+        x_passphrase (str): Secret passphrase, sent as the X-Passphrase header.
+
+    Returns:
+        dict: One entry per batch with its id, plan, period, creation time,
+        row count, file size and source files with their checksums.
+
+    Raises:
+        HTTPException: If the passphrase is invalid.
+    """
+    if x_passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    batches = await run_in_threadpool(list_batches, pension_plan, month)
+    return {"batches": batches}
+
+@router.post("/archive/replay/")
+async def replay_archive_batch(
+    batch_id: str = Form(...),
+    passphrase: str = Form(...),
+    diff: bool = Form(False),
+    wait: bool = Form(False),
+):
+    """
+    API endpoint to reload an archived batch into the database and queue its import.
+
+    The batch's normalized rows replace its plan and recon_period without
+    reparsing the original upload. Poll GET /api/jobs/{job_id} for progress,
+    or set wait to get the summary directly.
+
+    Args:
+        batch_id (str): Id from GET /api/archive/batches or an import summary.
+        passphrase (str): Secret passphrase to authorize the replay.
+        diff (bool): Write only the rows that differ from the stored period.
+        wait (bool): Block until the replay finishes and return its summary.
+
+    Returns:
+        JSONResponse: 202 with job_id and status_url, or the import summary when wait is set.
+
+    Raises:
+        HTTPException: If passphrase is invalid, the batch id is unknown or
+            diff is set for a plan in sliced storage.
+    """
+    if passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    batch = await run_in_threadpool(find_batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Unknown archive batch id.")
+    await run_in_threadpool(reject_sliced_diff, batch["pension_plan"], diff)
+    if wait:
+        return await run_in_threadpool(run_archive_replay, batch_id, diff)
+    job = submit_job(
+        run_archive_replay, batch_id, diff,
+        description={"filename": f"archive {batch_id}", "month": batch["recon_period"], "pension_plan": batch["pension_plan"]},
+    )
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status_url": f"/api/jobs/{job.id}"})
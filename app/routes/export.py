@@ -0,0 +1,80 @@
+"""
+Routes streaming the recon and staging tables as gzip CSV or Arrow files.
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.config import PASSPHRASE
+from app.export import EXPORT_FORMATS, EXPORT_TABLES, export_columns, export_formats, stream_export
+
+router = APIRouter()
+
+@router.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = "csv",
+    recon_period: str | None = None,
+    start_period: str | None = None,
+    end_period: str | None = None,
+    empl_id: str | None = None,
+    columns: str | None = None,
+    x_passphrase: str | None = Header(None),
+):
+    """
+    API endpoint streaming a table, or some recon periods of it, as a file.
+
+    Rows are read and encoded EXPORT_CHUNK_SIZE at a time while the response
+    is sent, so memory use does not grow with the size of the export.
+
+    Args:
+        table (str): ICE_CUBE_RECON_PERS, ICE_CUBE_RECON_STRS or ICE_CUBE_PAY_DATA_STAGING.
+        format (str): 'csv' (gzip-compressed) or 'arrow' (Arrow IPC stream; needs pyarrow).
+        recon_period (str): Export one 'YYYY-MM' period; shorthand for equal start and end.
+        start_period (str): First period to export.
+        end_period (str): Last period to export.
+        empl_id (str): Only rows of this employee.
+        columns (str): Comma-separated attributes to export; all but the row hashes when empty.
+        x_passphrase (str): Secret passphrase, sent as the X-Passphrase header.
+
+    Returns:
+        StreamingResponse: The file, named after the table and periods.
+
+    Raises:
+        HTTPException: If the passphrase is invalid (403), or the table,
+            format, periods or columns are invalid (400).
+    """
+    if x_passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    name = table.upper()
+    model = EXPORT_TABLES.get(name)
+    if model is None:
+        raise HTTPException(status_code=400, detail=f"Invalid table. Use one of: {', '.join(EXPORT_TABLES)}.")
+    if format not in export_formats():
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(export_formats())}.")
+    if recon_period:
+        start_period = end_period = recon_period
+    for period in (start_period, end_period):
+        if period:
+            try:
+                datetime.strptime(period, "%Y-%m")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid period. Use 'YYYY-MM'.")
+    available = export_columns(model)
+    selected = None
+    if columns:
+        requested = [column.strip() for column in columns.split(",") if column.strip()]
+        unknown = sorted(set(requested).difference(available))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}.")
+        selected = [column for column in available if column in requested]
+
+    media_type, extension = EXPORT_FORMATS[format]
+    periods = "_".join(dict.fromkeys(period for period in (start_period, end_period) if period))
+    filename = f"{name}{'_' + periods if periods else ''}.{extension}"
+    return StreamingResponse(
+        stream_export(name, format, start_period, end_period, empl_id, selected),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,47 @@
+"""
+Health check routes for the database connection pools, and the metrics endpoint.
+"""
+import os
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.db import ENGINE_URLS, pool_status
+from app.metrics import render_metrics
+
+router = APIRouter()
+
+# Mounted without the /api prefix so scrapers find the conventional /metrics path
+metrics_router = APIRouter()
+
+def database_health() -> dict:
+    """
+    Collect pool statistics for every configured engine target.
+
+    Returns:
+        dict: pool_status() output keyed by target; targets without a URL are skipped.
+    """
+    return {name: pool_status(name) for name, env_var in ENGINE_URLS.items() if os.getenv(env_var)}
+
+@router.get("/health/db")
+async def health_db():
+    """
+    Report pool checkout stats and a SELECT 1 round trip for each database.
+
+    Returns:
+        JSONResponse: 200 when every database answered, 503 otherwise.
+    """
+    targets = await run_in_threadpool(database_health)
+    healthy = all(status["ok"] for status in targets.values())
+    return JSONResponse({"ok": healthy, "databases": targets}, status_code=200 if healthy else 503)
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Import phase durations, rows, bytes and memory as Prometheus histograms.
+
+    Returns:
+        PlainTextResponse: Metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
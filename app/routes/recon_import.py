@@ -1,15 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from sqlalchemy.orm import Session
-from datetime import datetime
 import pandas as pd
-import io
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Iterable
 from datetime import datetime, date
-from app.db import get_db, get_engine
-from dateutil.relativedelta import relativedelta
-from app.models import IceCubeReconPers, IceCubeReconStrs
-from fastapi.responses import HTMLResponse
+from app.db import get_db, get_engine, SessionLocal
+from app.models import RECON_MODELS
+from app.transform import check_headers, collect_date_errors, normalize_frame, parse_date_text
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from app.config import PASSPHRASE
+from app.config import PASSPHRASE, INSERT_BATCH_SIZE
+from app.archive import BatchArchive, find_batch, read_batch
+from app.loader import PeriodDiff, insert_frame
+from app.jobs import get_job, process_pool, submit_job
+from app.ledger import cached_import, content_digest, ledger_import, record_commit
+from app.metrics import ImportMetrics, timed
+from app.readers import open_chunks, read_headers, spool_upload, xlsx_sheet_names
+from app.reconcile import changed_employees, employee_totals, ice_cube_totals, reconcile_period
+from app.rollups import ImportRollup
+from app.slices import create_load_slice, swap_in, use_slices
+from app.staging import start_staging_sync
 
 """
 Routes and processing logic for uploading and importing Ice Cube data.
@@ -18,78 +33,20 @@ templates = Jinja2Templates(directory="app/templates")
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
 
-# Define mapping
-STRS_COLUMN_MAP = {
-    "EMPLOYEE ID": "empl_id",
-    "FIRST NAME": "first_name",
-    "LAST NAME": "last_name",
-    "CHECK DATE": "check_date",
-    "EMPLOYEE RECORD": "empl_rcd",
-    "MEMBER CODE": "member_code",
-    "EARNINGS CODE": "earnings_code",
-    "EARNINGS BEGIN": "earnings_begin",
-    "EARNINGS END": "earnings_end",
-    "EARNINGS RATE": "ern_rate",
-    "EARNINGS": "earnings",
-    "CONTRIBUTION RATE": "contribution_rate",
-    "CONTRIBUTION AMOUNT": "contribution_amt",
-    "ASSIGNMENT": "assignment",
-    "CONTRIBUTION CODE": "contribution_code",
-    "PAY CODE": "pay_code",
-    "SOURCE": "input_source",
-    "VERIFIED": "verified",
-    "STRS": "retirement_type",
-    "RECON PERIOD": "recon_period",
-    "TYPE": "assign_type",
-}
-
-PERS_COLUMN_MAP = {
-    "EMPLOYEE ID": "empl_id",
-    "FIRST NAME": "first_name",
-    "LAST NAME": "last_name",
-    "SERVICE PERIOD": "service_period",
-    "EMPLOYEE RECORD": "empl_rcd",
-    "EARNINGS CODE": "earnings_code",
-    "EARNINGS RATE": "ern_rate",
-    "EARNINGS": "earnings",
-    "CONTRIBUTION RATE": "contribution_rate",
-    "CONTRIBUTION AMOUNT": "contribution_amt",
-    "EARN CODE": "erncd",
-    "CONTRIBUTION CODE": "contribution_code",
-    "WORK SCHEDULE CODE": "work_schedule_code",
-    "SOURCE": "user_source",
-    "RECON PERIOD": "recon_period",
-}
 
 def detect_file_type(df: pd.DataFrame) -> str | None:
     """
-    Look at df.columns (upper‐cased) and decide:
-      - If it has STRS‐specific headers → return "STRS"
-      - If it has PERS‐specific headers → return "PERS"
+    Look at df.columns and decide:
+      - If it has more STRS-only headers than PERS-only ones → return "STRS"
+      - If it has more PERS-only headers than STRS-only ones → return "PERS"
       - Otherwise → return None
-    """
-
-    # Normalize column names
-    upcols = [col.strip().upper() for col in df.columns]
-
-    # PERS files almost always include a "SERVICE PERIOD" (or "SERVICE P") column
-    # and usually "EARN CODE" or "WORK SCHEDULE CODE", etc.
-    pers_keywords = {"SERVICE PERIOD", "WORK SCHEDULE CODE", "EMPLOYEE RECORD"}  # tweak if your exports differ
-    # STRS files almost always include a "CHECK DATE" column and a "MEMBER CODE" column
-    strs_keywords = {"STRS", "ASSIGNMENT", "PAY CODE"}
-
-    # Count how many keywords appear in the header list
-    pers_count = sum(1 for h in upcols for kw in pers_keywords if kw in h)
-    strs_count = sum(1 for h in upcols for kw in strs_keywords if kw in h)
 
-    # If one clearly dominates, return it
-    if pers_count > strs_count:
-        return "PERS"
-    if strs_count > pers_count:
-        return "STRS"
-    # If neither side is strong, return None
-    return None
+    The headers are looked up in transform.HEADER_PLANS; see check_headers
+    for the full header validation.
+    """
+    return check_headers(df.columns)["detected_plan"]
 
 def clean_code(val, width=2):
     """
@@ -112,6 +69,9 @@ def to_date(val):
     """
     Convert various input types to a date object.
 
+    Text goes through transform.parse_date_text, which remembers the result
+    for each distinct string; whole columns are parsed by transform.parse_dates.
+
     Args:
         val: A datetime/date/string value.
 
@@ -120,126 +80,568 @@ def to_date(val):
     """
     if pd.isna(val):
         return None
-    if isinstance(val, (datetime, date)):
+    if isinstance(val, datetime):
         return val.date()
-    try:
-        return pd.to_datetime(val).date()
-    except Exception:
-        return None
+    if isinstance(val, date):
+        return val
+    parsed = parse_date_text(str(val).strip())
+    return None if pd.isna(parsed) else parsed.date()
 
-def process_ice_cube_upload(df: pd.DataFrame, parsed_date: date, pension_plan: str, db: Session):
+def process_ice_cube_upload(df: pd.DataFrame, parsed_date: date, pension_plan: str, db: Session, batch_size: int = INSERT_BATCH_SIZE):
     """
     Process and import Ice Cube DataFrame into the reconciliation database.
 
     This will detect the file type (PERS or STRS), validate against the provided
     pension_plan, clean and transform the DataFrame, delete any existing records
-    for the recon_period, and bulk-insert the new records.
+    for the recon_period, and bulk-insert the new records through SQLAlchemy Core.
 
     Args:
         df (pd.DataFrame): DataFrame loaded from the uploaded file.
         parsed_date (date): The reporting month parsed as a date.
         pension_plan (str): 'PERS' or 'STRS' indicating the target plan.
         db (Session): SQLAlchemy database session.
+        batch_size (int): Rows per executemany insert batch.
 
     Returns:
-        dict: Summary with message and rows_inserted count.
+        dict: Summary with message, rows_inserted count and per-batch timings.
 
     Raises:
         HTTPException: If file type detection or pension_plan is invalid.
     """
-    detected_plan = detect_file_type(df)
-    if detected_plan and pension_plan != detected_plan:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Detected file type '{detected_plan}' does not match provided pension_plan '{pension_plan}'."
-        )
-    
-    start_of_month = parsed_date.replace(day=1)
-    end_of_month = (start_of_month.replace(month=start_of_month.month % 12 + 1, day=1)
-                    if start_of_month.month < 12
-                    else start_of_month.replace(year=start_of_month.year + 1, month=1, day=1))
-
-    if pension_plan == "PERS":
-        db.query(IceCubeReconPers).filter(
-            IceCubeReconPers.recon_period == parsed_date.strftime("%Y-%m"),
-        ).delete(synchronize_session=False)
-
-        df.columns = [col.strip().upper() for col in df.columns]
-        df.rename(columns=PERS_COLUMN_MAP, inplace=True)
-        df["check_date"] = parsed_date
-        df["recon_period"] = parsed_date.strftime("%Y-%m")
-
-        records = []
-        for _, row in df.iterrows():
-            row_dict = row.to_dict()
-            record_data = {
-                "empl_id": str(row_dict.get("empl_id")).zfill(6) if pd.notna(row_dict.get("empl_id")) else None,
-                "first_name": str(row_dict.get("first_name")).strip() if pd.notna(row_dict.get("first_name")) else None,
-                "last_name": str(row_dict.get("last_name")).strip() if pd.notna(row_dict.get("last_name")) else None,
-                "service_period": to_date(row_dict.get("service_period")),
-                "empl_rcd": str(row_dict.get("empl_rcd")).zfill(2) if pd.notna(row_dict.get("empl_rcd")) else None,
-                "earnings_code": str(row_dict.get("earnings_code")) if pd.notna(row_dict.get("earnings_code")) else None,
-                "ern_rate": float(row_dict.get("ern_rate")) if pd.notna(row_dict.get("ern_rate")) else None,
-                "earnings": float(row_dict.get("earnings")) if pd.notna(row_dict.get("earnings")) else None,
-                "contribution_rate": float(row_dict.get("contribution_rate")) if pd.notna(row_dict.get("contribution_rate")) else None,
-                "contribution_amt": float(row_dict.get("contribution_amt")) if pd.notna(row_dict.get("contribution_amt")) else None,
-                "erncd": str(row_dict.get("erncd")) if pd.notna(row_dict.get("erncd")) else None,
-                "contribution_code": int(row_dict.get("contribution_code")) if pd.notna(row_dict.get("contribution_code")) else None,
-                "work_schedule_code": clean_code(row_dict.get("work_schedule_code")),
-                "user_source": str(row_dict.get("user_source")) if pd.notna(row_dict.get("user_source")) else None,
-                "retirement_code": str(row_dict.get("retirement_code")) if pd.notna(row_dict.get("retirement_code")) else None,
-                "check_date": to_date(row_dict.get("check_date")),
-                "recon_period": row_dict.get("recon_period", parsed_date.strftime("%Y-%m")),
-            }
-            records.append(IceCubeReconPers(**record_data))
-
-    elif pension_plan == "STRS":
-        db.query(IceCubeReconStrs).filter(
-            IceCubeReconStrs.recon_period == parsed_date.strftime("%Y-%m"),
-        ).delete(synchronize_session=False)
-
-        df.columns = [col.strip().upper() for col in df.columns]
-        df.rename(columns=STRS_COLUMN_MAP, inplace=True)
-
-        df["recon_period"] = parsed_date.strftime("%Y-%m")
-
-        records = []
-        for _, row in df.iterrows():
-            row_dict = row.to_dict()
-            record_data = {
-                "empl_id": str(row_dict.get("empl_id")).zfill(6) if pd.notna(row_dict.get("empl_id")) else None,
-                "first_name": str(row_dict.get("first_name")).strip() if pd.notna(row_dict.get("first_name")) else None,
-                "last_name": str(row_dict.get("last_name")).strip() if pd.notna(row_dict.get("last_name")) else None,
-                "check_date": to_date(row_dict.get("check_date")),
-                "empl_rcd": str(row_dict.get("empl_rcd")).zfill(2) if pd.notna(row_dict.get("empl_rcd")) else None,
-                "member_code": int(row_dict.get("member_code")) if pd.notna(row_dict.get("member_code")) else None,
-                "earnings_code": str(row_dict.get("earnings_code")) if pd.notna(row_dict.get("earnings_code")) else None,
-                "earnings_begin": to_date(row_dict.get("earnings_begin")),
-                "earnings_end": to_date(row_dict.get("earnings_end")),
-                "ern_rate": float(row_dict.get("ern_rate")) if pd.notna(row_dict.get("ern_rate")) else None,
-                "earnings": float(row_dict.get("earnings")) if pd.notna(row_dict.get("earnings")) else None,
-                "contribution_rate": float(row_dict.get("contribution_rate")) if pd.notna(row_dict.get("contribution_rate")) else None,
-                "contribution_amt": float(row_dict.get("contribution_amt")) if pd.notna(row_dict.get("contribution_amt")) else None,
-                "assignment": int(row_dict.get("assignment")) if pd.notna(row_dict.get("assignment")) else None,
-                "contribution_code": int(row_dict.get("contribution_code")) if pd.notna(row_dict.get("contribution_code")) else None,
-                "pay_code": int(row_dict.get("pay_code")) if pd.notna(row_dict.get("pay_code")) else None,
-                "input_source": str(row_dict.get("input_source")) if pd.notna(row_dict.get("input_source")) else None,
-                "retirement_type": str(row_dict.get("retirement_type")) if pd.notna(row_dict.get("retirement_type")) else None,
-                "verified": bool(int(row_dict.get("verified"))) if pd.notna(row_dict.get("verified")) else None,
-                "recon_period": row_dict.get("recon_period", parsed_date.strftime("%Y-%m")),
-                "assign_type": str(row_dict.get("assign_type")) if pd.notna(row_dict.get("assign_type")) else None,
-            }
-            records.append(IceCubeReconStrs(**record_data))
-    else:
+    recon_period = parsed_date.strftime("%Y-%m")
+    with period_lock(pension_plan, recon_period), ledger_import(pension_plan, recon_period) as metrics, BatchArchive(pension_plan, recon_period) as archive:
+        metrics.summary = process_ice_cube_chunks([df], parsed_date, pension_plan, db, batch_size, metrics=metrics, archive=archive)
+        return metrics.summary
+
+def staging_result(staging_sync) -> tuple[dict, dict]:
+    """
+    Wait for the staging sync started alongside an import.
+
+    The import has already committed by the time the result is needed, so a
+    failed sync is logged and reported instead of raised: the import still
+    succeeds, and its summary carries {"error": ...} as the staging result.
+    The reconciliation then runs against the staging rows already stored.
+
+    Args:
+        staging_sync: Future returned by staging.start_staging_sync.
+
+    Returns:
+        tuple[dict, dict]: The staging summary, and the changed employees per
+        (pension_plan, recon_period), empty when the sync failed.
+    """
+    try:
+        staging = dict(staging_sync.result())
+    except Exception as exc:
+        logger.exception("Payroll staging sync failed after the import committed")
+        return {"error": str(exc)}, {}
+    return staging, staging.pop("changed_employees")
+
+SLICED_DIFF_ERROR = "diff imports are not supported in sliced storage; import without diff to replace the period's slice."
+
+def reject_sliced_diff(pension_plan: str, diff: bool) -> None:
+    """
+    Reject a diff import of a plan in sliced storage before it is queued.
+
+    process_ice_cube_chunks runs the same check inside the import; this lets
+    the upload routes answer at once instead of through a failed job.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'; unknown plans are left to the import.
+        diff (bool): The diff flag of the request.
+
+    Raises:
+        HTTPException: 400 if diff is set and the plan uses sliced storage.
+    """
+    model = RECON_MODELS.get(pension_plan)
+    if not diff or model is None:
+        return
+    with get_engine().connect() as connection:
+        if use_slices(connection, model):
+            raise HTTPException(status_code=400, detail=SLICED_DIFF_ERROR)
+
+def process_ice_cube_chunks(chunks: Iterable[pd.DataFrame], parsed_date: date, pension_plan: str, db: Session, batch_size: int = INSERT_BATCH_SIZE, progress=None, diff: bool = False, metrics: ImportMetrics | None = None, archive: BatchArchive | None = None, normalized: bool = False):
+    """
+    Import an Ice Cube file delivered as one or more DataFrame chunks.
+
+    The headers of the first chunk are checked with check_headers: a plan
+    mismatch or missing required columns reject the file, and the other
+    missing or ignored columns are reported as columns. The recon_period
+    delete and every chunk's transform and insert share one transaction, so
+    a failure part-way through leaves the previous import untouched; the
+    period's employee and period rollups (see app.rollups) are built from
+    the chunks and replaced just before the commit, together with the
+    import's ledger row (see ledger.record_commit). The payroll
+    staging sync for the month starts before the first insert and runs in
+    the background; its result is awaited after the commit, and a failed
+    sync is reported rather than raised (see staging_result). The period is
+    then reconciled against the staged deductions, limited to the employees
+    whose contribution totals changed in the upload or whose deductions
+    changed in the sync. A period with no stored rows is reconciled in full.
+
+    With diff set, the stored period is not deleted up front. Rows are matched
+    on their business-key hash instead, and only changed rows are inserted,
+    updated or deleted (see loader.PeriodDiff).
+
+    In sliced storage (see app.slices) nothing is deleted either: the rows
+    load into a fresh table that is swapped in for the period's slice just
+    before the commit. Diff imports are rejected in sliced storage (see
+    reject_sliced_diff), since the swap replaces the whole period.
+
+    Values of date columns that are not dates are imported as empty dates
+    and listed in the summary's date_errors report.
+
+    With an archive, every normalized chunk is also written to the Parquet
+    archive, and the batch is published there once the import commits.
+    Chunks read back from the archive are passed with normalized set, which
+    skips file type detection and the transform.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Consecutive pieces of the uploaded file.
+        parsed_date (date): The reporting month parsed as a date.
+        pension_plan (str): 'PERS' or 'STRS' indicating the target plan.
+        db (Session): SQLAlchemy database session.
+        batch_size (int): Rows per executemany insert batch.
+        progress: Optional callable progress(phase, **counts) told when each
+            phase (parse, transform, delete, insert, swap, rollup, stage, reconcile) starts.
+        diff (bool): Write only the rows that changed since the last import of the period.
+        metrics (ImportMetrics): Import whose phase timings, rows and counts are recorded.
+        archive (BatchArchive): Parquet archive batch receiving the normalized chunks.
+        normalized (bool): The chunks are already normalize_frame output.
+
+    Returns:
+        dict: Summary with message, rows_inserted count, per-batch timings,
+        the staging sync result ({"error": ...} if it failed), the
+        reconciliation exception counts, the
+        archived batch (None when not archived), columns (None for
+        normalized chunks) and date_errors (count plus
+        the first transform.DATE_ERROR_SAMPLE bad values with their 1-based
+        data row); diff imports also report rows_updated, rows_deleted and
+        rows_unchanged.
+
+    Raises:
+        HTTPException: If the headers fail check_headers, pension_plan is
+            invalid or diff is set for a plan in sliced storage.
+    """
+    report = progress or (lambda phase, **counts: None)
+
+    report("parse")
+    chunks = iter(chunks)
+    with timed("parse", metrics):
+        first = next(chunks, pd.DataFrame())
+
+    columns = None
+    if not normalized and len(first.columns):
+        header_check = check_headers(first.columns, pension_plan)
+        if header_check["error"]:
+            raise HTTPException(status_code=400, detail=header_check["error"])
+        columns = {"missing": header_check["missing"], "unknown": header_check["unknown"]}
+
+    model = RECON_MODELS.get(pension_plan)
+    if model is None:
         raise HTTPException(status_code=400, detail="Invalid pension_plan. Use 'PERS' or 'STRS'.")
+    sliced = use_slices(db.connection(), model)
+    if sliced and diff:
+        raise HTTPException(status_code=400, detail=SLICED_DIFF_ERROR)
+
+    recon_period = parsed_date.strftime("%Y-%m")
+    staging_sync = start_staging_sync(recon_period)
+    with timed("reconcile", metrics):
+        before = ice_cube_totals(db.connection(), pension_plan, recon_period)
+    load = None
+    if sliced:
+        with timed("swap", metrics):
+            load = create_load_slice(db.connection(), model, recon_period)
+    elif diff:
+        with timed("diff_load", metrics):
+            period_diff = PeriodDiff(db.connection(), model, recon_period, batch_size)
+    else:
+        report("delete")
+        with timed("delete", metrics):
+            db.query(model).filter(
+                model.recon_period == recon_period,
+            ).delete(synchronize_session=False)
+
+    rows_parsed = 0
+    counts = {"rows_inserted": 0}
+    date_errors = {"count": 0, "rows": []}
+    batches = []
+    contributions = []
+    rollup = ImportRollup(pension_plan, recon_period)
+    chunk = first
+    while chunk is not None:
+        rows_parsed += len(chunk)
+        report("transform", rows_parsed=rows_parsed)
+        with timed("transform", metrics):
+            chunk_errors = []
+            frame = chunk if normalized else normalize_frame(chunk, parsed_date, pension_plan, date_errors=chunk_errors)
+            collect_date_errors(date_errors, chunk_errors, rows_parsed - len(chunk))
+            contributions.append(frame[["empl_id", "contribution_amt"]])
+        with timed("rollup", metrics):
+            rollup.add(frame)
+        if archive is not None:
+            with timed("archive", metrics):
+                archive.write(frame)
+        report("insert")
+        with timed("insert", metrics):
+            if diff:
+                period_diff.apply(frame)
+                counts = dict(period_diff.counts)
+            else:
+                batches.extend(insert_frame(db.connection(), model, frame, batch_size, load))
+                counts["rows_inserted"] += len(frame)
+        report("parse", **counts)
+        with timed("parse", metrics):
+            chunk = next(chunks, None)
+    if diff:
+        report("delete")
+        with timed("delete", metrics):
+            counts = period_diff.finish()
+        batches = period_diff.timings
+    if load is not None:
+        report("swap", **counts)
+        with timed("swap", metrics):
+            swap_in(db.connection(), model, recon_period, load)
+    report("rollup", **counts)
+    with timed("rollup", metrics):
+        rollup.replace(db.connection())
+    with timed("commit", metrics):
+        record_commit(db.connection(), metrics)
+        db.commit()
+    archived = None
+    if archive is not None:
+        with timed("archive", metrics):
+            archived = archive.publish()
+    if metrics is not None:
+        metrics.rows = rows_parsed
+        metrics.counts = dict(counts)
+
+    # Payroll staging has been syncing since the start of the import
+    report("stage", **counts)
+    with timed("stage", metrics):
+        staging, staged_changes = staging_result(staging_sync)
+    report("stage", rows_staged=staging.get("rows_pulled"))
+
+    report("reconcile")
+    with timed("reconcile", metrics):
+        empl_ids = None
+        if len(before):
+            after = employee_totals(pd.concat(contributions, ignore_index=True))
+            empl_ids = changed_employees(before, after) | staged_changes.get((pension_plan, recon_period), set())
+        exceptions = reconcile_period(pension_plan, recon_period, empl_ids)
+    report("reconcile", exceptions=exceptions["exceptions"])
+
+    return {"message": "Upload successful", **counts, "batches": batches, "staging": staging, "reconcile": exceptions, "archive": archived, "columns": columns, "date_errors": date_errors}
+
+# Serializes imports that target the same plan and recon_period
+_period_locks = {}
+_period_locks_guard = threading.Lock()
+
+def period_lock(pension_plan: str, recon_period: str) -> threading.Lock:
+    """
+    Return the lock serializing imports of one plan and recon_period.
+
+    Every import path takes it outside ledger_import, so an import's ledger
+    row is written before the next import of the period starts, and its
+    timings leave out the wait for the lock.
+    """
+    with _period_locks_guard:
+        return _period_locks.setdefault((pension_plan, recon_period), threading.Lock())
+
+def preflight_upload(path: str, filename: str, pension_plan: str | None = None, sheet: int = 0) -> dict:
+    """
+    Validate a spooled upload from its header row alone, before it is queued.
+
+    Only the header row is read (see readers.read_headers), so a file with
+    the wrong plan or missing required columns is rejected in milliseconds
+    instead of after a full parse.
+
+    Args:
+        path (str): Temporary copy of the upload written by spool_upload.
+        filename (str): Original upload name, used to pick Excel vs CSV.
+        pension_plan (str): Plan chosen for the upload; detected when None.
+        sheet (int): Worksheet position for XLSX files.
+
+    Returns:
+        dict: Result of transform.check_headers plus the seconds the check took;
+        error is set when the file must be rejected.
+    """
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as stream:
+            headers = read_headers(stream, filename, sheet)
+        result = check_headers(headers, pension_plan)
+    except Exception as exc:
+        result = {**check_headers([], pension_plan), "error": f"Could not read the header row: {exc}", "missing": []}
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+def run_import_file(path: str, filename: str, parsed_date: date, pension_plan: str, chunked_csv: bool = False, diff: bool = False, progress=None, content_hash: str | None = None, force: bool = False):
+    """
+    Import a spooled upload from disk with its own database session.
+
+    Runs on a worker thread. Imports for the same plan and month are
+    serialized so their delete and insert never interleave. The normalized
+    rows are archived to Parquet with the upload's checksum, and the import
+    is recorded in the ledger. The spool file is removed afterwards.
+
+    Args:
+        path (str): Temporary copy of the upload written by spool_upload.
+        filename (str): Original upload name, used to pick Excel vs CSV.
+        parsed_date (date): The reporting month parsed as a date.
+        pension_plan (str): 'PERS' or 'STRS'.
+        chunked_csv (bool): Read CSV files in chunks instead of all at once.
+        diff (bool): Write only the rows that changed since the last import of the period.
+        progress: Optional progress callback passed to process_ice_cube_chunks.
+        content_hash (str): Hash from ledger.content_digest, recorded in the ledger.
+        force (bool): Import even if the upload duplicates the period's latest import.
+
+    Returns:
+        dict: Result from process_ice_cube_chunks, or the cached summary of an
+        identical import with duplicate_of set.
+    """
+    recon_period = parsed_date.strftime("%Y-%m")
+    size_bytes = os.path.getsize(path)
+    db = SessionLocal()
+    try:
+        with period_lock(pension_plan, recon_period):
+            # An identical upload may have been imported while this one was queued
+            if content_hash is not None and not force:
+                cached = cached_import(pension_plan, recon_period, content_hash, filename, size_bytes)
+                if cached is not None:
+                    return cached
+            with ledger_import(pension_plan, recon_period, filename, size_bytes, content_hash) as metrics, open(path, "rb") as stream, BatchArchive(pension_plan, recon_period) as archive:
+                with timed("archive", metrics):
+                    archive.add_source(path, filename)
+                with timed("parse", metrics):
+                    chunks = open_chunks(stream, filename, pension_plan, chunked_csv)
+                metrics.summary = process_ice_cube_chunks(chunks, parsed_date, pension_plan, db, progress=progress, diff=diff, metrics=metrics, archive=archive)
+                return metrics.summary
+    finally:
+        db.close()
+        os.remove(path)
+
+def transform_upload_unit(path: str, filename: str, sheet: int, parsed_date: date, pension_plan: str | None = None) -> dict:
+    """
+    Parse and normalize one file, or one worksheet of a workbook, for a batch import.
+
+    Runs in a worker process of jobs.process_pool(), so the CPU-bound pandas
+    work of several uploads runs on separate cores. The header row is
+    checked with check_headers before any rows are parsed, and the plan is
+    detected from it when pension_plan is not given. Errors are returned
+    rather than raised so each file gets its own summary.
+
+    Args:
+        path (str): Spooled copy of the upload.
+        filename (str): Original upload name, used to pick Excel vs CSV.
+        sheet (int): Worksheet position for XLSX files.
+        parsed_date (date): The reporting month parsed as a date.
+        pension_plan (str): 'PERS' or 'STRS'; detected from the headers when None.
+
+    Returns:
+        dict: pension_plan, rows, seconds, the normalized frame (None when
+        empty or failed), the missing and unknown columns, the date_errors
+        report and an error message if the unit failed.
+    """
+    started = time.perf_counter()
+    result = {"pension_plan": pension_plan, "rows": 0, "frame": None, "columns": None, "date_errors": {"count": 0, "rows": []}, "error": None}
+    try:
+        with open(path, "rb") as stream:
+            headers = read_headers(stream, filename, sheet)
+            if headers:
+                header_check = check_headers(headers, pension_plan)
+                plan = header_check["pension_plan"]
+                result["pension_plan"] = plan
+                if header_check["error"]:
+                    raise ValueError(header_check["error"])
+                result["columns"] = {"missing": header_check["missing"], "unknown": header_check["unknown"]}
+                frames = []
+                for chunk in open_chunks(stream, filename, plan, chunked_csv=True, sheet=sheet):
+                    chunk_errors = []
+                    frames.append(normalize_frame(chunk, parsed_date, plan, date_errors=chunk_errors))
+                    collect_date_errors(result["date_errors"], chunk_errors, result["rows"])
+                    result["rows"] += len(chunk)
+                if frames:
+                    result["frame"] = pd.concat(frames, ignore_index=True)
+                    result["rows"] = len(result["frame"])
+    except Exception as exc:
+        result["error"] = str(exc)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+def run_import_batch(uploads: list[tuple[str, str]], parsed_date: date, pension_plan: str | None = None, all_sheets: bool = False, progress=None) -> dict:
+    """
+    Import several uploads, and optionally every worksheet of each workbook, for one month.
+
+    Files and sheets are parsed and transformed in parallel on the process
+    pool. The results are then grouped by plan, and each plan's recon_period
+    is replaced in a single transaction holding that plan's period lock,
+    by delete and insert or, in sliced storage, by a slice swap. A
+    plan with any failed file or sheet is left untouched, so a period is
+    never replaced with part of its data. The month's payroll staging sync
+    runs in the background meanwhile. Once it finishes, every imported plan
+    is reconciled for the employees whose totals or deductions changed, as
+    in process_ice_cube_chunks. Each imported plan's rows are archived to
+    Parquet as one batch listing every file and sheet it came from. Spooled
+    files are removed afterwards.
+
+    Args:
+        uploads (list[tuple[str, str]]): (spool path, original filename) pairs.
+        parsed_date (date): The reporting month parsed as a date.
+        pension_plan (str): Plan every file must match; detected per file when None.
+        all_sheets (bool): Import every worksheet of XLSX uploads instead of the first.
+        progress: Optional callable progress(phase, **counts).
+
+    Returns:
+        dict: Message, recon_period, one summary per file or sheet, the staging
+        sync result ({"error": ...} if it failed), and the reconciliation result and archived batch per
+        imported plan.
+    """
+    report = progress or (lambda phase, **counts: None)
+    recon_period = parsed_date.strftime("%Y-%m")
+    staging_sync = start_staging_sync(recon_period)
+    try:
+        units = []
+        for path, filename in uploads:
+            sheets = [(0, None)]
+            if all_sheets and filename.endswith(".xlsx"):
+                with open(path, "rb") as stream:
+                    sheets = list(enumerate(xlsx_sheet_names(stream)))
+            units.extend({"path": path, "filename": filename, "sheet_index": index, "sheet": name} for index, name in sheets)
+
+        report("parse", files=len(uploads), sheets=len(units))
+        futures = [
+            process_pool().submit(transform_upload_unit, unit["path"], unit["filename"], unit["sheet_index"], parsed_date, pension_plan)
+            for unit in units
+        ]
+        for count, (unit, future) in enumerate(zip(units, futures), start=1):
+            try:
+                unit.update(future.result())
+            except Exception as exc:
+                unit.update({"pension_plan": pension_plan, "rows": 0, "frame": None, "error": str(exc)})
+            unit["status"] = "failed" if unit["error"] else "parsed" if unit["rows"] else "empty"
+            report("transform", sheets_parsed=count)
+
+        changed = {}
+        archived = {}
+        for plan, model in RECON_MODELS.items():
+            group = [unit for unit in units if unit["pension_plan"] == plan and unit["status"] != "empty"]
+            if not group:
+                continue
+            if any(unit["status"] == "failed" for unit in group):
+                for unit in group:
+                    if unit["status"] == "parsed":
+                        unit["status"] = "skipped"
+                        unit["error"] = f"Another {plan} file in the batch failed; {recon_period} was left unchanged."
+                continue
+
+            report("insert", pension_plan=plan)
+            size_bytes = sum(os.path.getsize(path) for path in {unit["path"] for unit in group})
+            filenames = ", ".join(sorted({unit["filename"] for unit in group}))
+            db = SessionLocal()
+            try:
+                with period_lock(plan, recon_period), ledger_import(plan, recon_period, filenames, size_bytes, source="batch") as metrics, BatchArchive(plan, recon_period) as archive:
+                    with timed("archive", metrics):
+                        for unit in group:
+                            archive.add_source(unit["path"], unit["filename"], unit["sheet"])
+                    with timed("reconcile", metrics):
+                        before = ice_cube_totals(db.connection(), plan, recon_period)
+                    load = None
+                    if use_slices(db.connection(), model):
+                        with timed("swap", metrics):
+                            load = create_load_slice(db.connection(), model, recon_period)
+                    else:
+                        with timed("delete", metrics):
+                            db.query(model).filter(model.recon_period == recon_period).delete(synchronize_session=False)
+                    rollup = ImportRollup(plan, recon_period)
+                    for unit in group:
+                        with timed("insert", metrics):
+                            insert_frame(db.connection(), model, unit["frame"], INSERT_BATCH_SIZE, load)
+                        with timed("archive", metrics):
+                            archive.write(unit["frame"])
+                        with timed("rollup", metrics):
+                            rollup.add(unit["frame"])
+                    if load is not None:
+                        with timed("swap", metrics):
+                            swap_in(db.connection(), model, recon_period, load)
+                    with timed("rollup", metrics):
+                        rollup.replace(db.connection())
+                    with timed("commit", metrics):
+                        record_commit(db.connection(), metrics)
+                        db.commit()
+                    with timed("archive", metrics):
+                        archived[plan] = archive.publish()
+                    metrics.rows = sum(unit["rows"] for unit in group)
+                    metrics.counts = {"rows_inserted": metrics.rows}
+                    with timed("reconcile", metrics):
+                        after = employee_totals(pd.concat([unit["frame"] for unit in group], ignore_index=True))
+                        changed[plan] = changed_employees(before, after) if len(before) else None
+                    metrics.summary = {"message": "Batch import finished", "rows_inserted": metrics.rows, "archive": archived[plan]}
+                for unit in group:
+                    unit["status"] = "imported"
+            except Exception as exc:
+                db.rollback()
+                for unit in group:
+                    unit["status"] = "failed"
+                    unit["error"] = str(exc)
+            finally:
+                db.close()
+
+        report("stage")
+        staging, staged_changes = staging_result(staging_sync)
+        report("stage", rows_staged=staging.get("rows_pulled"))
+
+        reconciled = {}
+        for plan in sorted({unit["pension_plan"] for unit in units if unit["status"] == "imported"}):
+            report("reconcile", pension_plan=plan)
+            empl_ids = changed[plan]
+            if empl_ids is not None:
+                empl_ids = empl_ids | staged_changes.get((plan, recon_period), set())
+            with timed("reconcile"):
+                reconciled[plan] = reconcile_period(plan, recon_period, empl_ids)
+    finally:
+        for path, _ in uploads:
+            os.remove(path)
+
+    summaries = [
+        {key: unit[key] for key in ("filename", "sheet", "pension_plan", "status", "rows", "seconds", "columns", "date_errors", "error") if key in unit}
+        for unit in units
+    ]
+    return {"message": "Batch import finished", "recon_period": recon_period, "files": summaries, "staging": staging, "reconcile": reconciled, "archive": archived}
+
+def run_archive_replay(batch_id: str, diff: bool = False, progress=None) -> dict:
+    """
+    Reload an archived batch into its plan and recon_period without reparsing the upload.
 
-    db.bulk_save_objects(records)
-    db.commit()
+    The Parquet row groups go through process_ice_cube_chunks as normalized
+    chunks, so the period is replaced (or diffed), staged and reconciled
+    exactly as in the original import, under the same period lock.
 
-    # Stage Payroll Data
-    rows_staged = load_staging_data(parsed_date.strftime("%Y-%m"))
+    Args:
+        batch_id (str): Id of a batch from the archive.
+        diff (bool): Write only the rows that differ from the stored period.
+        progress: Optional progress callback passed to process_ice_cube_chunks.
 
-    return {"message": "Upload successful", "rows_inserted": len(records)}
+    Returns:
+        dict: Result from process_ice_cube_chunks plus the replayed batch id.
+
+    Raises:
+        HTTPException: If the batch id is not in the archive.
+    """
+    batch = find_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Unknown archive batch id.")
+    pension_plan, recon_period = batch["pension_plan"], batch["recon_period"]
+    db = SessionLocal()
+    try:
+        with period_lock(pension_plan, recon_period), ledger_import(pension_plan, recon_period, f"archive {batch_id}", batch["size_bytes"], source="replay") as metrics:
+            result = process_ice_cube_chunks(
+                read_batch(batch["path"]), datetime.strptime(recon_period, "%Y-%m"), pension_plan, db,
+                progress=progress, diff=diff, metrics=metrics, normalized=True,
+            )
+            metrics.summary = {**result, "replayed_batch_id": batch_id}
+        return metrics.summary
+    finally:
+        db.close()
 
 @router.post("/import-ice-cube/")
 async def import_ice_cube_file(
@@ -247,121 +649,152 @@ async def import_ice_cube_file(
     month: str = Form(...),
     pension_plan: str = Form(...),
     passphrase: str = Form(...),
-    db: Session = Depends(get_db)
+    stream: bool = Form(False),
+    wait: bool = Form(False),
+    diff: bool = Form(False),
+    force: bool = Form(False),
 ):
     """
-    API endpoint to upload an Ice Cube file and import its contents.
+    API endpoint to upload an Ice Cube file and queue its import.
+
+    Validates the passphrase, spools the upload to disk and submits
+    run_import_file to the job queue. Poll GET /api/jobs/{job_id} for
+    progress. With wait set, the import runs on a worker thread and the
+    summary is returned directly instead.
 
-    Validates the passphrase, reads the spreadsheet or CSV into a DataFrame,
-    and delegates to process_ice_cube_upload.
+    The upload is hashed while it is spooled, then its header row is
+    validated by preflight_upload; a file that fails is rejected with 400
+    before anything is parsed. When it is identical to the latest succeeded
+    import of the plan and month, that import's summary is returned at once
+    with duplicate_of set, and nothing is queued.
 
     Args:
         file (UploadFile): Excel (.xlsx) or CSV file upload.
         month (str): Reporting month in 'YYYY-MM' format.
         pension_plan (str): 'PERS' or 'STRS'.
         passphrase (str): Secret passphrase to authorize import.
-        db (Session): Database session dependency.
+        stream (bool): Parse CSV uploads in chunks instead of all at once.
+        wait (bool): Block until the import finishes and return its summary.
+        diff (bool): Insert, update or delete only the rows that changed since the last import.
+        force (bool): Import even if the upload is identical to the latest import.
 
     Returns:
-        dict: Result from process_ice_cube_upload.
+        JSONResponse: 202 with job_id and status_url, or the import summary
+        when wait is set or the upload is a duplicate.
 
     Raises:
-        HTTPException: If passphrase is invalid.
+        HTTPException: If passphrase is invalid (403), diff is set for a plan
+            in sliced storage (400), or the header row fails the preflight
+            (400, with the check_headers result as detail).
     """
     if passphrase != PASSPHRASE:
         raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    await run_in_threadpool(reject_sliced_diff, pension_plan, diff)
     parsed_date = datetime.strptime(month, "%Y-%m")
-    contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents)) if file.filename.endswith(".xlsx") else pd.read_csv(io.StringIO(contents.decode("utf-8")))
-    return process_ice_cube_upload(df, parsed_date, pension_plan, db)
-
-def load_staging_data(month):
+    recon_period = parsed_date.strftime("%Y-%m")
+    digest = content_digest(pension_plan, recon_period)
+    path = await spool_upload(file, digest=digest)
+    content_hash = digest.hexdigest()
+    # run_import_file removes the spool file once it has it; until then it is removed here
+    handed_off = False
+    try:
+        preflight = await run_in_threadpool(preflight_upload, path, file.filename, pension_plan)
+        if preflight["error"]:
+            raise HTTPException(status_code=400, detail=preflight)
+        if not force:
+            cached = await run_in_threadpool(cached_import, pension_plan, recon_period, content_hash, file.filename, os.path.getsize(path))
+            if cached is not None:
+                return cached
+        if wait:
+            handed_off = True
+            return await run_in_threadpool(run_import_file, path, file.filename, parsed_date, pension_plan, stream, diff, content_hash=content_hash, force=force)
+        job = submit_job(
+            run_import_file, path, file.filename, parsed_date, pension_plan, stream, diff, content_hash=content_hash, force=force,
+            description={"filename": file.filename, "month": month, "pension_plan": pension_plan},
+        )
+        handed_off = True
+    finally:
+        if not handed_off:
+            os.remove(path)
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status_url": f"/api/jobs/{job.id}"})
+
+@router.post("/import-ice-cube-batch/")
+async def import_ice_cube_batch(
+    files: list[UploadFile] = File(...),
+    month: str = Form(...),
+    passphrase: str = Form(...),
+    pension_plan: str | None = Form(None),
+    all_sheets: bool = Form(False),
+    wait: bool = Form(False),
+):
     """
-    Load and stage payroll data for a given recon_period month.
+    API endpoint to upload several Ice Cube files for one month and queue their import.
 
-    Queries existing staging table and PeopleSoft database, replaces the
-    local staging table if counts mismatch.
+    Every file is spooled to disk and run_import_batch is submitted to the
+    job queue; it parses the files in parallel and replaces each plan's
+    recon_period atomically.
 
     Args:
-        month (str): Recon period in 'YYYY-MM' format.
+        files (list[UploadFile]): Excel (.xlsx) or CSV uploads, PERS and STRS mixed.
+        month (str): Reporting month in 'YYYY-MM' format.
+        passphrase (str): Secret passphrase to authorize import.
+        pension_plan (str): Optional plan every file must match; detected per file otherwise.
+        all_sheets (bool): Import every worksheet of each workbook instead of only the first.
+        wait (bool): Block until the batch finishes and return its summary.
 
     Returns:
-        int: Number of rows pulled from PeopleSoft.
-    """
-    parsed = datetime.strptime(month, "%Y-%m")
-    start_window = (parsed - relativedelta(months=1)).replace(day=1)
-    end_window = (parsed + relativedelta(months=1)).replace(day=1)
-    # Convert to strings for SQL parameters
-    start_window = start_window.strftime("%Y-%m-%d")
-    end_window = end_window.strftime("%Y-%m-%d")
-
-    cube_engine = get_engine(name="local")
-
-    stage_sql = """
-    SELECT COUNT(*) FROM ICE_CUBE_PAY_DATA_STAGING
-    WHERE PAY_END_DT >= ? AND PAY_END_DT < ?
-    """
-    existing_count = pd.read_sql(
-        stage_sql,
-        cube_engine,
-        params=(start_window, end_window)
-    ).iloc[0, 0]
-
-    # Connect to PeopleSoft DB
-    ps_engine = get_engine(name="ps")
-
-    ps_query = """
-    SELECT
-        C.EMPLID,
-        C.PAY_END_DT,
-        C.PAGE_NUM,
-        C.LINE_NUM,
-        C.PAYGROUP,
-        C.OFF_CYCLE,
-        C.SEPCHK,
-        D.DEDCD,
-        D.DED_CLASS,
-        D.DED_CUR
-    FROM PS_PAY_CHECK C
-    LEFT JOIN PS_PAY_DEDUCTION D
-        ON D.PAGE_NUM = C.PAGE_NUM
-        AND D.LINE_NUM = C.LINE_NUM
-        AND D.PAY_END_DT = C.PAY_END_DT
-        AND D.PAYGROUP = C.PAYGROUP
-        AND D.OFF_CYCLE = C.OFF_CYCLE
-        AND D.SEPCHK = C.SEPCHK
-        AND D.DEDCD IN ('PERPB2' ,'PERPBD' ,'PERPBD' ,'PERS' ,'PERSAJ' ,'PERSAJ' ,'PERSP' ,'PERSPB','STRPB2','STRPBY','STRS','STRSAJ','STRSPB')
-    WHERE
-        C.PAY_END_DT >= ? AND C.PAY_END_DT < ?
-    """
-
-    # Pull from PeopleSoft
-    df = pd.read_sql(
-        ps_query,
-        ps_engine,
-        params=(start_window, end_window)
+        JSONResponse: 202 with job_id and status_url, or the batch summary when wait is set.
+
+    Raises:
+        HTTPException: If passphrase or pension_plan is invalid.
+    """
+    if passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    if pension_plan is not None and pension_plan not in RECON_MODELS:
+        raise HTTPException(status_code=400, detail="Invalid pension_plan. Use 'PERS' or 'STRS'.")
+    parsed_date = datetime.strptime(month, "%Y-%m")
+    uploads = [(await spool_upload(file), file.filename) for file in files]
+    if wait:
+        return await run_in_threadpool(run_import_batch, uploads, parsed_date, pension_plan, all_sheets)
+    job = submit_job(
+        run_import_batch, uploads, parsed_date, pension_plan, all_sheets,
+        description={"filename": ", ".join(file.filename for file in files), "month": month, "pension_plan": pension_plan},
     )
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status_url": f"/api/jobs/{job.id}"})
 
-    # Compare count of existing staged data
-    if existing_count != len(df):
-        print(f"Staging data count mismatch: existing {existing_count}, new {len(df)}")
-        # Save to local staging table
-        df.to_sql("ICE_CUBE_PAY_DATA_STAGING", cube_engine, if_exists="replace", index=False)
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """
+    API endpoint reporting the status of a queued import.
 
-    return len(df)
+    Args:
+        job_id (str): Id returned by the upload endpoint.
+
+    Returns:
+        dict: Status, current phase, row counts and, once finished, the result or error.
+
+    Raises:
+        HTTPException: If the job id is unknown.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job.to_dict()
 
 @router.post("/import-payroll-staging/")
-async def import_payroll_staging(month: str, db: Session = Depends(get_db)):
+async def import_payroll_staging(month: str, full: bool = False, db: Session = Depends(get_db)):
     """
     API endpoint to trigger staging of payroll data for a given month.
 
     Args:
         month (str): Recon period in 'YYYY-MM' format.
+        full (bool): Re-pull settled pay end dates too, ignoring the sync watermark.
         db (Session): Database session dependency (unused here).
 
     Returns:
-        dict: Message and count of rows copied into staging.
+        dict: Message plus rows pulled, rows inserted/updated/deleted in staging
+        and the reconciliations rerun for the employees that changed.
     """
-    rows_inserted = load_staging_data(month)
-    return {"message": "Payroll data copied", "rows_inserted": rows_inserted}
+    staging = await asyncio.wrap_future(start_staging_sync(month, full))
+    return {"message": "Payroll data synced", **{key: value for key, value in staging.items() if key != "changed_employees"}}
 
@@ -0,0 +1,178 @@
+"""
+Read API for the Ice Cube recon tables: keyset-paged rows with conditional GETs.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from app.config import PASSPHRASE, READ_MAX_PAGE_SIZE, READ_PAGE_SIZE
+from app.db import get_engine
+from app.ledger import import_version
+from app.models import RECON_MODELS
+from app.schemas import IceCubeReconPersRead, IceCubeReconStrsRead
+from app.slices import is_sliced
+
+router = APIRouter()
+
+# Fields a page can return, in response order; id comes first since it is the page cursor
+READ_FIELDS = {
+    plan: ["id"] + [field for field in schema.model_fields if field != "id"]
+    for plan, schema in (("PERS", IceCubeReconPersRead), ("STRS", IceCubeReconStrsRead))
+}
+
+
+def page_query(pension_plan: str, recon_period: str | None = None, empl_id: str | None = None, after: int | None = None, limit: int = READ_PAGE_SIZE, fields: list[str] | None = None) -> Select:
+    """
+    Build the select for one page of recon rows, in primary key order.
+
+    One row more than limit is fetched, so the caller knows whether another
+    page follows without a count.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Only rows of this 'YYYY-MM' period.
+        empl_id (str): Only rows of this employee.
+        after (int): Cursor: only rows with a larger id.
+        limit (int): Rows per page.
+        fields (list[str]): Attributes to select, from READ_FIELDS; all when None.
+
+    Returns:
+        Select: Query whose result rows are keyed by field name.
+    """
+    model = RECON_MODELS[pension_plan]
+    query = select(*(getattr(model, field).label(field) for field in fields or READ_FIELDS[pension_plan]))
+    if recon_period is not None:
+        query = query.where(model.recon_period == recon_period)
+    if empl_id is not None:
+        query = query.where(model.empl_id == empl_id)
+    if after is not None:
+        query = query.where(model.id > after)
+    return query.order_by(model.id).limit(limit + 1)
+
+
+def read_page(pension_plan: str, recon_period: str | None, empl_id: str | None, after: int | None, limit: int, fields: list[str]) -> dict:
+    """
+    Fetch one page of recon rows.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Only rows of this 'YYYY-MM' period.
+        empl_id (str): Only rows of this employee.
+        after (int): Cursor from the previous page's next_after.
+        limit (int): Rows per page.
+        fields (list[str]): Attributes to return.
+
+    Returns:
+        dict: rows and next_after, the cursor of the next page (None on the last one).
+
+    Raises:
+        ValueError: If recon_period is missing while the plan uses sliced
+            storage, where ids are only unique within a period.
+    """
+    model = RECON_MODELS[pension_plan]
+    with get_engine().connect() as connection:
+        if recon_period is None and is_sliced(connection, model):
+            raise ValueError("recon_period is required: the plan uses sliced storage, where row ids are unique per period only.")
+        rows = [dict(row) for row in connection.execute(page_query(pension_plan, recon_period, empl_id, after, limit, fields)).mappings()]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"rows": rows, "next_after": rows[-1]["id"] if more else None}
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    # If-None-Match wins over If-Modified-Since, as in RFC 9110
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+@router.get("/recon/{pension_plan}")
+async def read_recon_rows(
+    request: Request,
+    pension_plan: str,
+    recon_period: str | None = None,
+    empl_id: str | None = None,
+    after: int | None = Query(None, ge=0),
+    limit: int = Query(READ_PAGE_SIZE, ge=1, le=READ_MAX_PAGE_SIZE),
+    fields: str | None = None,
+    x_passphrase: str | None = Header(None),
+):
+    """
+    API endpoint returning one page of a plan's recon rows.
+
+    Pages are keyed on the primary key: pass the previous page's next_after
+    as after to get the next one. The ETag and Last-Modified headers come
+    from the latest import of the period (of the plan when recon_period is
+    not given), so a request with a matching If-None-Match or
+    If-Modified-Since is answered 304 without reading the recon table.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        recon_period (str): Only rows of this 'YYYY-MM' period; required in sliced storage.
+        empl_id (str): Only rows of this employee.
+        after (int): Cursor from the previous page.
+        limit (int): Rows per page, at most READ_MAX_PAGE_SIZE.
+        fields (str): Comma-separated fields to return; id is always included.
+        x_passphrase (str): Secret passphrase, sent as the X-Passphrase header.
+
+    Returns:
+        JSONResponse: The page (pension_plan, recon_period, empl_id, fields,
+        rows, next_after), or an empty 304 when the client's copy is current.
+
+    Raises:
+        HTTPException: If the passphrase is invalid (403), or the plan,
+            period or fields are invalid (400).
+    """
+    if x_passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    plan = pension_plan.upper()
+    if plan not in RECON_MODELS:
+        raise HTTPException(status_code=400, detail="Invalid pension_plan. Use 'PERS' or 'STRS'.")
+    if recon_period is not None:
+        try:
+            datetime.strptime(recon_period, "%Y-%m")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid recon_period. Use 'YYYY-MM'.")
+    selected = READ_FIELDS[plan]
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested.difference(selected)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}.")
+        selected = [field for field in selected if field == "id" or field in requested]
+
+    version = await run_in_threadpool(import_version, plan, recon_period)
+    query_key = f"{plan}|{recon_period}|{empl_id}|{after}|{limit}|{','.join(selected)}"
+    etag = f'"{version["ledger_id"] if version else 0}-{hashlib.sha256(query_key.encode()).hexdigest()[:16]}"'
+    # Ledger times are naive local times
+    last_modified = version["imported_at"].astimezone(timezone.utc) if version else None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        page = await run_in_threadpool(read_page, plan, recon_period, empl_id, after, limit, selected)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    content = {"pension_plan": plan, "recon_period": recon_period, "empl_id": empl_id, "fields": selected, **page}
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
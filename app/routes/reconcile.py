@@ -0,0 +1,43 @@
+"""
+Routes for rebuilding the Ice Cube vs PeopleSoft reconciliation exceptions.
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import PASSPHRASE
+from app.models import RECON_MODELS
+from app.reconcile import reconcile_period
+
+router = APIRouter()
+
+@router.post("/reconcile/")
+async def reconcile(month: str = Form(...), pension_plan: str = Form(...), passphrase: str = Form(...)):
+    """
+    API endpoint to recompute ICE_CUBE_RECON_EXCEPTIONS for one plan and month.
+
+    Imports reconcile their period automatically; this reruns it after a
+    manual staging sync or a change of RECON_TOLERANCE.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format.
+        pension_plan (str): 'PERS' or 'STRS'.
+        passphrase (str): Secret passphrase to authorize the request.
+
+    Returns:
+        dict: Message plus employees compared and exception counts per reason code.
+
+    Raises:
+        HTTPException: If passphrase, month or pension_plan is invalid.
+    """
+    if passphrase != PASSPHRASE:
+        raise HTTPException(status_code=403, detail="Invalid passphrase.")
+    if pension_plan not in RECON_MODELS:
+        raise HTTPException(status_code=400, detail="Invalid pension_plan. Use 'PERS' or 'STRS'.")
+    try:
+        datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month. Use 'YYYY-MM'.")
+    result = await run_in_threadpool(reconcile_period, pension_plan, month)
+    return {"message": "Reconciliation finished", "recon_period": month, "pension_plan": pension_plan, **result}
@@ -1,20 +1,59 @@
 """
 HTMX-based UI routes for rendering the upload form and handling uploads.
 """
-from fastapi import APIRouter, Request, UploadFile, File, Form, Depends
+import os
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
 from datetime import datetime
-import pandas as pd
-import io
-from app.db import get_db
-from app.routes.recon_import import process_ice_cube_upload  # ← assumes logic lives in recon_import.py
+from html import escape
+from app.jobs import get_job, submit_job
+from app.ledger import cached_import, content_digest
+from app.readers import spool_upload
+from app.routes.recon_import import preflight_upload, reject_sliced_diff, run_import_file  # ← assumes logic lives in recon_import.py
 from app.config import PASSPHRASE
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
+def render_job_status(status: dict) -> str:
+    """
+    Build the HTML fragment for a job status snapshot.
+
+    Running jobs render a div that re-polls itself every second through
+    HTMX; finished jobs render a plain message so polling stops.
+
+    Args:
+        status (dict): Output of ImportJob.to_dict().
+
+    Returns:
+        str: HTML fragment.
+    """
+    if status["status"] == "succeeded":
+        result = status["result"]
+        if "duplicate_of" in result:
+            return f"<div class='success'>✅ Identical to import #{result['duplicate_of']}; nothing was re-imported.</div>"
+        date_errors = result.get("date_errors") or {"count": 0, "rows": []}
+        warning = ""
+        if date_errors["count"]:
+            samples = ", ".join(f"row {error['row']} {error['column']} '{error['value']}'" for error in date_errors["rows"][:5])
+            warning = f"<div class='error'>⚠️ {date_errors['count']} values were not dates and were left empty: {escape(samples)}</div>"
+        if "rows_updated" in result:
+            return (
+                f"<div class='success'>✅ {result['rows_inserted']} inserted, {result['rows_updated']} updated, "
+                f"{result['rows_deleted']} deleted, {result['rows_unchanged']} unchanged; staged.</div>{warning}"
+            )
+        return f"<div class='success'>✅ {result['rows_inserted']} rows uploaded and staged.</div>{warning}"
+    if status["status"] == "failed":
+        return f"<div class='error'>❌ Upload failed: {escape(status['error'] or '')}</div>"
+    counts = ", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in status["counts"].items())
+    phase = status["phase"] or status["status"]
+    return (
+        f"<div hx-get='/jobs/{status['job_id']}' hx-trigger='every 1s' hx-swap='outerHTML'>"
+        f"⏳ {escape(phase.capitalize())}… {escape(counts)}</div>"
+    )
+
 @router.get("/", response_class=HTMLResponse)
 async def render_upload_form(request: Request):
     """
@@ -35,10 +74,16 @@ async def handle_upload(
     month: str = Form(...),
     pension_plan: str = Form(...),
     passphrase: str = Form(...),
-    db: Session = Depends(get_db),
+    stream: bool = Form(False),
+    diff: bool = Form(False),
+    force: bool = Form(False),
 ):
     """
-    Handle HTMX file upload from the UI and process Ice Cube data.
+    Handle HTMX file upload from the UI and queue the Ice Cube import.
+
+    The header row is validated before the import is queued. An upload
+    identical to the latest import of the plan and month is answered at
+    once from the import ledger unless force is set.
 
     Args:
         request (Request): FastAPI request object.
@@ -46,18 +91,59 @@ async def handle_upload(
         month (str): Reporting month in 'YYYY-MM' format.
         pension_plan (str): 'PERS' or 'STRS'.
         passphrase (str): Secret passphrase for authorization.
-        db (Session): Database session dependency.
+        stream (bool): Parse CSV uploads in chunks instead of all at once.
+        diff (bool): Write only the rows that changed since the last import of the period.
+        force (bool): Import even if the upload is identical to the latest import.
 
     Returns:
-        HTMLResponse: Success or error message fragment.
+        HTMLResponse: Job status fragment that polls until the import finishes, or an error message.
     """
     if passphrase != PASSPHRASE:
         return HTMLResponse("<div class='error'>❌ Invalid passphrase.</div>", status_code=403)
+    try:
+        await run_in_threadpool(reject_sliced_diff, pension_plan, diff)
+    except HTTPException as e:
+        return HTMLResponse(f"<div class='error'>❌ {escape(e.detail)}</div>", status_code=400)
     try:
         parsed_date = datetime.strptime(month, "%Y-%m")
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents)) if file.filename.endswith(".xlsx") else pd.read_csv(io.StringIO(contents.decode("utf-8")))
-        result = process_ice_cube_upload(df, parsed_date, pension_plan, db)
-        return HTMLResponse(f"<div class='success'>✅ {result['rows_inserted']} rows uploaded and staged.</div>")
+        recon_period = parsed_date.strftime("%Y-%m")
+        digest = content_digest(pension_plan, recon_period)
+        path = await spool_upload(file, digest=digest)
+        content_hash = digest.hexdigest()
+        # The queued run_import_file removes the spool file; until then it is removed here
+        queued = False
+        try:
+            preflight = await run_in_threadpool(preflight_upload, path, file.filename, pension_plan)
+            if preflight["error"]:
+                return HTMLResponse(f"<div class='error'>❌ {escape(preflight['error'])}</div>", status_code=400)
+            if not force:
+                cached = await run_in_threadpool(cached_import, pension_plan, recon_period, content_hash, file.filename, os.path.getsize(path))
+                if cached is not None:
+                    return HTMLResponse(render_job_status({"status": "succeeded", "result": cached}))
+            job = submit_job(
+                run_import_file, path, file.filename, parsed_date, pension_plan, stream, diff, content_hash=content_hash, force=force,
+                description={"filename": file.filename, "month": month, "pension_plan": pension_plan},
+            )
+            queued = True
+        finally:
+            if not queued:
+                os.remove(path)
+        return HTMLResponse(render_job_status(job.to_dict()), status_code=202)
     except Exception as e:
         return HTMLResponse(f"<div class='error'>❌ Upload failed: {str(e)}</div>", status_code=400)
+
+@router.get("/jobs/{job_id}", response_class=HTMLResponse)
+async def job_status_fragment(job_id: str):
+    """
+    Render the polled status fragment for a queued import.
+
+    Args:
+        job_id (str): Id of the job created by /upload.
+
+    Returns:
+        HTMLResponse: Progress fragment while running, success or error message once finished.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return HTMLResponse("<div class='error'>❌ Unknown import job.</div>", status_code=404)
+    return HTMLResponse(render_job_status(job.to_dict()))
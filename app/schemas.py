@@ -1,7 +1,7 @@
 """
 Pydantic schemas for Ice Cube reconciliation API requests and responses.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import date
 
@@ -28,10 +28,9 @@ class IceCubeReconPersCreate(IceCubeReconPersBase):
     pass
 
 class IceCubeReconPersRead(IceCubeReconPersBase):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: int
 
 class IceCubeReconStrsBase(BaseModel):
     empl_id: Optional[str]
@@ -61,7 +60,6 @@ class IceCubeReconStrsCreate(IceCubeReconStrsBase):
     pass
 
 class IceCubeReconStrsRead(IceCubeReconStrsBase):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    id: int
\ No newline at end of file
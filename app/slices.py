@@ -0,0 +1,254 @@
+"""
+Period-sliced storage for the Ice Cube recon tables (RECON_STORAGE=sliced).
+
+Each recon_period of a plan lives in its own table, <TABLE>__<YYYY>_<MM>,
+and the plan's table name becomes a UNION ALL view over its slices, so
+readers and the app's own queries are unchanged. A reimport loads into a
+fresh table; swap_in then drops the old slice, renames the new one into
+place and refreshes the view inside the import's transaction. Replacing a
+month costs a few metadata operations instead of deleting every row, and
+readers see either the old month or the new one, never a half-deleted one.
+
+Every slice has a CHECK constraint on its recon_period, which lets SQL
+Server skip the other slices when a query on the view filters on the period.
+SQLite runs the same DDL transactionally and is the stand-in for local runs.
+
+Conversion is one-way: a converted plan stays sliced, and schema changes
+to its recon table go through apply_to_slices.
+"""
+import re
+import uuid
+from typing import Callable
+
+from sqlalchemy import CheckConstraint, MetaData, Table, delete, insert, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from app.config import RECON_STORAGE
+
+# Slice holding rows without a recon_period after conversion; always part of the view
+ROOT_SLICE = "ROOT"
+
+_PERIOD = re.compile(r"^\d{4}-\d{2}$")
+
+
+def slice_name(model, recon_period: str) -> str:
+    """
+    Name of the table holding one recon_period of a plan.
+
+    Args:
+        model: Recon ORM model (IceCubeReconPers or IceCubeReconStrs).
+        recon_period (str): Period in 'YYYY-MM' format.
+
+    Returns:
+        str: Slice table name, e.g. 'ICE_CUBE_RECON_STRS__2024_04'.
+
+    Raises:
+        ValueError: If recon_period is not in 'YYYY-MM' format.
+    """
+    if not _PERIOD.match(recon_period or ""):
+        raise ValueError(f"Invalid recon_period '{recon_period}'; expected 'YYYY-MM'.")
+    return f"{model.__tablename__}__{recon_period.replace('-', '_')}"
+
+
+def is_sliced(connection: Connection, model) -> bool:
+    """True when the model's table name is already a view over period slices."""
+    return model.__tablename__ in inspect(connection).get_view_names()
+
+
+def use_slices(connection: Connection, model) -> bool:
+    """
+    Decide whether an import of the model's plan goes through slices.
+
+    Args:
+        connection (Connection): Connection inside the import's transaction.
+        model: Recon ORM model.
+
+    Returns:
+        bool: True when RECON_STORAGE is 'sliced' or the plan was converted
+        earlier; a converted plan keeps using slices either way.
+    """
+    return RECON_STORAGE == "sliced" or is_sliced(connection, model)
+
+
+def period_slices(connection: Connection, model) -> list[str]:
+    """
+    List the slice tables of a plan, the root slice included.
+
+    Args:
+        connection (Connection): Open connection.
+        model: Recon ORM model.
+
+    Returns:
+        list[str]: Slice table names in period order.
+    """
+    pattern = re.compile(rf"^{re.escape(model.__tablename__)}__(\d{{4}}_\d{{2}}|{ROOT_SLICE})$")
+    return sorted(name for name in inspect(connection).get_table_names() if pattern.match(name))
+
+
+def _slice_table(model, name: str, recon_period: str | None = None) -> Table:
+    # Index and constraint names are unique per database on SQLite (and for
+    # constraints on SQL Server), so explicitly named ones carry the table's
+    # own suffix; column indexes are already named after the table
+    table = model.__table__.to_metadata(MetaData(), name=name)
+    suffix = name[len(model.__tablename__):]
+    for index in table.indexes:
+        if index.name and name not in index.name:
+            index.name = f"{index.name}{suffix}"
+    if recon_period is not None:
+        column = model.__mapper__.columns["recon_period"].name
+        table.append_constraint(CheckConstraint(f"{column} = '{recon_period}'", name=f"CK_{name}_PERIOD"))
+    return table
+
+
+def _begin(connection: Connection) -> None:
+    # pysqlite opens its transaction only before DML, so DDL issued first
+    # would autocommit; take the write lock explicitly instead
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _lock_plan(connection: Connection, model) -> None:
+    # On SQL Server an exclusive application lock on the plan, held until the
+    # commit, serializes conversion and view redefinitions between imports
+    if connection.dialect.name == "mssql":
+        connection.execute(
+            text("EXEC sp_getapplock @Resource = :resource, @LockMode = 'Exclusive', @LockOwner = 'Transaction'"),
+            {"resource": model.__tablename__},
+        )
+
+
+def _rename(connection: Connection, old: str, new: str) -> None:
+    if connection.dialect.name == "mssql":
+        connection.execute(text("EXEC sp_rename :old, :new"), {"old": old, "new": new})
+    else:
+        preparer = connection.dialect.identifier_preparer
+        connection.exec_driver_sql(f"ALTER TABLE {preparer.quote(old)} RENAME TO {preparer.quote(new)}")
+
+
+def _create_view(connection: Connection, model, names: list[str]) -> None:
+    preparer = connection.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(column.name) for column in model.__table__.columns)
+    selects = " UNION ALL ".join(f"SELECT {columns} FROM {preparer.quote(name)}" for name in names)
+    create = "CREATE OR ALTER VIEW" if connection.dialect.name == "mssql" else "CREATE VIEW"
+    connection.exec_driver_sql(f"{create} {preparer.quote(model.__tablename__)} AS {selects}")
+
+
+def apply_to_slices(connection: Connection, model, ddl: Callable[[str, str], None]) -> list[str]:
+    """
+    Run a schema change on every slice of a converted plan and recreate its view.
+
+    Migrations that alter a recon table call this when the table name is a
+    view (see is_sliced). The view is recreated from the model's columns, so
+    a change that adds or drops columns must match the model.
+
+    Args:
+        connection (Connection): Connection inside the migration's transaction.
+        model: Recon ORM model.
+        ddl (Callable[[str, str], None]): Called with each slice's table name
+            and its suffix ('__2024_04', '__ROOT'). Index and constraint names
+            are unique per database, so new ones should end with the suffix.
+            Existing indexes keep the names of the table the slice was
+            loaded as, so look them up by their columns.
+
+    Returns:
+        list[str]: The slices changed.
+    """
+    _begin(connection)
+    if connection.dialect.name != "mssql":
+        # SQLite validates views while altering tables, so the view is rebuilt from scratch
+        preparer = connection.dialect.identifier_preparer
+        connection.exec_driver_sql(f"DROP VIEW IF EXISTS {preparer.quote(model.__tablename__)}")
+    names = period_slices(connection, model)
+    for name in names:
+        ddl(name, name[len(model.__tablename__):])
+    _create_view(connection, model, names)
+    return names
+
+
+def ensure_sliced(connection: Connection, model) -> None:
+    """
+    Convert a plan's table into period slices behind a view, once.
+
+    The table is renamed to the root slice, each recon_period's rows are
+    copied into their own slice and removed from the root, and the view is
+    created under the original name. This one-time conversion is O(rows);
+    every later swap is metadata only. Row ids are reassigned per slice, so
+    (recon_period, id) identifies a row in sliced storage. On SQL Server the
+    plan's application lock is taken first, so two imports cannot both
+    convert the table.
+
+    Args:
+        connection (Connection): Connection inside the caller's transaction.
+        model: Recon ORM model.
+    """
+    _begin(connection)
+    _lock_plan(connection, model)
+    if is_sliced(connection, model):
+        return
+    root = _slice_table(model, f"{model.__tablename__}__{ROOT_SLICE}")
+    _rename(connection, model.__tablename__, root.name)
+
+    period = root.c[model.__mapper__.columns["recon_period"].name]
+    columns = [column.name for column in root.columns if not column.primary_key]
+    periods = connection.execute(select(period).where(period.isnot(None)).distinct()).scalars().all()
+    for recon_period in periods:
+        table = _slice_table(model, slice_name(model, recon_period), recon_period)
+        table.create(connection)
+        connection.execute(insert(table).from_select(
+            columns, select(*(root.c[name] for name in columns)).where(period == recon_period),
+        ))
+    connection.execute(delete(root).where(period.isnot(None)))
+    _create_view(connection, model, period_slices(connection, model))
+
+
+def create_load_slice(connection: Connection, model, recon_period: str) -> Table:
+    """
+    Create the empty table a reimport of one recon_period loads into.
+
+    The plan is converted to sliced storage first if needed. The table has
+    the model's columns and indexes and is invisible to readers until
+    swap_in renames it into place.
+
+    Args:
+        connection (Connection): Connection inside the import's transaction.
+        model: Recon ORM model.
+        recon_period (str): Period in 'YYYY-MM' format.
+
+    Returns:
+        Table: The load table, to pass to loader.insert_frame and swap_in.
+    """
+    ensure_sliced(connection, model)
+    table = _slice_table(model, f"{slice_name(model, recon_period)}__{uuid.uuid4().hex[:8]}", recon_period)
+    table.create(connection)
+    return table
+
+
+def swap_in(connection: Connection, model, recon_period: str, load: Table) -> None:
+    """
+    Replace a recon_period's slice with a loaded table.
+
+    Drops the current slice, renames the load table to the slice name and
+    redefines the view over the plan's slices. Everything runs in the
+    caller's transaction, so the swap becomes visible at its commit. On SQL
+    Server the plan's application lock (the one ensure_sliced takes), held
+    until that commit, keeps two imports of new periods from each
+    redefining the view without the other's slice.
+
+    Args:
+        connection (Connection): Connection inside the import's transaction.
+        model: Recon ORM model.
+        recon_period (str): Period in 'YYYY-MM' format.
+        load (Table): Table returned by create_load_slice, already filled.
+    """
+    preparer = connection.dialect.identifier_preparer
+    target = slice_name(model, recon_period)
+    _begin(connection)
+    _lock_plan(connection, model)
+    if connection.dialect.name != "mssql":
+        # SQLite validates views while renaming tables, so the view is rebuilt from scratch
+        connection.exec_driver_sql(f"DROP VIEW IF EXISTS {preparer.quote(model.__tablename__)}")
+    names = period_slices(connection, model)
+    if target in names:
+        connection.exec_driver_sql(f"DROP TABLE {preparer.quote(target)}")
+    _rename(connection, load.name, target)
+    _create_view(connection, model, sorted(set(names) | {target}))
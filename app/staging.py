@@ -0,0 +1,474 @@
+"""
+Incremental sync of PeopleSoft pay check deductions into ICE_CUBE_PAY_DATA_STAGING.
+"""
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import Column, MetaData, Table, bindparam, delete, insert, select, text
+
+from app.cache import TTLCache
+from app.config import PS_CACHE_SIZE, PS_CACHE_TTL, STAGING_SETTLE_DAYS, STAGING_WORKERS
+from app.db import get_engine
+from app.metrics import timed
+from app.models import IceCubePayDataStaging, IceCubeStagingWatermark
+from app.reconcile import reconcile_changes, staging_changes
+from app.rollups import refresh_staging_rollup
+from app.transform import frame_to_records
+
+# Deduction codes pulled from PS_PAY_DEDUCTION
+STAGING_DEDCDS = ['PERPB2', 'PERPBD', 'PERS', 'PERSAJ', 'PERSP', 'PERSPB', 'STRPB2', 'STRPBY', 'STRS', 'STRSAJ', 'STRSPB']
+
+# One staged row per pay check line and deduction. DED_CLASS is part of the key
+# because PS_PAY_DEDUCTION can carry several classes of the same DEDCD on a line.
+STAGING_KEY = ["EMPLID", "PAY_END_DT", "PAGE_NUM", "LINE_NUM", "PAYGROUP", "OFF_CYCLE", "SEPCHK", "DEDCD", "DED_CLASS"]
+STAGING_COLUMNS = STAGING_KEY + ["DED_CUR"]
+
+PS_QUERY = """
+SELECT
+    C.EMPLID,
+    C.PAY_END_DT,
+    C.PAGE_NUM,
+    C.LINE_NUM,
+    C.PAYGROUP,
+    C.OFF_CYCLE,
+    C.SEPCHK,
+    D.DEDCD,
+    D.DED_CLASS,
+    D.DED_CUR
+FROM PS_PAY_CHECK C
+LEFT JOIN PS_PAY_DEDUCTION D
+    ON D.PAGE_NUM = C.PAGE_NUM
+    AND D.LINE_NUM = C.LINE_NUM
+    AND D.PAY_END_DT = C.PAY_END_DT
+    AND D.PAYGROUP = C.PAYGROUP
+    AND D.OFF_CYCLE = C.OFF_CYCLE
+    AND D.SEPCHK = C.SEPCHK
+    AND D.DEDCD IN ({dedcds})
+WHERE
+    C.PAY_END_DT >= ? AND C.PAY_END_DT < ?
+    {exclude_settled}
+"""
+
+# Cheap fingerprint of a PeopleSoft window: check and deduction counts and the
+# deduction total per pay end date and paygroup. Single-table aggregates, no join.
+PS_PROBE_QUERY = """
+SELECT 'CHECK' AS SRC, C.PAY_END_DT, C.PAYGROUP, COUNT(*) AS ROW_COUNT, NULL AS DED_TOTAL
+FROM PS_PAY_CHECK C
+WHERE C.PAY_END_DT >= ? AND C.PAY_END_DT < ?
+GROUP BY C.PAY_END_DT, C.PAYGROUP
+UNION ALL
+SELECT 'DEDUCTION' AS SRC, D.PAY_END_DT, D.PAYGROUP, COUNT(*) AS ROW_COUNT, SUM(D.DED_CUR) AS DED_TOTAL
+FROM PS_PAY_DEDUCTION D
+WHERE D.PAY_END_DT >= ? AND D.PAY_END_DT < ? AND D.DEDCD IN ({dedcds})
+GROUP BY D.PAY_END_DT, D.PAYGROUP
+"""
+
+# Key match between target T and load table S; DEDCD/DED_CLASS are NULL for checks without deductions
+_KEY_MATCH = " AND ".join(
+    f"COALESCE(T.{col}, '') = COALESCE(S.{col}, '')" if col in ("DEDCD", "DED_CLASS") else f"T.{col} = S.{col}"
+    for col in STAGING_KEY
+)
+
+MSSQL_MERGE = f"""
+MERGE ICE_CUBE_PAY_DATA_STAGING WITH (HOLDLOCK) AS T
+USING {{load}} AS S
+ON {_KEY_MATCH}
+WHEN MATCHED AND EXISTS (SELECT S.DED_CUR EXCEPT SELECT T.DED_CUR) THEN
+    UPDATE SET T.DED_CUR = S.DED_CUR
+WHEN NOT MATCHED BY TARGET THEN
+    INSERT ({", ".join(STAGING_COLUMNS)}) VALUES ({", ".join(f"S.{col}" for col in STAGING_COLUMNS)})
+WHEN NOT MATCHED BY SOURCE
+    AND T.PAY_END_DT >= :start_window AND T.PAY_END_DT < :end_window AND T.PAY_END_DT NOT IN :settled THEN
+    DELETE
+OUTPUT $action, COALESCE(inserted.EMPLID, deleted.EMPLID), COALESCE(inserted.PAY_END_DT, deleted.PAY_END_DT),
+    COALESCE(inserted.DEDCD, deleted.DEDCD);
+"""
+
+# Same merge as three set-based statements, for databases without MERGE (the SQLite stand-in).
+# Each returns the EMPLID, PAY_END_DT and DEDCD of the rows it wrote.
+_CHANGED = "RETURNING EMPLID, PAY_END_DT, DEDCD"
+GENERIC_MERGE = [
+    ("rows_deleted", f"""
+    DELETE FROM ICE_CUBE_PAY_DATA_STAGING AS T
+    WHERE T.PAY_END_DT >= :start_window AND T.PAY_END_DT < :end_window AND T.PAY_END_DT NOT IN :settled
+      AND NOT EXISTS (SELECT 1 FROM {{load}} AS S WHERE {_KEY_MATCH})
+    {_CHANGED}
+    """),
+    ("rows_updated", f"""
+    UPDATE ICE_CUBE_PAY_DATA_STAGING AS T
+    SET DED_CUR = (SELECT S.DED_CUR FROM {{load}} AS S WHERE {_KEY_MATCH})
+    WHERE EXISTS (
+        SELECT 1 FROM {{load}} AS S WHERE {_KEY_MATCH}
+          AND NOT (S.DED_CUR = T.DED_CUR OR (S.DED_CUR IS NULL AND T.DED_CUR IS NULL))
+    )
+    {_CHANGED}
+    """),
+    ("rows_inserted", f"""
+    INSERT INTO ICE_CUBE_PAY_DATA_STAGING ({", ".join(STAGING_COLUMNS)})
+    SELECT {", ".join(f"S.{col}" for col in STAGING_COLUMNS)} FROM {{load}} AS S
+    WHERE NOT EXISTS (SELECT 1 FROM ICE_CUBE_PAY_DATA_STAGING AS T WHERE {_KEY_MATCH})
+    {_CHANGED}
+    """),
+]
+
+
+def staging_window(month: str) -> tuple[date, date]:
+    """
+    Pay end date window staged for a recon_period: the month before through the month itself.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format.
+
+    Returns:
+        tuple[date, date]: Inclusive start and exclusive end of the window.
+    """
+    parsed = datetime.strptime(month, "%Y-%m")
+    start_window = (parsed - relativedelta(months=1)).replace(day=1)
+    end_window = (parsed + relativedelta(months=1)).replace(day=1)
+    return start_window.date(), end_window.date()
+
+
+def date_fingerprints(probe: tuple) -> dict[date, str]:
+    """
+    Split a window probe into one fingerprint per pay end date.
+
+    Args:
+        probe (tuple): Output of probe_peoplesoft_window.
+
+    Returns:
+        dict[date, str]: SHA-256 hex digest of each pay end date's probe rows.
+    """
+    rows = {}
+    for row in probe:
+        # PAY_END_DT comes back as a date, datetime or ISO string depending on the driver
+        rows.setdefault(date.fromisoformat(row[1][:10]), []).append(row)
+    return {pay_end_dt: hashlib.sha256(repr(sorted(values)).encode()).hexdigest() for pay_end_dt, values in rows.items()}
+
+
+def settled_pay_end_dates(connection, start_window: date, end_window: date, fingerprints: dict[date, str], settle_days: int = STAGING_SETTLE_DAYS) -> list[date]:
+    """
+    Pay end dates in the window that settled and have not changed in PeopleSoft since.
+
+    A pay end date is settled once settle_days have passed since it and it
+    was synced after that point. It is skipped on incremental syncs only while
+    its probe fingerprint still matches the one recorded by that sync, so a
+    later correction in PeopleSoft, e.g. to an old month synced for the first
+    time after it settled, is pulled again.
+
+    Args:
+        connection: Connection to the local database.
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        fingerprints (dict[date, str]): Current fingerprints from date_fingerprints.
+        settle_days (int): Days after which a pay end date no longer changes.
+
+    Returns:
+        list[date]: Pay end dates to leave out of the PeopleSoft pull.
+    """
+    watermark = IceCubeStagingWatermark.__table__
+    rows = connection.execute(
+        select(watermark.c.PAY_END_DT, watermark.c.SYNCED_AT, watermark.c.FINGERPRINT)
+        .where(watermark.c.PAY_END_DT >= start_window, watermark.c.PAY_END_DT < end_window)
+    ).all()
+    return [
+        pay_end_dt for pay_end_dt, synced_at, fingerprint in rows
+        if synced_at.date() >= pay_end_dt + timedelta(days=settle_days)
+        and fingerprint is not None and fingerprint == fingerprints.get(pay_end_dt)
+    ]
+
+
+def pull_peoplesoft_window(start_window: date, end_window: date, settled: list[date]) -> pd.DataFrame:
+    """
+    Pull pay check deductions for the window from PeopleSoft, one row per STAGING_KEY.
+
+    Rows sharing a key (different plan types or benefit plans) are summed so
+    the result can be merged on STAGING_KEY.
+
+    Args:
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        settled (list[date]): Pay end dates to skip.
+
+    Returns:
+        pd.DataFrame: STAGING_COLUMNS for the unsettled pay end dates in the window.
+    """
+    exclude_settled = f"AND C.PAY_END_DT NOT IN ({', '.join('?' for _ in settled)})" if settled else ""
+    query = PS_QUERY.format(dedcds=", ".join(f"'{dedcd}'" for dedcd in STAGING_DEDCDS), exclude_settled=exclude_settled)
+    params = (start_window.strftime("%Y-%m-%d"), end_window.strftime("%Y-%m-%d"), *(d.strftime("%Y-%m-%d") for d in settled))
+    df = pd.read_sql(query, get_engine(name="ps"), params=params)
+    df["PAY_END_DT"] = pd.to_datetime(df["PAY_END_DT"])
+    return (
+        df.groupby(STAGING_KEY, dropna=False, sort=False)["DED_CUR"]
+        .sum(min_count=1)
+        .reset_index()
+    )
+
+
+# Pulled PeopleSoft windows keyed by (start_window, end_window, dedcds, settled dates)
+ps_window_cache = TTLCache(maxsize=PS_CACHE_SIZE, ttl=PS_CACHE_TTL)
+
+
+def probe_peoplesoft_window(start_window: date, end_window: date) -> tuple:
+    """
+    Fingerprint a PeopleSoft window without running the deduction join.
+
+    Args:
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+
+    Returns:
+        tuple: Sorted per-paygroup check/deduction counts, latest pay end date and deduction totals.
+    """
+    query = PS_PROBE_QUERY.format(dedcds=", ".join(f"'{dedcd}'" for dedcd in STAGING_DEDCDS))
+    bounds = (start_window.strftime("%Y-%m-%d"), end_window.strftime("%Y-%m-%d"))
+    with get_engine(name="ps").connect() as connection:
+        rows = connection.exec_driver_sql(query, bounds + bounds).all()
+    return tuple(sorted(tuple(str(val) for val in row) for row in rows))
+
+
+def cached_peoplesoft_window(start_window: date, end_window: date, settled: list[date], refresh: bool = False, probe: tuple | None = None) -> tuple[pd.DataFrame, str]:
+    """
+    Return the pulled PeopleSoft window from ps_window_cache when it is still fresh.
+
+    A cached window is reused only within PS_CACHE_TTL and only while the
+    freshness probe returns the same fingerprint it had when pulled.
+    Otherwise the window is pulled again and cached.
+
+    Args:
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        settled (list[date]): Pay end dates to skip.
+        refresh (bool): Skip the cache lookup and pull again.
+        probe (tuple): Fingerprint the caller already took; probed here when None.
+
+    Returns:
+        tuple[pd.DataFrame, str]: The window and how it was served: 'hit',
+        'stale' (probe changed), 'miss', 'refresh' or 'disabled'.
+    """
+    if not ps_window_cache.enabled:
+        return pull_peoplesoft_window(start_window, end_window, settled), "disabled"
+    key = (start_window, end_window, tuple(STAGING_DEDCDS), tuple(settled))
+    status = "refresh" if refresh else "miss"
+    if probe is None:
+        probe = probe_peoplesoft_window(start_window, end_window)
+    if not refresh and (cached := ps_window_cache.get(key)) is not None:
+        df, fingerprint = cached
+        if probe == fingerprint:
+            return df.copy(), "hit"
+        ps_window_cache.discard(key)
+        status = "stale"
+    df = pull_peoplesoft_window(start_window, end_window, settled)
+    ps_window_cache.put(key, df.copy(), probe)
+    return df, status
+
+
+def invalidate_peoplesoft_cache(month: str | None = None) -> int:
+    """
+    Drop cached PeopleSoft windows, all of them or those covering one month's sync window.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format; None clears the whole cache.
+
+    Returns:
+        int: Number of cached windows dropped.
+    """
+    if month is None:
+        return ps_window_cache.invalidate()
+    window = staging_window(month)
+    return ps_window_cache.invalidate(lambda key: key[:2] == window)
+
+
+def merge_staging(connection, df: pd.DataFrame, start_window: date, end_window: date, settled: list[date]) -> tuple[dict, pd.DataFrame]:
+    """
+    Merge a pulled window into ICE_CUBE_PAY_DATA_STAGING through a temporary load table.
+
+    SQL Server gets a single MERGE; other dialects get the equivalent
+    DELETE/UPDATE/INSERT statements. Only rows in the window whose pay end
+    date is not settled can be deleted. The employee, pay end date and
+    deduction code of every row written are returned, so reconciliation can
+    be limited to the employees the sync changed.
+
+    Args:
+        connection: Connection inside the caller's transaction.
+        df (pd.DataFrame): Output of pull_peoplesoft_window.
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        settled (list[date]): Pay end dates that were not pulled.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: rows_inserted, rows_updated and rows_deleted
+        counts, and the EMPLID, PAY_END_DT and DEDCD of every row inserted,
+        updated or deleted.
+    """
+    mssql = connection.dialect.name == "mssql"
+    staging = IceCubePayDataStaging.__table__
+    load = Table(
+        "#ICE_CUBE_STAGING_LOAD" if mssql else "ICE_CUBE_STAGING_LOAD",
+        MetaData(),
+        *(Column(name, staging.c[name].type) for name in STAGING_COLUMNS),
+        prefixes=[] if mssql else ["TEMPORARY"],
+    )
+    load.create(connection)
+    try:
+        if len(df):
+            connection.execute(insert(load), frame_to_records(df[STAGING_COLUMNS]))
+        # NOT IN needs at least one value; end_window is outside the window so it excludes nothing
+        params = {"start_window": start_window, "end_window": end_window, "settled": settled or [end_window]}
+        settled_param = bindparam("settled", expanding=True)
+        if mssql:
+            output = connection.execute(text(MSSQL_MERGE.format(load=load.name)).bindparams(settled_param), params).all()
+            actions = [action for action, *_ in output]
+            counts = {
+                "rows_inserted": actions.count("INSERT"),
+                "rows_updated": actions.count("UPDATE"),
+                "rows_deleted": actions.count("DELETE"),
+            }
+            return counts, pd.DataFrame([changed for _, *changed in output], columns=["EMPLID", "PAY_END_DT", "DEDCD"])
+        counts = {}
+        changed = []
+        for name, statement in GENERIC_MERGE:
+            clause = text(statement.format(load=load.name))
+            if ":settled" in statement:
+                clause = clause.bindparams(settled_param)
+            rows = connection.execute(clause, params).all()
+            counts[name] = len(rows)
+            changed.extend(rows)
+        return counts, pd.DataFrame(changed, columns=["EMPLID", "PAY_END_DT", "DEDCD"])
+    finally:
+        load.drop(connection)
+
+
+def record_watermark(connection, df: pd.DataFrame, start_window: date, end_window: date, settled: list[date], fingerprints: dict[date, str]) -> None:
+    """
+    Replace the watermark rows for the pay end dates this sync pulled.
+
+    Args:
+        connection: Connection inside the caller's transaction.
+        df (pd.DataFrame): Output of pull_peoplesoft_window.
+        start_window (date): Inclusive window start.
+        end_window (date): Exclusive window end.
+        settled (list[date]): Pay end dates that were not pulled and keep their watermark.
+        fingerprints (dict[date, str]): Probe fingerprints taken before the pull.
+    """
+    watermark = IceCubeStagingWatermark.__table__
+    connection.execute(
+        delete(watermark).where(
+            watermark.c.PAY_END_DT >= start_window,
+            watermark.c.PAY_END_DT < end_window,
+            watermark.c.PAY_END_DT.not_in(settled),
+        )
+    )
+    counts = df.groupby("PAY_END_DT").size()
+    if len(counts):
+        synced_at = datetime.now()
+        connection.execute(insert(watermark), [
+            {
+                "PAY_END_DT": pay_end_dt.date(), "ROW_COUNT": int(rows), "SYNCED_AT": synced_at,
+                "FINGERPRINT": fingerprints.get(pay_end_dt.date()),
+            }
+            for pay_end_dt, rows in counts.items()
+        ])
+
+
+def load_staging_data(month, full=False):
+    """
+    Sync PeopleSoft payroll deductions for a recon_period into the staging table.
+
+    Pulls the three-month pay end window from PeopleSoft, leaving out pay
+    end dates the watermark marks as settled, and unchanged since, unless
+    full is set. A fresh
+    cached pull of the same window is reused; full always re-pulls. The result
+    is merged into ICE_CUBE_PAY_DATA_STAGING on STAGING_KEY, so staged data
+    for other months is never touched, and the staging rollup of every month
+    in the window is rebuilt in the same transaction. Employees whose staged
+    deductions changed are then reconciled again in every imported plan and
+    period they affect.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format.
+        full (bool): Re-pull every pay end date in the window, ignoring the watermark.
+
+    Returns:
+        dict: rows_pulled from PeopleSoft, rows_inserted/rows_updated/rows_deleted
+        in staging, the settled pay end dates that were skipped, how the
+        PeopleSoft cache served the pull (ps_cache), the reconcile results and
+        changed_employees, the changed employee ids per (pension_plan,
+        recon_period). Callers drop changed_employees before returning the
+        result as JSON.
+    """
+    start_window, end_window = staging_window(month)
+    cube_engine = get_engine(name="local")
+
+    with timed("staging_pull"):
+        probe = probe_peoplesoft_window(start_window, end_window)
+        fingerprints = date_fingerprints(probe)
+        with cube_engine.begin() as connection:
+            settled = [] if full else settled_pay_end_dates(connection, start_window, end_window, fingerprints)
+        df, cache_status = cached_peoplesoft_window(start_window, end_window, settled, refresh=full, probe=probe)
+
+    with timed("staging_merge"), cube_engine.begin() as connection:
+        counts, changed = merge_staging(connection, df, start_window, end_window, settled)
+        record_watermark(connection, df, start_window, end_window, settled, fingerprints)
+        # Same transaction, so the rollup never disagrees with the staged rows
+        with timed("staging_rollup"):
+            refresh_staging_rollup(connection, start_window, end_window)
+
+    changes = staging_changes(changed)
+    with timed("staging_reconcile"):
+        reconciled = reconcile_changes(changes)
+
+    return {
+        "rows_pulled": len(df),
+        **counts,
+        "settled_dates": [d.isoformat() for d in settled],
+        "ps_cache": cache_status,
+        "reconcile": reconciled,
+        "changed_employees": changes,
+    }
+
+
+# Background staging syncs, keyed by (month, full) while they run
+_sync_executor = ThreadPoolExecutor(max_workers=STAGING_WORKERS, thread_name_prefix="staging-sync")
+_inflight: dict[tuple[str, bool], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _forget(key: tuple[str, bool], future: Future) -> None:
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def start_staging_sync(month: str, full: bool = False) -> Future:
+    """
+    Run load_staging_data for a month in the background, sharing any sync already running for it.
+
+    Imports call this before parsing so the PeopleSoft pull and the staging
+    merge overlap with the Ice Cube ingest on their own connections. The
+    staging table only depends on PeopleSoft, so uploads for the same month
+    arriving together can share one sync.
+
+    Args:
+        month (str): Recon period in 'YYYY-MM' format.
+        full (bool): Re-pull every pay end date in the window, ignoring the watermark.
+
+    Returns:
+        Future: Resolves to the load_staging_data result.
+    """
+    key = (month, full)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _sync_executor.submit(load_staging_data, month, full)
+            _inflight[key] = future
+            future.add_done_callback(lambda done: _forget(key, done))
+        return future
+
+
+def shutdown_staging() -> None:
+    """Wait for running staging syncs to finish."""
+    _sync_executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,517 @@
+"""
+Vectorized column transforms that normalize Ice Cube DataFrames for import.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from pandas.tseries.api import guess_datetime_format
+
+# Define mapping
+STRS_COLUMN_MAP = {
+    "EMPLOYEE ID": "empl_id",
+    "FIRST NAME": "first_name",
+    "LAST NAME": "last_name",
+    "CHECK DATE": "check_date",
+    "EMPLOYEE RECORD": "empl_rcd",
+    "MEMBER CODE": "member_code",
+    "EARNINGS CODE": "earnings_code",
+    "EARNINGS BEGIN": "earnings_begin",
+    "EARNINGS END": "earnings_end",
+    "EARNINGS RATE": "ern_rate",
+    "EARNINGS": "earnings",
+    "CONTRIBUTION RATE": "contribution_rate",
+    "CONTRIBUTION AMOUNT": "contribution_amt",
+    "ASSIGNMENT": "assignment",
+    "CONTRIBUTION CODE": "contribution_code",
+    "PAY CODE": "pay_code",
+    "SOURCE": "input_source",
+    "VERIFIED": "verified",
+    "STRS": "retirement_type",
+    "RECON PERIOD": "recon_period",
+    "TYPE": "assign_type",
+}
+
+PERS_COLUMN_MAP = {
+    "EMPLOYEE ID": "empl_id",
+    "FIRST NAME": "first_name",
+    "LAST NAME": "last_name",
+    "SERVICE PERIOD": "service_period",
+    "EMPLOYEE RECORD": "empl_rcd",
+    "EARNINGS CODE": "earnings_code",
+    "EARNINGS RATE": "ern_rate",
+    "EARNINGS": "earnings",
+    "CONTRIBUTION RATE": "contribution_rate",
+    "CONTRIBUTION AMOUNT": "contribution_amt",
+    "EARN CODE": "erncd",
+    "CONTRIBUTION CODE": "contribution_code",
+    "WORK SCHEDULE CODE": "work_schedule_code",
+    "SOURCE": "user_source",
+    "RECON PERIOD": "recon_period",
+}
+
+# Declarative per-plan column specs: model attribute -> (transform kind, width).
+# Width is only used by the "zfill" and "code" kinds.
+PERS_COLUMN_SPEC = {
+    "empl_id": ("zfill", 6),
+    "first_name": ("strip", None),
+    "last_name": ("strip", None),
+    "service_period": ("date", None),
+    "empl_rcd": ("zfill", 2),
+    "earnings_code": ("str", None),
+    "ern_rate": ("float", None),
+    "earnings": ("float", None),
+    "contribution_rate": ("float", None),
+    "contribution_amt": ("float", None),
+    "erncd": ("str", None),
+    "contribution_code": ("int", None),
+    "work_schedule_code": ("code", 2),
+    "user_source": ("str", None),
+    "retirement_code": ("str", None),
+    "check_date": ("date", None),
+    "recon_period": ("str", None),
+}
+
+STRS_COLUMN_SPEC = {
+    "empl_id": ("zfill", 6),
+    "first_name": ("strip", None),
+    "last_name": ("strip", None),
+    "check_date": ("date", None),
+    "empl_rcd": ("zfill", 2),
+    "member_code": ("int", None),
+    "earnings_code": ("str", None),
+    "earnings_begin": ("date", None),
+    "earnings_end": ("date", None),
+    "ern_rate": ("float", None),
+    "earnings": ("float", None),
+    "contribution_rate": ("float", None),
+    "contribution_amt": ("float", None),
+    "assignment": ("int", None),
+    "contribution_code": ("int", None),
+    "pay_code": ("int", None),
+    "input_source": ("str", None),
+    "retirement_type": ("str", None),
+    "verified": ("flag", None),
+    "recon_period": ("str", None),
+    "assign_type": ("str", None),
+}
+
+# Compact string dtype for high-cardinality text; pyarrow-backed when pyarrow is installed
+TEXT_DTYPE = "string[pyarrow]" if find_spec("pyarrow") else "string"
+
+# Per-plan in-memory dtype plan applied once a chunk is transformed. Code
+# columns repeat a handful of values and become categoricals, ids and names
+# compact strings; columns not listed keep their transform dtype (nullable
+# Int64/Float64/boolean, datetime64 for dates).
+PERS_DTYPES = {
+    "empl_id": TEXT_DTYPE,
+    "first_name": TEXT_DTYPE,
+    "last_name": TEXT_DTYPE,
+    "empl_rcd": "category",
+    "earnings_code": "category",
+    "erncd": "category",
+    "contribution_code": "category",
+    "work_schedule_code": "category",
+    "user_source": "category",
+    "retirement_code": "category",
+    "recon_period": "category",
+}
+
+STRS_DTYPES = {
+    "empl_id": TEXT_DTYPE,
+    "first_name": TEXT_DTYPE,
+    "last_name": TEXT_DTYPE,
+    "empl_rcd": "category",
+    "member_code": "category",
+    "earnings_code": "category",
+    "contribution_code": "category",
+    "pay_code": "category",
+    "input_source": "category",
+    "retirement_type": "category",
+    "recon_period": "category",
+    "assign_type": "category",
+}
+
+# Columns identifying one Ice Cube line within a recon_period, used for diff imports
+PERS_BUSINESS_KEY = [
+    "empl_id", "empl_rcd", "service_period", "earnings_code", "erncd",
+    "contribution_code", "work_schedule_code",
+]
+STRS_BUSINESS_KEY = [
+    "empl_id", "empl_rcd", "check_date", "earnings_code", "earnings_begin",
+    "earnings_end", "member_code", "assignment", "contribution_code", "pay_code",
+]
+
+COLUMN_MAPS = {"PERS": PERS_COLUMN_MAP, "STRS": STRS_COLUMN_MAP}
+COLUMN_SPECS = {"PERS": PERS_COLUMN_SPEC, "STRS": STRS_COLUMN_SPEC}
+BUSINESS_KEYS = {"PERS": PERS_BUSINESS_KEY, "STRS": STRS_BUSINESS_KEY}
+DTYPE_PLANS = {"PERS": PERS_DTYPES, "STRS": STRS_DTYPES}
+
+# Header -> plans whose export has it; a header of only one plan identifies that plan
+HEADER_PLANS = {
+    header: frozenset(plan for plan, column_map in COLUMN_MAPS.items() if header in column_map)
+    for column_map in COLUMN_MAPS.values()
+    for header in column_map
+}
+
+# Columns an upload must have, since reconciliation totals contributions per
+# employee; any other mapped column that is missing is reported and left empty
+REQUIRED_COLUMNS = {plan: {"empl_id", "contribution_amt"} for plan in COLUMN_MAPS}
+
+# Distinct date strings whose parse is remembered across chunks and imports
+DATE_CACHE_SIZE = 4096
+
+# Bad date values listed in an import summary; any beyond are only counted
+DATE_ERROR_SAMPLE = 100
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    """Render every non-null value with str(), leaving nulls as None."""
+    return series.astype(str).where(series.notna(), None)
+
+
+def _as_stripped(series: pd.Series, width=None) -> pd.Series:
+    text = _as_text(series)
+    return text.str.strip().where(text.notna(), None)
+
+
+def _as_zfilled(series: pd.Series, width: int) -> pd.Series:
+    text = _as_text(series)
+    return text.str.zfill(width).where(text.notna(), None)
+
+
+def _as_float(series: pd.Series, width=None) -> pd.Series:
+    return pd.to_numeric(series).astype("Float64")
+
+
+def _as_int(series: pd.Series, width=None) -> pd.Series:
+    return np.trunc(pd.to_numeric(series).astype("float64")).astype("Int64")
+
+
+def _as_flag(series: pd.Series, width=None) -> pd.Series:
+    numbers = _as_int(series)
+    return (numbers != 0).astype("boolean")
+
+
+def _as_code(series: pd.Series, width: int) -> pd.Series:
+    """
+    Column-wise equivalent of recon_import.clean_code.
+
+    Numeric values are truncated to an unpadded integer string; anything else
+    is stripped and zero-padded to width.
+    """
+    if is_numeric_dtype(series):
+        return _as_text(_as_int(series)).where(series.notna(), None)
+    numeric = series.map(lambda val: isinstance(val, (int, float)) and pd.notna(val)).astype(bool)
+    codes = _as_zfilled(_as_stripped(series), width)
+    if numeric.any():
+        codes[numeric] = _as_text(_as_int(series[numeric]))
+    return codes.where(series.notna(), None)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_text(text: str):
+    """
+    Parse one date string without a format hint, remembering the result per distinct string.
+
+    Args:
+        text (str): Stripped cell text.
+
+    Returns:
+        pd.Timestamp: The date at midnight, or NaT when the text is not a date.
+    """
+    try:
+        parsed = pd.Timestamp(text)
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    if pd.isna(parsed):
+        return pd.NaT
+    return parsed.tz_localize(None).normalize()
+
+
+def _parse_date_texts(texts: pd.Series) -> np.ndarray:
+    # Each distinct text is converted once: with the format inferred from the
+    # first one in a single call, and through parse_date_text if it doesn't fit
+    codes, distinct = pd.factorize(texts)
+    if not len(distinct):
+        return np.full(len(texts), np.datetime64("NaT"), dtype="datetime64[ns]")
+    parsed = np.full(len(distinct), np.datetime64("NaT"), dtype="datetime64[ns]")
+    date_format = guess_datetime_format(next((text.strip() for text in distinct if text.strip()), ""))
+    if date_format is not None:
+        converted = pd.to_datetime(pd.Series(distinct), format=date_format, errors="coerce", cache=False)
+        if converted.dt.tz is not None:
+            converted = converted.dt.tz_localize(None)
+        parsed = converted.to_numpy(dtype="datetime64[ns]")
+    misses = np.isnat(parsed)
+    if misses.any():
+        parsed[misses] = pd.Series([parse_date_text(text.strip()) for text in distinct[misses]], dtype="datetime64[ns]").to_numpy()
+    return np.where(codes >= 0, parsed[codes], np.datetime64("NaT"))
+
+
+def parse_dates(series: pd.Series, column: str | None = None, errors: list | None = None) -> pd.Series:
+    """
+    Parse a column to midnight-normalized datetime64 in whole-column operations.
+
+    datetime64 columns are only normalized, and columns of date or datetime
+    cells convert in one call. Text columns convert with the format inferred
+    from their first value; text that doesn't fit it goes through the
+    bounded parse_date_text cache once per distinct value. Only columns that
+    mix cell types are split by type first. Blank cells become NaT. Any
+    other value that is not a date, numbers included, becomes NaT too and,
+    when errors is given, is reported there.
+
+    Args:
+        series (pd.Series): Raw column.
+        column (str): Column name used in the error entries.
+        errors (list): Receives {"row", "column", "value"} per bad value, with
+            row the 1-based position in the series.
+
+    Returns:
+        pd.Series: datetime64[ns] column on the same index.
+    """
+    if is_datetime64_any_dtype(series):
+        return series.dt.normalize()
+    values = pd.Series(series.to_numpy(dtype=object), dtype=object)
+    present = values.notna().to_numpy()
+    kind = infer_dtype(values, skipna=True)
+    if kind in ("date", "datetime"):
+        parsed = pd.to_datetime(values, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    elif kind == "string":
+        parsed = _parse_date_texts(values)
+    else:
+        parsed = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+        temporal = values.map(lambda value: isinstance(value, (date, datetime))).to_numpy(dtype=bool)
+        text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+        if temporal.any():
+            parsed[temporal] = pd.to_datetime(values[temporal], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        if text.any():
+            parsed[text] = _parse_date_texts(values[text].reset_index(drop=True))
+
+    if errors is not None:
+        for position in np.flatnonzero(np.isnat(parsed) & present):
+            value = values.iloc[position]
+            if not (isinstance(value, str) and not value.strip()):
+                errors.append({"row": int(position) + 1, "column": column, "value": str(value)})
+    return pd.Series(parsed, index=series.index).dt.normalize()
+
+
+def collect_date_errors(report: dict, errors: list, first_row: int = 0) -> dict:
+    """
+    Add one chunk's date errors to an import's date error report.
+
+    Args:
+        report (dict): Report with a count and the first DATE_ERROR_SAMPLE
+            rows, as started by {"count": 0, "rows": []}.
+        errors (list): Entries from parse_dates for the chunk.
+        first_row (int): Data rows of the file before the chunk.
+
+    Returns:
+        dict: The updated report.
+    """
+    report["count"] += len(errors)
+    room = max(DATE_ERROR_SAMPLE - len(report["rows"]), 0)
+    report["rows"].extend({**error, "row": error["row"] + first_row} for error in errors[:room])
+    return report
+
+
+TRANSFORMS = {
+    "str": lambda series, width: _as_text(series),
+    "strip": _as_stripped,
+    "zfill": _as_zfilled,
+    "float": _as_float,
+    "int": _as_int,
+    "flag": _as_flag,
+    "code": _as_code,
+    "date": lambda series, width: parse_dates(series),
+}
+
+
+def rename_columns(df: pd.DataFrame, column_map: dict) -> pd.DataFrame:
+    """
+    Normalize raw Ice Cube headers (strip/upper-case) and map them to model attributes.
+
+    Args:
+        df (pd.DataFrame): DataFrame as parsed from the uploaded file.
+        column_map (dict): PERS_COLUMN_MAP or STRS_COLUMN_MAP.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with renamed columns.
+    """
+    df.columns = [col.strip().upper() for col in df.columns]
+    return df.rename(columns=column_map)
+
+
+def check_headers(headers, pension_plan: str | None = None) -> dict:
+    """
+    Validate an upload's header row before its rows are parsed.
+
+    The plan is classified by counting the file's headers that belong to a
+    single plan in HEADER_PLANS, one dict lookup per header. The headers are
+    then compared with the plan's column map.
+
+    Args:
+        headers: Column labels exactly as they appear in the file.
+        pension_plan (str): Plan chosen for the upload; the detected plan is
+            used when None.
+
+    Returns:
+        dict: pension_plan (the plan to import as), detected_plan, missing
+        (mapped headers not in the file), unknown (headers no plan maps, so
+        ignored) and error, the reason to reject the file or None.
+    """
+    normalized = [str(header).strip().upper() for header in headers]
+    votes = {plan: 0 for plan in COLUMN_MAPS}
+    for header in normalized:
+        plans = HEADER_PLANS.get(header, ())
+        if len(plans) == 1:
+            votes[next(iter(plans))] += 1
+    ranked = sorted(votes, key=votes.get, reverse=True)
+    detected_plan = ranked[0] if votes[ranked[0]] > votes[ranked[1]] else None
+
+    plan = pension_plan or detected_plan
+    column_map = COLUMN_MAPS.get(plan, {})
+    present = set(normalized)
+    result = {
+        "pension_plan": plan,
+        "detected_plan": detected_plan,
+        "missing": [header for header, column in column_map.items() if column != "recon_period" and header not in present],
+        "unknown": [str(label) for header, label in zip(normalized, headers) if header not in HEADER_PLANS],
+        "error": None,
+    }
+    required = [header for header in result["missing"] if column_map[header] in REQUIRED_COLUMNS.get(plan, ())]
+    if not normalized:
+        result["error"] = "The file has no header row."
+    elif plan is None:
+        result["error"] = "Could not detect the pension plan; pass pension_plan as 'PERS' or 'STRS'."
+    elif plan not in COLUMN_MAPS:
+        result["error"] = "Invalid pension_plan. Use 'PERS' or 'STRS'."
+    elif detected_plan and detected_plan != plan:
+        result["error"] = f"Detected file type '{detected_plan}' does not match provided pension_plan '{plan}'."
+    elif required:
+        result["error"] = f"Missing required {plan} columns: {', '.join(required)}."
+    return result
+
+
+def text_headers(headers, pension_plan: str, kinds: tuple = ("str", "strip", "zfill")) -> list:
+    """
+    Raw headers whose target column is rendered as text by the plan's column spec.
+
+    Parsing these as strings keeps chunked reads stable: a chunk with a blank
+    cell would otherwise be inferred as float and render "123" as "123.0".
+
+    Args:
+        headers: Column labels exactly as they appear in the file.
+        pension_plan (str): 'PERS' or 'STRS'.
+        kinds (tuple): Column spec kinds to include.
+
+    Returns:
+        list: The subset of headers to read with dtype=str.
+    """
+    column_map = COLUMN_MAPS.get(pension_plan, {})
+    spec = COLUMN_SPECS.get(pension_plan, {})
+    return [
+        header for header in headers
+        if spec.get(column_map.get(str(header).strip().upper()), (None,))[0] in kinds
+    ]
+
+
+def normalize_frame(df: pd.DataFrame, parsed_date: date, pension_plan: str, compact: bool = True, date_errors: list | None = None) -> pd.DataFrame:
+    """
+    Apply the plan's column spec to a raw Ice Cube DataFrame in whole-column operations.
+
+    Args:
+        df (pd.DataFrame): DataFrame loaded from the uploaded file.
+        parsed_date (date): The reporting month parsed as a date.
+        pension_plan (str): 'PERS' or 'STRS'.
+        compact (bool): Apply the plan's dtype plan (DTYPE_PLANS); without it
+            text columns stay object dtype.
+        date_errors (list): Receives one entry per value of a date column
+            that is not a date (see parse_dates).
+
+    Returns:
+        pd.DataFrame: One column per model attribute, typed with nullable
+        pandas dtypes (categoricals and strings per the dtype plan, Int64,
+        Float64, boolean, datetime64), plus the row_key and row_hash columns
+        from add_row_hashes.
+    """
+    df = rename_columns(df, COLUMN_MAPS[pension_plan])
+    if pension_plan == "PERS":
+        df["check_date"] = parsed_date
+    df["recon_period"] = parsed_date.strftime("%Y-%m")
+
+    columns = {}
+    for column, (kind, width) in COLUMN_SPECS[pension_plan].items():
+        source = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if kind == "date":
+            columns[column] = parse_dates(source, column, date_errors)
+        else:
+            columns[column] = TRANSFORMS[kind](source, width)
+    frame = pd.DataFrame(columns, index=df.index)
+    if compact:
+        frame = frame.astype(DTYPE_PLANS[pension_plan])
+    return add_row_hashes(frame, pension_plan)
+
+
+def hash_columns(frame: pd.DataFrame, columns: list) -> np.ndarray:
+    """
+    Hash the given columns of each row to a signed 64-bit integer.
+
+    Columns are first brought to a canonical representation (categoricals
+    as their category values, datetime64 as int64, numbers and flags as
+    float64, everything else as object) so the hash depends on the values,
+    not on the pandas dtype carrying them.
+
+    Args:
+        frame (pd.DataFrame): Normalized frame.
+        columns (list): Columns to include, in a fixed order.
+
+    Returns:
+        np.ndarray: int64 hash per row.
+    """
+    canonical = {}
+    for column in columns:
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(series.cat.categories.dtype)
+        if is_datetime64_any_dtype(series):
+            canonical[column] = series.to_numpy(dtype="datetime64[ns]").view("int64")
+        elif is_numeric_dtype(series) or is_bool_dtype(series):
+            canonical[column] = series.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            canonical[column] = series.astype(object).where(series.notna(), None).to_numpy()
+    hashed = pd.util.hash_pandas_object(pd.DataFrame(canonical, index=frame.index), index=False)
+    return hashed.to_numpy().view("int64")
+
+
+def add_row_hashes(frame: pd.DataFrame, pension_plan: str) -> pd.DataFrame:
+    """
+    Add row_key (business key hash) and row_hash (full content hash) columns.
+
+    Args:
+        frame (pd.DataFrame): Output of normalize_frame.
+        pension_plan (str): 'PERS' or 'STRS'.
+
+    Returns:
+        pd.DataFrame: The same frame with row_key and row_hash added.
+    """
+    frame["row_key"] = hash_columns(frame, BUSINESS_KEYS[pension_plan])
+    frame["row_hash"] = hash_columns(frame, list(COLUMN_SPECS[pension_plan]))
+    return frame
+
+
+def frame_to_records(frame: pd.DataFrame) -> list[dict]:
+    """
+    Convert a normalized frame to row dicts of plain Python values.
+
+    Dates come back as datetime.date, nullable numbers as int/float/bool and
+    every missing value as None.
+    """
+    frame = frame.copy()
+    for column in frame.columns:
+        if is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.date
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict("records")
@@ -0,0 +1,85 @@
+"""
+Compare reloading an import from the Parquet archive with reparsing its XLSX upload.
+
+Usage:
+    python -m benchmarks.archive_replay --rows 10000,100000 --plans PERS,STRS
+
+For each plan and size a synthetic workbook is parsed and normalized through
+the import readers (openpyxl unless --engine says otherwise), archived with
+app.archive.BatchArchive, and read back with read_batch. The script prints
+both timings, the speedup and the XLSX vs Parquet file sizes. Nothing touches
+a database; only the parse/transform work that a replay skips is measured.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from app.archive import BatchArchive, read_batch
+from app.readers import iter_xlsx_chunks
+from app.transform import normalize_frame
+from benchmarks.synthetic import synthetic_frame, write_xlsx
+
+
+def measure(pension_plan: str, rows: int, month: str, engine: str, workdir: str) -> dict:
+    """
+    Time the XLSX path and the archive path for one synthetic upload.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        rows (int): Rows in the synthetic file.
+        month (str): Recon period in 'YYYY-MM' format.
+        engine (str): XLSX engine passed to iter_xlsx_chunks.
+        workdir (str): Directory for the workbook and the archive.
+
+    Returns:
+        dict: Seconds for each path, their ratio and both file sizes in bytes.
+    """
+    parsed_date = datetime.strptime(month, "%Y-%m")
+    path = os.path.join(workdir, f"{pension_plan}_{rows}.xlsx")
+    write_xlsx(synthetic_frame(pension_plan, rows, parsed_date.date()), path)
+
+    started = time.perf_counter()
+    with open(path, "rb") as stream:
+        frames = [normalize_frame(chunk, parsed_date, pension_plan) for chunk in iter_xlsx_chunks(stream, pension_plan, engine=engine)]
+    xlsx_seconds = time.perf_counter() - started
+
+    with BatchArchive(pension_plan, month, root=os.path.join(workdir, "archive")) as archive:
+        for frame in frames:
+            archive.write(frame)
+        batch = archive.publish()
+
+    started = time.perf_counter()
+    replayed = sum(len(frame) for frame in read_batch(batch["path"]))
+    parquet_seconds = time.perf_counter() - started
+    assert replayed == rows
+
+    return {
+        "xlsx_seconds": round(xlsx_seconds, 4),
+        "parquet_seconds": round(parquet_seconds, 4),
+        "speedup": round(xlsx_seconds / parquet_seconds, 1),
+        "xlsx_bytes": os.path.getsize(path),
+        "parquet_bytes": os.path.getsize(batch["path"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="Comma-separated file sizes.")
+    parser.add_argument("--plans", default="PERS,STRS", help="Comma-separated pension plans.")
+    parser.add_argument("--month", default="2024-04", help="Recon period the synthetic rows belong to.")
+    parser.add_argument("--engine", default="openpyxl", help="XLSX engine for the reparse path: openpyxl, calamine or auto.")
+    args = parser.parse_args()
+
+    print(f"{'plan':>5} {'rows':>9} {'xlsx s':>8} {'parquet s':>10} {'speedup':>8} {'xlsx MB':>8} {'parquet MB':>11}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for pension_plan in args.plans.split(","):
+            for rows in (int(size) for size in args.rows.split(",")):
+                result = measure(pension_plan, rows, args.month, args.engine, workdir)
+                print(f"{pension_plan:>5} {rows:>9} {result['xlsx_seconds']:>8.2f} {result['parquet_seconds']:>10.3f} "
+                      f"{result['speedup']:>7}x {result['xlsx_bytes'] / 1e6:>8.2f} {result['parquet_bytes'] / 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measure the in-memory size of Ice Cube frames with and without the dtype plan.
+
+Usage:
+    python -m benchmarks.frame_memory --rows 10000,100000 --plans PERS,STRS
+
+For each plan and size a synthetic CSV is parsed through the import readers
+and normalized twice: with the plan's dtype plan (transform.DTYPE_PLANS) and
+with compact=False, which leaves every text column as object dtype. The
+script prints the deep memory usage per row of the parsed frame and of both
+normalized frames, the saving of the dtype plan and both transform times.
+Nothing touches a database.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from app.readers import open_chunks
+from app.transform import normalize_frame
+from benchmarks.synthetic import synthetic_frame, write_csv
+
+
+def bytes_per_row(frame) -> float:
+    """Deep memory usage of a frame divided by its row count."""
+    return frame.memory_usage(deep=True).sum() / len(frame)
+
+
+def measure(pension_plan: str, rows: int, month: str, workdir: str) -> dict:
+    """
+    Parse one synthetic upload and size its normalized frame with and without the dtype plan.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        rows (int): Rows in the synthetic file.
+        month (str): Recon period in 'YYYY-MM' format.
+        workdir (str): Directory for the CSV.
+
+    Returns:
+        dict: Bytes per row of the parsed, object-dtype and compact frames,
+        the saving in percent and the seconds each normalization took.
+    """
+    parsed_date = datetime.strptime(month, "%Y-%m")
+    path = os.path.join(workdir, f"{pension_plan}_{rows}.csv")
+    write_csv(synthetic_frame(pension_plan, rows, parsed_date.date()), path)
+    with open(path, "rb") as stream:
+        raw = next(open_chunks(stream, path, pension_plan))
+    parsed = bytes_per_row(raw)
+
+    started = time.perf_counter()
+    wide = normalize_frame(raw.copy(), parsed_date, pension_plan, compact=False)
+    wide_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    compact = normalize_frame(raw.copy(), parsed_date, pension_plan)
+    compact_seconds = time.perf_counter() - started
+    assert (wide["row_hash"] == compact["row_hash"]).all()
+
+    return {
+        "parsed_bytes_per_row": round(parsed, 1),
+        "object_bytes_per_row": round(bytes_per_row(wide), 1),
+        "compact_bytes_per_row": round(bytes_per_row(compact), 1),
+        "saving_percent": round(100 * (1 - bytes_per_row(compact) / bytes_per_row(wide)), 1),
+        "object_seconds": round(wide_seconds, 4),
+        "compact_seconds": round(compact_seconds, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="Comma-separated file sizes.")
+    parser.add_argument("--plans", default="PERS,STRS", help="Comma-separated pension plans.")
+    parser.add_argument("--month", default="2024-04", help="Recon period the synthetic rows belong to.")
+    args = parser.parse_args()
+
+    print(f"{'plan':>5} {'rows':>9} {'parsed B/row':>13} {'object B/row':>13} {'compact B/row':>14} {'saving':>7} {'object s':>9} {'compact s':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for pension_plan in args.plans.split(","):
+            for rows in (int(size) for size in args.rows.split(",")):
+                result = measure(pension_plan, rows, args.month, workdir)
+                print(f"{pension_plan:>5} {rows:>9} {result['parsed_bytes_per_row']:>13} {result['object_bytes_per_row']:>13} "
+                      f"{result['compact_bytes_per_row']:>14} {result['saving_percent']:>6}% {result['object_seconds']:>9.3f} "
+                      f"{result['compact_seconds']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark the full Ice Cube import path on synthetic PERS and STRS files.
+
+Usage:
+    python -m benchmarks.import_path --rows 1000,10000,100000,1000000 --output results.json
+    python -m benchmarks.import_path --rows 10000 --baseline results.json
+
+Every plan, format and size runs in a fresh process against a throwaway
+SQLite database, with an empty SQLite PeopleSoft stand-in for the staging
+sync. Per-phase seconds, rows/s and peak RSS come from the import's
+app.metrics instrumentation. Results are written as JSON so runs can be
+compared over time; --baseline prints the rows/s ratio against an earlier
+results file.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue as queues
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+from app.readers import available_xlsx_engines
+from benchmarks.synthetic import synthetic_frame, write_csv, write_xlsx
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+# Empty PeopleSoft tables so load_staging_data runs its real query against SQLite
+PS_SCHEMA = """
+CREATE TABLE PS_PAY_CHECK (EMPLID TEXT, PAY_END_DT DATE, PAGE_NUM INT, LINE_NUM INT, PAYGROUP TEXT, OFF_CYCLE TEXT, SEPCHK INT);
+CREATE TABLE PS_PAY_DEDUCTION (PAGE_NUM INT, LINE_NUM INT, PAY_END_DT DATE, PAYGROUP TEXT, OFF_CYCLE TEXT, SEPCHK INT, DEDCD TEXT, DED_CLASS TEXT, DED_CUR REAL, PLAN_TYPE TEXT);
+"""
+
+
+def _run_import(path: str, pension_plan: str, month: str, workdir: str, chunked_csv: bool, queue) -> None:
+    # Configure the stand-in databases before app.db creates its engines
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'recon.db')}"
+    os.environ["PS_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'ps.db')}"
+    import sqlite3
+
+    from app.db import SessionLocal, engine
+    from app.metrics import timed, track_import
+    from app.models import Base
+    from app.readers import open_chunks
+    from app.routes.recon_import import process_ice_cube_chunks
+
+    with sqlite3.connect(os.path.join(workdir, "ps.db")) as ps:
+        ps.executescript(PS_SCHEMA)
+    Base.metadata.create_all(engine)
+
+    parsed_date = datetime.strptime(month, "%Y-%m")
+    db = SessionLocal()
+    try:
+        with track_import(pension_plan, month, os.path.basename(path), os.path.getsize(path)) as metrics, open(path, "rb") as stream:
+            with timed("parse", metrics):
+                chunks = open_chunks(stream, path, pension_plan, chunked_csv)
+            process_ice_cube_chunks(chunks, parsed_date, pension_plan, db, metrics=metrics)
+    finally:
+        db.close()
+    queue.put({
+        "rows": metrics.rows,
+        "bytes": metrics.size_bytes,
+        "seconds": time.perf_counter() - metrics.started,
+        "phases": dict(metrics.phases),
+        "phase_peak_rss": dict(metrics.phase_peak_rss),
+    })
+
+
+def measure(path: str, pension_plan: str, month: str, chunked_csv: bool = False) -> dict:
+    """
+    Import one file in a fresh process and collect its per-phase figures.
+
+    Args:
+        path (str): CSV or XLSX file to import.
+        pension_plan (str): 'PERS' or 'STRS'.
+        month (str): Recon period in 'YYYY-MM' format.
+        chunked_csv (bool): Stream CSV files in chunks.
+
+    Returns:
+        dict: rows, bytes, total seconds and rows/s, plus seconds, rows/s and
+        peak RSS in MB for each phase.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        process = context.Process(target=_run_import, args=(path, pension_plan, month, workdir, chunked_csv, queue))
+        process.start()
+        while True:
+            try:
+                raw = queue.get(timeout=1)
+                break
+            except queues.Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f"Import of {path} failed with exit code {process.exitcode}")
+        process.join()
+
+    rows = raw["rows"]
+    return {
+        "rows": rows,
+        "bytes": raw["bytes"],
+        "seconds": round(raw["seconds"], 4),
+        "rows_per_s": round(rows / raw["seconds"]) if raw["seconds"] else None,
+        "peak_rss_mb": round(max(raw["phase_peak_rss"].values(), default=0) / (1 << 20), 1),
+        "phases": {
+            phase: {
+                "seconds": round(seconds, 4),
+                "rows_per_s": round(rows / seconds) if seconds else None,
+                "peak_rss_mb": round(raw["phase_peak_rss"][phase] / (1 << 20), 1),
+            }
+            for phase, seconds in raw["phases"].items()
+        },
+    }
+
+
+def _baseline_rates(path: str) -> dict:
+    with open(path) as handle:
+        previous = json.load(handle)
+    return {(run["pension_plan"], run["format"], run["rows"]): run["rows_per_s"] for run in previous["runs"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000,100000,1000000", help="Comma-separated file sizes.")
+    parser.add_argument("--plans", default="PERS,STRS", help="Comma-separated pension plans.")
+    parser.add_argument("--formats", default="csv,xlsx", help="Comma-separated file formats.")
+    parser.add_argument("--month", default="2024-04", help="Recon period the synthetic rows belong to.")
+    parser.add_argument("--stream", action="store_true", help="Stream CSV files in chunks.")
+    parser.add_argument("--output", default=None, help="JSON results path (default: import_path_<timestamp>.json).")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare rows/s against.")
+    args = parser.parse_args()
+
+    baseline = _baseline_rates(args.baseline) if args.baseline else {}
+    month = datetime.strptime(args.month, "%Y-%m").date()
+    runs = []
+    print(f"{'plan':>5} {'format':>6} {'rows':>9} {'seconds':>9} {'rows/s':>9} {'peak MB':>8} {'vs base':>8}  slowest phases")
+    with tempfile.TemporaryDirectory() as workdir:
+        for pension_plan in args.plans.split(","):
+            for rows in (int(size) for size in args.rows.split(",")):
+                df = synthetic_frame(pension_plan, rows, month)
+                for file_format in args.formats.split(","):
+                    path = os.path.join(workdir, f"{pension_plan}_{rows}.{file_format}")
+                    WRITERS[file_format](df, path)
+                    result = measure(path, pension_plan, args.month, args.stream)
+                    os.remove(path)
+                    runs.append({"pension_plan": pension_plan, "format": file_format, **result})
+
+                    previous = baseline.get((pension_plan, file_format, result["rows"]))
+                    ratio = f"{result['rows_per_s'] / previous:.2f}x" if previous else "-"
+                    slowest = sorted(result["phases"].items(), key=lambda item: -item[1]["seconds"])[:3]
+                    phases = ", ".join(f"{phase} {stats['seconds']:.2f}s" for phase, stats in slowest)
+                    print(f"{pension_plan:>5} {file_format:>6} {result['rows']:>9} {result['seconds']:>9.2f} "
+                          f"{result['rows_per_s']:>9} {result['peak_rss_mb']:>8.0f} {ratio:>8}  {phases}")
+
+    output = args.output or f"import_path_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as handle:
+        json.dump({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "stream_csv": args.stream,
+            "xlsx_engines": available_xlsx_engines(),
+            "runs": runs,
+        }, handle, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
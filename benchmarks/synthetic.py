@@ -0,0 +1,98 @@
+"""
+Synthetic Ice Cube export generator for benchmarks.
+
+Frames use the real PERS/STRS headers and the value shapes each column's
+transform expects, so the full parse and transform path does realistic work.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from app.transform import COLUMN_MAPS, COLUMN_SPECS
+
+FIRST_NAMES = ["MARIA", "JOSE", "JENNIFER", "MICHAEL", "LINDA", "DAVID", "PATRICIA", "ROBERT", "ANA", "JAMES"]
+LAST_NAMES = ["GARCIA", "SMITH", "HERNANDEZ", "JOHNSON", "LOPEZ", "WILLIAMS", "MARTINEZ", "BROWN", "NGUYEN", "DAVIS"]
+
+# Small vocabularies for code-like text columns; anything else falls back to CODES
+VOCABULARIES = {
+    "earnings_code": ["REG", "OVT", "SUB", "STP", "XTR", "SUM", "RET"],
+    "erncd": ["RGS", "OTS", "SBS", "STS"],
+    "input_source": ["ICE CUBE", "MANUAL", "ADJUSTMENT"],
+    "user_source": ["ICE CUBE", "MANUAL", "ADJUSTMENT"],
+    "retirement_type": ["DB", "CB", "DBS"],
+    "assign_type": ["C", "S", "A"],
+    "recon_period": [None],
+}
+CODES = ["A", "B", "C", "D"]
+
+
+def _column_values(attr: str, kind: str, rows: int, month: date, rng: np.random.Generator):
+    if attr == "empl_id":
+        return rng.integers(1, 250000, rows)
+    if attr == "empl_rcd":
+        return rng.integers(0, 4, rows)
+    if kind == "strip":
+        names = FIRST_NAMES if attr == "first_name" else LAST_NAMES
+        return np.array(names, dtype=object)[rng.integers(0, len(names), rows)]
+    if kind == "str":
+        vocab = VOCABULARIES.get(attr, CODES)
+        return np.array(vocab, dtype=object)[rng.integers(0, len(vocab), rows)]
+    if kind == "date":
+        start = pd.Timestamp(month) - pd.Timedelta(days=31)
+        return (start + pd.to_timedelta(rng.integers(0, 62, rows), unit="D")).to_numpy()
+    if kind == "float":
+        values = np.round(rng.gamma(2.0, 1500.0, rows), 2)
+        values[rng.random(rows) < 0.02] = np.nan
+        return values
+    if kind == "int":
+        return rng.integers(1, 30, rows)
+    if kind == "flag":
+        return rng.integers(0, 2, rows)
+    if kind == "code":
+        return rng.integers(1, 6, rows)
+    raise ValueError(f"No generator for column kind '{kind}'")
+
+
+def synthetic_frame(pension_plan: str, rows: int, month: date = date(2024, 4, 1), seed: int = 0) -> pd.DataFrame:
+    """
+    Build a DataFrame shaped like an Ice Cube export for the given plan.
+
+    Args:
+        pension_plan (str): 'PERS' or 'STRS'.
+        rows (int): Number of data rows.
+        month (date): Reporting month the dates cluster around.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        pd.DataFrame: Columns named with the raw Ice Cube headers.
+    """
+    rng = np.random.default_rng(seed)
+    spec = COLUMN_SPECS[pension_plan]
+    columns = {}
+    for header, attr in COLUMN_MAPS[pension_plan].items():
+        if attr == "recon_period":
+            continue
+        columns[header] = _column_values(attr, spec[attr][0], rows, month, rng)
+    return pd.DataFrame(columns)
+
+
+def write_csv(df: pd.DataFrame, path: str) -> None:
+    """Write a synthetic frame as an Ice Cube style CSV."""
+    df.to_csv(path, index=False)
+
+
+def write_xlsx(df: pd.DataFrame, path: str) -> None:
+    """
+    Write a synthetic frame as a single-sheet workbook.
+
+    Uses openpyxl's write-only mode so million-row workbooks can be generated
+    without holding the sheet in memory.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        sheet.append([val.to_pydatetime() if isinstance(val, pd.Timestamp) else val for val in row])
+    workbook.save(path)
@@ -0,0 +1,75 @@
+"""
+Compare XLSX reader engines on synthetic Ice Cube workbooks.
+
+Usage:
+    python -m benchmarks.xlsx_readers --rows 10000,100000,1000000
+
+Each engine runs in its own process so peak RSS is measured per engine.
+"read_excel" is the previous pd.read_excel path; the others stream through
+app.readers.iter_xlsx_chunks.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import pandas as pd
+
+from app.readers import available_xlsx_engines, iter_xlsx_chunks
+from benchmarks.synthetic import synthetic_frame, write_xlsx
+
+
+def _run_engine(engine: str, path: str, pension_plan: str, queue) -> None:
+    started = time.perf_counter()
+    with open(path, "rb") as stream:
+        if engine == "read_excel":
+            rows = len(pd.read_excel(stream))
+        else:
+            rows = sum(len(chunk) for chunk in iter_xlsx_chunks(stream, pension_plan, engine=engine))
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is reported in kilobytes on Linux
+    queue.put({"rows": rows, "seconds": elapsed, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+
+def measure(engine: str, path: str, pension_plan: str) -> dict:
+    """
+    Read a workbook with one engine in a fresh process.
+
+    Args:
+        engine (str): 'read_excel', 'openpyxl' or 'calamine'.
+        path (str): Workbook path.
+        pension_plan (str): 'PERS' or 'STRS'.
+
+    Returns:
+        dict: rows read, elapsed seconds and peak RSS in MB.
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_engine, args=(engine, path, pension_plan, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="Comma-separated workbook sizes.")
+    parser.add_argument("--plan", default="STRS", choices=["PERS", "STRS"])
+    parser.add_argument("--engines", default=None, help="Comma-separated engines (default: read_excel plus every installed engine).")
+    args = parser.parse_args()
+
+    engines = args.engines.split(",") if args.engines else ["read_excel"] + available_xlsx_engines()
+    print(f"{'rows':>10} {'engine':>12} {'seconds':>9} {'rows/s':>10} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in (int(size) for size in args.rows.split(",")):
+            path = os.path.join(workdir, f"{args.plan}_{rows}.xlsx")
+            write_xlsx(synthetic_frame(args.plan, rows), path)
+            for engine in engines:
+                result = measure(engine, path, args.plan)
+                print(f"{rows:>10} {engine:>12} {result['seconds']:>9.2f} {result['rows'] / result['seconds']:>10.0f} {result['peak_rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
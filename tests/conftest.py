@@ -0,0 +1,36 @@
+"""
+Shared test setup: the app's engines point at a throwaway SQLite database.
+
+app.db creates its engine when first imported, so DATABASE_URL is set here,
+before any test module imports the app, and always overrides .env so the
+suite never touches a real database.
+"""
+import os
+import tempfile
+
+import pytest
+
+_WORKDIR = tempfile.TemporaryDirectory(prefix="ice-cube-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORKDIR.name, 'tests.db')}"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Engine of the test database with the schema from app.models."""
+    from app.db import get_engine
+    from app.models import Base
+
+    engine = get_engine("local")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    """TestClient of the app; used without its lifespan, so the job pools outlive each test."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
@@ -0,0 +1,19 @@
+"""
+The archive listing and the PeopleSoft cache stats need the X-Passphrase header.
+"""
+import pytest
+
+from app.config import PASSPHRASE
+
+URLS = ["/api/archive/batches", "/api/admin/ps-cache"]
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_passphrase_is_required(client, url):
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers={"X-Passphrase": "wrong"}).status_code == 403
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_passphrase_is_accepted(client, url):
+    assert client.get(url, headers={"X-Passphrase": PASSPHRASE}).status_code == 200
@@ -0,0 +1,72 @@
+"""
+Exports round-trip: the gzip CSV and Arrow files hold the rows stored.
+
+A few STRS rows with dates, floats, booleans and NULLs are exported through
+the app in two-row chunks, so every file is encoded in several pieces.
+"""
+import csv
+import gzip
+import io
+from datetime import date
+from functools import partial
+
+import pytest
+from sqlalchemy import delete, insert
+
+from app.config import PASSPHRASE
+from app.export import export_columns, export_formats, stream_export
+from app.models import IceCubeReconStrs
+
+RECON_PERIOD = "2022-09"
+URL = "/api/export/ICE_CUBE_RECON_STRS"
+HEADERS = {"X-Passphrase": PASSPHRASE}
+COLUMNS = ["empl_id", "check_date", "contribution_amt", "verified", "recon_period"]
+ROWS = [
+    {"empl_id": "000001", "check_date": date(2022, 9, 15), "contribution_amt": 100.25, "verified": True, "recon_period": RECON_PERIOD},
+    {"empl_id": "000002", "check_date": None, "contribution_amt": 0.1, "verified": False, "recon_period": RECON_PERIOD},
+    {"empl_id": None, "check_date": date(2022, 9, 30), "contribution_amt": None, "verified": None, "recon_period": RECON_PERIOD},
+]
+
+
+@pytest.fixture
+def period(engine, monkeypatch):
+    model = IceCubeReconStrs
+    columns = model.__mapper__.columns
+    with engine.begin() as connection:
+        connection.execute(insert(model), [{columns[key].name: value for key, value in row.items()} for row in ROWS])
+    monkeypatch.setattr("app.routes.export.stream_export", partial(stream_export, chunk_size=2))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(delete(model).where(model.recon_period == RECON_PERIOD))
+
+
+def export(client, export_format: str):
+    response = client.get(URL, params={"format": export_format, "recon_period": RECON_PERIOD, "columns": ",".join(COLUMNS)}, headers=HEADERS)
+    assert response.status_code == 200
+    return response
+
+
+def test_csv_export_round_trips(client, period):
+    response = export(client, "csv")
+
+    assert response.headers["content-disposition"] == f'attachment; filename="ICE_CUBE_RECON_STRS_{RECON_PERIOD}.csv.gz"'
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode("utf-8"))))
+    assert rows[0] == [column for column in export_columns(IceCubeReconStrs) if column in COLUMNS]
+    expected = [["" if row[column] is None else str(row[column]) for column in rows[0]] for row in ROWS]
+    assert rows[1:] == expected
+
+
+def test_arrow_export_round_trips(client, period):
+    if "arrow" not in export_formats():
+        pytest.skip("pyarrow is not installed")
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(export(client, "arrow").content).read_all()
+
+    assert table.num_rows == len(ROWS)
+    assert table.schema.field("check_date").type == pa.date32()
+    assert table.to_pylist() == [{column: row[column] for column in table.column_names} for row in ROWS]
+
+
+def test_wrong_passphrase_is_rejected(client, period):
+    assert client.get(URL, params={"recon_period": RECON_PERIOD}, headers={"X-Passphrase": "wrong"}).status_code == 403
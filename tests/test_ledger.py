@@ -0,0 +1,71 @@
+"""
+An upload identical to the period's latest committed import is answered from the ledger.
+
+Imports are recorded through ledger_import and record_commit as the import
+paths do, without loading any rows.
+"""
+from contextlib import nullcontext
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.ledger import cached_import, content_digest, ledger_import, record_commit
+from app.models import IceCubeImportLedger
+
+RECON_PERIOD = "2022-07"
+
+
+def content_hash(data: bytes) -> str:
+    digest = content_digest("STRS", RECON_PERIOD)
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def run_import(engine, data: bytes, rows: int, fail: bool = False) -> int | None:
+    """Record an import of data in the ledger; a failing one stops before its commit."""
+    with pytest.raises(RuntimeError) if fail else nullcontext(), ledger_import("STRS", RECON_PERIOD, "strs.csv", len(data), content_hash(data)) as metrics:
+        if fail:
+            raise RuntimeError("import failed")
+        with engine.begin() as connection:
+            record_commit(connection, metrics)
+        metrics.summary = {"message": "Upload finished", "rows_inserted": rows}
+    return metrics.ledger_id
+
+
+@pytest.fixture
+def ledger(engine):
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(delete(IceCubeImportLedger).where(IceCubeImportLedger.recon_period == RECON_PERIOD))
+
+
+def test_identical_upload_returns_the_cached_summary(ledger):
+    first = run_import(ledger, b"rows v1", rows=3)
+
+    cached = cached_import("STRS", RECON_PERIOD, content_hash(b"rows v1"), "strs.csv", 7)
+
+    assert cached == {"message": "Upload finished", "rows_inserted": 3, "duplicate_of": first}
+    ledger_table = IceCubeImportLedger
+    with ledger.connect() as connection:
+        statuses = connection.execute(
+            select(ledger_table.status, ledger_table.duplicate_of)
+            .where(ledger_table.recon_period == RECON_PERIOD).order_by(ledger_table.id)
+        ).all()
+    assert statuses == [("succeeded", None), ("duplicate", first)]
+
+
+def test_later_import_supersedes_the_match(ledger):
+    run_import(ledger, b"rows v1", rows=3)
+    second = run_import(ledger, b"rows v2", rows=4)
+
+    assert cached_import("STRS", RECON_PERIOD, content_hash(b"rows v1")) is None
+    assert cached_import("STRS", RECON_PERIOD, content_hash(b"rows v2"))["duplicate_of"] == second
+    # Another plan or period never matches
+    assert cached_import("PERS", RECON_PERIOD, content_hash(b"rows v2")) is None
+
+
+def test_failed_import_keeps_the_match(ledger):
+    first = run_import(ledger, b"rows v1", rows=3)
+    run_import(ledger, b"rows v2", rows=4, fail=True)
+
+    assert cached_import("STRS", RECON_PERIOD, content_hash(b"rows v1"))["duplicate_of"] == first
@@ -0,0 +1,95 @@
+"""
+A diff import writes only what changed since the period's previous import.
+
+Two imports of one STRS period go through loader.PeriodDiff against the
+test database, inside a transaction that is rolled back afterwards.
+"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+from app.loader import PeriodDiff
+from app.models import IceCubeReconStrs
+from app.transform import normalize_frame
+
+RECON_PERIOD = "2023-01"
+
+
+def strs_frame(rows: list[tuple[str, float]]) -> pd.DataFrame:
+    """Normalized STRS rows from (employee id, contribution amount) pairs."""
+    raw = pd.DataFrame({
+        "Employee ID": [empl_id for empl_id, _ in rows],
+        "Employee Record": "0",
+        "Check Date": "2023-01-15",
+        "Earnings Code": "REG",
+        "Contribution Amount": [amount for _, amount in rows],
+    })
+    return normalize_frame(raw, datetime(2023, 1, 1), "STRS")
+
+
+def diff_import(connection, chunks: list[pd.DataFrame]) -> dict:
+    period_diff = PeriodDiff(connection, IceCubeReconStrs, RECON_PERIOD, batch_size=2)
+    for chunk in chunks:
+        period_diff.apply(chunk)
+    return period_diff.finish()
+
+
+def stored(connection) -> dict[str, tuple[int, float]]:
+    model = IceCubeReconStrs
+    result = connection.execute(
+        select(model.empl_id, model.id, model.contribution_amt).where(model.recon_period == RECON_PERIOD)
+    )
+    return {empl_id: (row_id, amount) for empl_id, row_id, amount in result}
+
+
+@pytest.fixture
+def connection(engine):
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
+
+
+def test_second_import_writes_only_the_changes(connection):
+    first = diff_import(connection, [strs_frame([("000001", 100.0), ("000002", 50.0), ("000003", 75.0)])])
+    ids = {empl_id: row_id for empl_id, (row_id, _) in stored(connection).items()}
+
+    # 000001 changed, 000002 removed, 000003 unchanged, 000004 added; split over two chunks
+    second = diff_import(connection, [
+        strs_frame([("000001", 120.0), ("000003", 75.0)]),
+        strs_frame([("000004", 10.0)]),
+    ])
+
+    assert first == {"rows_inserted": 3, "rows_updated": 0, "rows_deleted": 0, "rows_unchanged": 0}
+    assert second == {"rows_inserted": 1, "rows_updated": 1, "rows_deleted": 1, "rows_unchanged": 1}
+    rows = stored(connection)
+    assert {empl_id: amount for empl_id, (_, amount) in rows.items()} == {"000001": 120.0, "000003": 75.0, "000004": 10.0}
+    # Changed and unchanged rows keep their ids
+    assert rows["000001"][0] == ids["000001"] and rows["000003"][0] == ids["000003"]
+
+
+def test_identical_import_writes_nothing(connection):
+    rows = [("000001", 100.0), ("000002", 50.0)]
+    diff_import(connection, [strs_frame(rows)])
+    before = stored(connection)
+
+    counts = diff_import(connection, [strs_frame(rows)])
+
+    assert counts == {"rows_inserted": 0, "rows_updated": 0, "rows_deleted": 0, "rows_unchanged": 2}
+    assert stored(connection) == before
+
+
+def test_repeated_business_keys_pair_up_in_file_order(connection):
+    diff_import(connection, [strs_frame([("000001", 100.0), ("000001", 100.0)])])
+
+    # The second occurrence of the key changed, and a third one was added
+    counts = diff_import(connection, [strs_frame([("000001", 100.0)]), strs_frame([("000001", 90.0), ("000001", 5.0)])])
+
+    assert counts == {"rows_inserted": 1, "rows_updated": 1, "rows_deleted": 0, "rows_unchanged": 1}
+    model = IceCubeReconStrs
+    amounts = connection.execute(
+        select(model.contribution_amt).where(model.recon_period == RECON_PERIOD).order_by(model.id)
+    ).scalars().all()
+    assert amounts == [100.0, 90.0, 5.0]
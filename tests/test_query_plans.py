@@ -0,0 +1,114 @@
+"""
+Query-plan regression tests: the import, read, export, staging and reconciliation lookups use their indexes.
+
+Each lookup runs through the real app code against the SQLite test database
+built from app.models. Its statements are captured and passed through
+EXPLAIN QUERY PLAN, and every step that touches an Ice Cube table must
+search through the expected index instead of scanning the table.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, event
+
+from app.export import export_query
+from app.loader import PeriodDiff
+from app.models import RECON_MODELS, IceCubePayDataStaging, IceCubeReconException, IceCubeRollupEmployee, IceCubeRollupStaging
+from app.reconcile import ice_cube_totals, period_reconciled, peoplesoft_totals, recon_window
+from app.rollups import staging_rollup_query
+from app.routes.recon_read import page_query
+
+RECON_PERIOD = "2024-04"
+EMPL_IDS = {"000001", "000002", None}
+STAGING_INDEX = "IX_ICE_CUBE_PAY_DATA_STAGING_PAY_END_EMPL_DEDCD"
+
+
+def _checks() -> list[tuple]:
+    start_window, end_window = recon_window(RECON_PERIOD)
+    exceptions = IceCubeReconException.__table__
+    checks = []
+    for plan, model in RECON_MODELS.items():
+        index = f"IX_ICE_CUBE_RECON_{plan}_PERIOD_EMPL"
+        # Either recon_period index serves a lookup by period alone; SQLite has
+        # no statistics here to tell them apart
+        period_index = (index, f"IX_ICE_CUBE_RECON_{plan}_PERIOD_ID")
+        checks += [
+            (f"{plan} import delete", period_index,
+             lambda c, model=model: c.execute(delete(model.__table__).where(model.recon_period == RECON_PERIOD))),
+            (f"{plan} diff import load", period_index,
+             lambda c, model=model: PeriodDiff(c, model, RECON_PERIOD, 1000)),
+            (f"{plan} reconcile totals", index,
+             lambda c, plan=plan: ice_cube_totals(c, plan, RECON_PERIOD)),
+            (f"{plan} reconcile changed employees", index,
+             lambda c, plan=plan: ice_cube_totals(c, plan, RECON_PERIOD, EMPL_IDS)),
+            (f"{plan} read page", f"IX_ICE_CUBE_RECON_{plan}_PERIOD_ID",
+             lambda c, plan=plan: c.execute(page_query(plan, RECON_PERIOD, after=1000))),
+            (f"{plan} read employee page", period_index,
+             lambda c, plan=plan: c.execute(page_query(plan, RECON_PERIOD, "000001"))),
+            (f"{plan} export period", f"IX_ICE_CUBE_RECON_{plan}_PERIOD_ID",
+             lambda c, model=model: c.execute(export_query(model, RECON_PERIOD, RECON_PERIOD))),
+            (f"{plan} export employee", period_index,
+             lambda c, model=model: c.execute(export_query(model, RECON_PERIOD, RECON_PERIOD, "000001"))),
+        ]
+    checks += [
+        ("staging reconcile totals", STAGING_INDEX,
+         lambda c: peoplesoft_totals(c, "STRS", start_window, end_window)),
+        ("staging reconcile changed employees", STAGING_INDEX,
+         lambda c: peoplesoft_totals(c, "STRS", start_window, end_window, EMPL_IDS)),
+        ("staging export", STAGING_INDEX,
+         lambda c: c.execute(export_query(IceCubePayDataStaging, RECON_PERIOD, RECON_PERIOD))),
+        ("period reconciled", "IX_ICE_CUBE_RECON_WATERMARK_PERIOD_PLAN",
+         lambda c: period_reconciled(c, "STRS", RECON_PERIOD)),
+        ("exceptions replace", "IX_ICE_CUBE_RECON_EXCEPTIONS_PERIOD_PLAN",
+         lambda c: c.execute(delete(exceptions).where(
+             exceptions.c.RECON_PERIOD == RECON_PERIOD, exceptions.c.PENSION_PLAN == "STRS"))),
+        ("employee rollup replace", "IX_ICE_CUBE_ROLLUP_EMPLOYEE_PERIOD_PLAN_EMPL",
+         lambda c: c.execute(delete(IceCubeRollupEmployee).where(
+             IceCubeRollupEmployee.recon_period == RECON_PERIOD, IceCubeRollupEmployee.pension_plan == "STRS"))),
+        ("staging rollup replace", "IX_ICE_CUBE_ROLLUP_STAGING_PERIOD_EMPL",
+         lambda c: c.execute(delete(IceCubeRollupStaging).where(IceCubeRollupStaging.recon_period == RECON_PERIOD))),
+        ("staging rollup totals", STAGING_INDEX,
+         lambda c: c.execute(staging_rollup_query(RECON_PERIOD, date(2024, 4, 1), date(2024, 5, 1)))),
+    ]
+    return checks
+
+
+def explain(engine, run) -> list[str]:
+    """
+    Run a lookup in a rolled-back transaction and return the query plan of every statement it sent.
+
+    Args:
+        engine: SQLite engine with the app schema.
+        run: Callable taking a connection and issuing the lookup.
+
+    Returns:
+        list[str]: EXPLAIN QUERY PLAN detail lines, one block per statement.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    with engine.connect() as connection:
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            run(connection)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        plans = []
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+            plans.extend(row[-1] for row in rows)
+        connection.rollback()
+    return plans
+
+
+@pytest.mark.parametrize("label, index, run", _checks(), ids=[check[0] for check in _checks()])
+def test_lookup_uses_index(engine, label, index, run):
+    plans = explain(engine, run)
+
+    indexes = (index,) if isinstance(index, str) else index
+    table_steps = [detail for detail in plans if "ICE_CUBE_" in detail]
+    assert table_steps, f"{label} sent no statement touching an Ice Cube table"
+    missed = [detail for detail in table_steps if not any(name in detail for name in indexes)]
+    assert missed == [], f"{label} does not use {' or '.join(indexes)}: {plans}"
@@ -0,0 +1,77 @@
+"""
+The read API pages recon rows by key and answers unchanged pages with 304.
+
+Rows and their ledger entry are written to the test database as an import
+would, and the pages are read through the app with TestClient.
+"""
+import pytest
+from sqlalchemy import delete, insert
+
+from app.config import PASSPHRASE
+from app.ledger import ledger_import, record_commit
+from app.models import IceCubeImportLedger, IceCubeReconStrs
+
+RECON_PERIOD = "2022-08"
+URL = "/api/recon/STRS"
+HEADERS = {"X-Passphrase": PASSPHRASE}
+
+
+def import_period(engine, empl_ids: list[str]) -> None:
+    """Replace the period's rows and record the import in the ledger in one transaction."""
+    model = IceCubeReconStrs
+    with ledger_import("STRS", RECON_PERIOD, "strs.csv", 0) as metrics:
+        with engine.begin() as connection:
+            connection.execute(delete(model).where(model.recon_period == RECON_PERIOD))
+            connection.execute(insert(model), [{"RECON_PERIOD": RECON_PERIOD, "EMPL_ID": empl_id} for empl_id in empl_ids])
+            record_commit(connection, metrics)
+        metrics.summary = {"rows_inserted": len(empl_ids)}
+
+
+@pytest.fixture
+def period(engine):
+    import_period(engine, [f"{number:06d}" for number in range(1, 6)])
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(delete(IceCubeReconStrs).where(IceCubeReconStrs.recon_period == RECON_PERIOD))
+        connection.execute(delete(IceCubeImportLedger).where(IceCubeImportLedger.recon_period == RECON_PERIOD))
+
+
+def test_matching_etag_is_answered_304(client, period):
+    first = client.get(URL, params={"recon_period": RECON_PERIOD}, headers=HEADERS)
+
+    again = client.get(URL, params={"recon_period": RECON_PERIOD}, headers={**HEADERS, "If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_etag_changes_after_a_reimport(client, period):
+    first = client.get(URL, params={"recon_period": RECON_PERIOD}, headers=HEADERS)
+
+    import_period(period, ["000001", "000009"])
+    again = client.get(URL, params={"recon_period": RECON_PERIOD}, headers={**HEADERS, "If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 200
+    assert again.headers["ETag"] != first.headers["ETag"]
+    assert [row["empl_id"] for row in again.json()["rows"]] == ["000001", "000009"]
+
+
+def test_pages_continue_from_next_after(client, period):
+    pages, after = [], None
+    while True:
+        params = {"recon_period": RECON_PERIOD, "limit": 2, "fields": "empl_id"}
+        if after is not None:
+            params["after"] = after
+        page = client.get(URL, params=params, headers=HEADERS).json()
+        pages.append([row["empl_id"] for row in page["rows"]])
+        after = page["next_after"]
+        if after is None:
+            break
+
+    assert pages == [["000001", "000002"], ["000003", "000004"], ["000005"]]
+
+
+def test_wrong_passphrase_is_rejected(client, period):
+    assert client.get(URL, params={"recon_period": RECON_PERIOD}, headers={"X-Passphrase": "wrong"}).status_code == 403
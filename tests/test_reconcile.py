@@ -0,0 +1,114 @@
+"""
+Reconciliation writes one exception per employee whose two sides disagree.
+
+A small STRS period and its staged PeopleSoft deductions are written to the
+test database, reconciled in full and then for a few employees, and the
+returned counts are compared with the exception rows stored.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from app.models import IceCubePayDataStaging, IceCubeReconException, IceCubeReconStrs, IceCubeReconWatermark
+from app.reconcile import AMOUNT_MISMATCH, MISSING_IN_ICE_CUBE, MISSING_IN_PS, NO_EMPLID, reconcile_period
+
+RECON_PERIOD = "2022-06"
+PAY_END_DT = date(2022, 6, 15)
+
+# Employee -> (Ice Cube contribution, PeopleSoft deduction); None where a side has no rows
+PERIOD = {
+    "000001": (100.0, 100.0),
+    "000002": (100.0, 80.0),
+    "000003": (50.0, None),
+    "000004": (None, 60.0),
+    None: (10.0, None),
+}
+
+
+@pytest.fixture
+def period(engine):
+    tables = [
+        (IceCubeReconStrs, IceCubeReconStrs.recon_period == RECON_PERIOD),
+        (IceCubePayDataStaging, IceCubePayDataStaging.pay_end_dt == PAY_END_DT),
+        (IceCubeReconException, IceCubeReconException.recon_period == RECON_PERIOD),
+        (IceCubeReconWatermark, IceCubeReconWatermark.recon_period == RECON_PERIOD),
+    ]
+    with engine.begin() as connection:
+        for number, (empl_id, (ice_cube, peoplesoft)) in enumerate(PERIOD.items(), start=1):
+            if ice_cube is not None:
+                connection.execute(insert(IceCubeReconStrs).values(recon_period=RECON_PERIOD, empl_id=empl_id, contribution_amt=ice_cube))
+            if peoplesoft is not None:
+                connection.execute(insert(IceCubePayDataStaging).values(
+                    emplid=empl_id, pay_end_dt=PAY_END_DT, page_num=1, line_num=number, paygroup="MON",
+                    off_cycle="N", sepchk=0, dedcd="STRS", ded_class="B", ded_cur=peoplesoft,
+                ))
+    yield engine
+    with engine.begin() as connection:
+        for model, where in tables:
+            connection.execute(delete(model).where(where))
+
+
+def stored_exceptions(engine) -> dict:
+    exceptions = IceCubeReconException
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(exceptions.emplid, exceptions.reason_code, exceptions.difference)
+            .where(exceptions.recon_period == RECON_PERIOD, exceptions.pension_plan == "STRS")
+        ).all()
+    return {empl_id: (reason, difference) for empl_id, reason, difference in rows}
+
+
+def set_deduction(engine, empl_id: str, amount: float) -> None:
+    staging = IceCubePayDataStaging
+    with engine.begin() as connection:
+        connection.execute(update(staging).where(staging.emplid == empl_id, staging.pay_end_dt == PAY_END_DT).values(ded_cur=amount))
+
+
+def test_full_reconcile_writes_each_discrepancy(period):
+    result = reconcile_period("STRS", RECON_PERIOD)
+
+    assert result == {
+        "scope": "period",
+        "employees_compared": 4,
+        "exceptions": 4,
+        "by_reason": {NO_EMPLID: 1, MISSING_IN_PS: 1, MISSING_IN_ICE_CUBE: 1, AMOUNT_MISMATCH: 1},
+    }
+    assert stored_exceptions(period) == {
+        "000002": (AMOUNT_MISMATCH, 20.0),
+        "000003": (MISSING_IN_PS, 50.0),
+        "000004": (MISSING_IN_ICE_CUBE, -60.0),
+        None: (NO_EMPLID, 10.0),
+    }
+
+
+def test_scoped_reconcile_replaces_only_its_employees(period):
+    reconcile_period("STRS", RECON_PERIOD)
+    # 000001 now disagrees and 000002 agrees; 000004 changes but is not in scope
+    set_deduction(period, "000001", 90.0)
+    set_deduction(period, "000002", 100.0)
+    set_deduction(period, "000004", 70.0)
+
+    result = reconcile_period("STRS", RECON_PERIOD, {"000001", "000002"})
+
+    assert result == {
+        "scope": "employees",
+        "employees_compared": 2,
+        "exceptions": 1,
+        "by_reason": {NO_EMPLID: 0, MISSING_IN_PS: 0, MISSING_IN_ICE_CUBE: 0, AMOUNT_MISMATCH: 1},
+    }
+    assert stored_exceptions(period) == {
+        "000001": (AMOUNT_MISMATCH, 10.0),
+        "000003": (MISSING_IN_PS, 50.0),
+        "000004": (MISSING_IN_ICE_CUBE, -60.0),
+        None: (NO_EMPLID, 10.0),
+    }
+
+
+def test_scoped_reconcile_of_a_new_period_runs_in_full(period):
+    result = reconcile_period("STRS", RECON_PERIOD, {"000002"})
+
+    assert result["scope"] == "period"
+    assert set(stored_exceptions(period)) == {"000002", "000003", "000004", None}
+    # Once reconciled in full, the same call stays scoped
+    assert reconcile_period("STRS", RECON_PERIOD, {"000002"})["scope"] == "employees"
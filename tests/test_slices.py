@@ -0,0 +1,124 @@
+"""
+Sliced storage converts a plan once and swaps whole periods in behind its view.
+
+Each test builds its own SQLite database, since conversion is one-way and
+the shared test database must keep plain recon tables.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import IceCubeReconStrs
+from app.routes.recon_import import process_ice_cube_chunks
+from app.slices import ROOT_SLICE, create_load_slice, ensure_sliced, is_sliced, period_slices, swap_in
+
+MODEL = IceCubeReconStrs
+VIEW = MODEL.__tablename__
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'slices.db'}")
+    MODEL.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def rows(connection, table: str) -> list[tuple]:
+    return connection.execute(text(f'SELECT RECON_PERIOD, EMPL_ID FROM "{table}" ORDER BY RECON_PERIOD, EMPL_ID')).all()
+
+
+def load_period(connection, recon_period: str, empl_ids: list[str]) -> None:
+    load = create_load_slice(connection, MODEL, recon_period)
+    if empl_ids:
+        connection.execute(insert(load), [{"RECON_PERIOD": recon_period, "EMPL_ID": empl_id} for empl_id in empl_ids])
+    swap_in(connection, MODEL, recon_period, load)
+
+
+def test_ensure_sliced_moves_each_period_into_its_slice(engine):
+    with engine.begin() as connection:
+        connection.execute(insert(MODEL.__table__), [
+            {"RECON_PERIOD": "2024-03", "EMPL_ID": "000001"},
+            {"RECON_PERIOD": "2024-03", "EMPL_ID": "000002"},
+            {"RECON_PERIOD": "2024-04", "EMPL_ID": "000001"},
+            {"RECON_PERIOD": None, "EMPL_ID": "000009"},
+        ])
+    with engine.begin() as connection:
+        ensure_sliced(connection, MODEL)
+
+    with engine.connect() as connection:
+        assert is_sliced(connection, MODEL)
+        assert period_slices(connection, MODEL) == [f"{VIEW}__2024_03", f"{VIEW}__2024_04", f"{VIEW}__{ROOT_SLICE}"]
+        assert rows(connection, f"{VIEW}__2024_03") == [("2024-03", "000001"), ("2024-03", "000002")]
+        assert rows(connection, f"{VIEW}__2024_04") == [("2024-04", "000001")]
+        assert rows(connection, f"{VIEW}__{ROOT_SLICE}") == [(None, "000009")]
+        assert len(rows(connection, VIEW)) == 4
+
+    # A second call leaves a converted plan alone
+    with engine.begin() as connection:
+        ensure_sliced(connection, MODEL)
+    with engine.connect() as connection:
+        assert len(rows(connection, VIEW)) == 4
+
+
+def test_view_unions_the_periods_loaded(engine):
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", ["000001", "000002"])
+    with engine.begin() as connection:
+        load_period(connection, "2024-04", ["000003"])
+
+    with engine.connect() as connection:
+        assert rows(connection, VIEW) == [("2024-03", "000001"), ("2024-03", "000002"), ("2024-04", "000003")]
+        # Only the slices and the root are left; the load tables were renamed into place
+        assert sorted(name for name in inspect(connection).get_table_names() if name.startswith(VIEW)) == [
+            f"{VIEW}__2024_03", f"{VIEW}__2024_04", f"{VIEW}__{ROOT_SLICE}",
+        ]
+
+
+def test_swap_in_replaces_only_its_period(engine):
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", ["000001", "000002"])
+        load_period(connection, "2024-04", ["000003"])
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", ["000004"])
+
+    with engine.connect() as connection:
+        assert rows(connection, VIEW) == [("2024-03", "000004"), ("2024-04", "000003")]
+        period = MODEL.__table__.c.RECON_PERIOD
+        assert connection.execute(select(period).select_from(MODEL.__table__).distinct().order_by(period)).scalars().all() == [
+            "2024-03", "2024-04",
+        ]
+
+
+def test_swap_is_rolled_back_with_the_import(engine):
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", ["000001"])
+    with pytest.raises(RuntimeError), engine.begin() as connection:
+        load_period(connection, "2024-03", ["000002"])
+        raise RuntimeError("import failed")
+
+    with engine.connect() as connection:
+        assert rows(connection, VIEW) == [("2024-03", "000001")]
+
+
+def test_slice_rejects_rows_of_another_period(engine):
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", [])
+    with pytest.raises(IntegrityError), engine.begin() as connection:
+        connection.execute(text(f'INSERT INTO "{VIEW}__2024_03" (RECON_PERIOD, EMPL_ID) VALUES (\'2024-04\', \'000001\')'))
+
+
+def test_diff_import_is_rejected_in_sliced_storage(engine):
+    with engine.begin() as connection:
+        load_period(connection, "2024-03", ["000001"])
+
+    with Session(engine) as db, pytest.raises(HTTPException) as error:
+        process_ice_cube_chunks([], datetime(2024, 3, 1), "STRS", db, diff=True)
+
+    assert error.value.status_code == 400
+    with engine.connect() as connection:
+        assert rows(connection, VIEW) == [("2024-03", "000001")]
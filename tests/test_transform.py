@@ -0,0 +1,204 @@
+"""
+The vectorized transform must produce the same records as the original iterrows loop.
+
+The reference below is the per-row conversion the upload route used before
+transform.normalize_frame, with its repeated notna checks folded into small
+helpers and dicts returned instead of ORM objects. Both run on the fixture
+files, which include blank rows, NaN cells, mixed cell types and values that
+are not dates.
+"""
+import math
+import os
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from app.transform import frame_to_records, normalize_frame
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PARSED_DATE = datetime(2024, 4, 1)
+
+STRS_COLUMN_MAP = {
+    "EMPLOYEE ID": "empl_id",
+    "FIRST NAME": "first_name",
+    "LAST NAME": "last_name",
+    "CHECK DATE": "check_date",
+    "EMPLOYEE RECORD": "empl_rcd",
+    "MEMBER CODE": "member_code",
+    "EARNINGS CODE": "earnings_code",
+    "EARNINGS BEGIN": "earnings_begin",
+    "EARNINGS END": "earnings_end",
+    "EARNINGS RATE": "ern_rate",
+    "EARNINGS": "earnings",
+    "CONTRIBUTION RATE": "contribution_rate",
+    "CONTRIBUTION AMOUNT": "contribution_amt",
+    "ASSIGNMENT": "assignment",
+    "CONTRIBUTION CODE": "contribution_code",
+    "PAY CODE": "pay_code",
+    "SOURCE": "input_source",
+    "VERIFIED": "verified",
+    "STRS": "retirement_type",
+    "RECON PERIOD": "recon_period",
+    "TYPE": "assign_type",
+}
+
+PERS_COLUMN_MAP = {
+    "EMPLOYEE ID": "empl_id",
+    "FIRST NAME": "first_name",
+    "LAST NAME": "last_name",
+    "SERVICE PERIOD": "service_period",
+    "EMPLOYEE RECORD": "empl_rcd",
+    "EARNINGS CODE": "earnings_code",
+    "EARNINGS RATE": "ern_rate",
+    "EARNINGS": "earnings",
+    "CONTRIBUTION RATE": "contribution_rate",
+    "CONTRIBUTION AMOUNT": "contribution_amt",
+    "EARN CODE": "erncd",
+    "CONTRIBUTION CODE": "contribution_code",
+    "WORK SCHEDULE CODE": "work_schedule_code",
+    "SOURCE": "user_source",
+    "RECON PERIOD": "recon_period",
+}
+
+
+def clean_code(val, width=2):
+    if pd.isna(val):
+        return None
+    if isinstance(val, (int, float)):
+        return str(int(val))  # 0.0 to "0"
+    return str(val).strip().zfill(width)
+
+
+def to_date(val):
+    if pd.isna(val):
+        return None
+    if isinstance(val, (datetime, date)):
+        return val.date()
+    try:
+        return pd.to_datetime(val).date()
+    except Exception:
+        return None
+
+
+def _text(row_dict, key):
+    return str(row_dict.get(key)) if pd.notna(row_dict.get(key)) else None
+
+
+def _stripped(row_dict, key):
+    return str(row_dict.get(key)).strip() if pd.notna(row_dict.get(key)) else None
+
+
+def _zfilled(row_dict, key, width):
+    return str(row_dict.get(key)).zfill(width) if pd.notna(row_dict.get(key)) else None
+
+
+def _float(row_dict, key):
+    return float(row_dict.get(key)) if pd.notna(row_dict.get(key)) else None
+
+
+def _int(row_dict, key):
+    return int(row_dict.get(key)) if pd.notna(row_dict.get(key)) else None
+
+
+def baseline_records(df: pd.DataFrame, parsed_date: date, pension_plan: str) -> list[dict]:
+    """The original row-by-row conversion of process_ice_cube_upload."""
+    df = df.copy()
+    df.columns = [col.strip().upper() for col in df.columns]
+    recon_period = parsed_date.strftime("%Y-%m")
+    records = []
+    if pension_plan == "PERS":
+        df.rename(columns=PERS_COLUMN_MAP, inplace=True)
+        df["check_date"] = parsed_date
+        df["recon_period"] = recon_period
+        for _, row in df.iterrows():
+            row_dict = row.to_dict()
+            records.append({
+                "empl_id": _zfilled(row_dict, "empl_id", 6),
+                "first_name": _stripped(row_dict, "first_name"),
+                "last_name": _stripped(row_dict, "last_name"),
+                "service_period": to_date(row_dict.get("service_period")),
+                "empl_rcd": _zfilled(row_dict, "empl_rcd", 2),
+                "earnings_code": _text(row_dict, "earnings_code"),
+                "ern_rate": _float(row_dict, "ern_rate"),
+                "earnings": _float(row_dict, "earnings"),
+                "contribution_rate": _float(row_dict, "contribution_rate"),
+                "contribution_amt": _float(row_dict, "contribution_amt"),
+                "erncd": _text(row_dict, "erncd"),
+                "contribution_code": _int(row_dict, "contribution_code"),
+                "work_schedule_code": clean_code(row_dict.get("work_schedule_code")),
+                "user_source": _text(row_dict, "user_source"),
+                "retirement_code": _text(row_dict, "retirement_code"),
+                "check_date": to_date(row_dict.get("check_date")),
+                "recon_period": row_dict.get("recon_period", recon_period),
+            })
+    else:
+        df.rename(columns=STRS_COLUMN_MAP, inplace=True)
+        df["recon_period"] = recon_period
+        for _, row in df.iterrows():
+            row_dict = row.to_dict()
+            records.append({
+                "empl_id": _zfilled(row_dict, "empl_id", 6),
+                "first_name": _stripped(row_dict, "first_name"),
+                "last_name": _stripped(row_dict, "last_name"),
+                "check_date": to_date(row_dict.get("check_date")),
+                "empl_rcd": _zfilled(row_dict, "empl_rcd", 2),
+                "member_code": _int(row_dict, "member_code"),
+                "earnings_code": _text(row_dict, "earnings_code"),
+                "earnings_begin": to_date(row_dict.get("earnings_begin")),
+                "earnings_end": to_date(row_dict.get("earnings_end")),
+                "ern_rate": _float(row_dict, "ern_rate"),
+                "earnings": _float(row_dict, "earnings"),
+                "contribution_rate": _float(row_dict, "contribution_rate"),
+                "contribution_amt": _float(row_dict, "contribution_amt"),
+                "assignment": _int(row_dict, "assignment"),
+                "contribution_code": _int(row_dict, "contribution_code"),
+                "pay_code": _int(row_dict, "pay_code"),
+                "input_source": _text(row_dict, "input_source"),
+                "retirement_type": _text(row_dict, "retirement_type"),
+                "verified": bool(int(row_dict.get("verified"))) if pd.notna(row_dict.get("verified")) else None,
+                "recon_period": row_dict.get("recon_period", recon_period),
+                "assign_type": _text(row_dict, "assign_type"),
+            })
+    return records
+
+
+def read_fixture(name: str) -> pd.DataFrame:
+    path = os.path.join(FIXTURES, name)
+    return pd.read_excel(path) if name.endswith(".xlsx") else pd.read_csv(path)
+
+
+def _same(old, new) -> bool:
+    if isinstance(old, float) and isinstance(new, float) and math.isnan(old) and math.isnan(new):
+        return True
+    return old == new and type(old) is type(new)
+
+
+@pytest.mark.parametrize("pension_plan", ["PERS", "STRS"])
+@pytest.mark.parametrize("extension", ["csv", "xlsx"])
+def test_vectorized_records_match_row_loop(pension_plan, extension):
+    df = read_fixture(f"{pension_plan.lower()}.{extension}")
+
+    expected = baseline_records(df, PARSED_DATE, pension_plan)
+    records = frame_to_records(normalize_frame(df.copy(), PARSED_DATE, pension_plan))
+
+    assert len(records) == len(expected) == len(df)
+    mismatches = [
+        (position, column, old, record.get(column))
+        for position, (old_record, record) in enumerate(zip(expected, records))
+        for column, old in old_record.items()
+        if not _same(old, record.get(column))
+    ]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("pension_plan, column", [("PERS", "service_period"), ("STRS", "check_date")])
+def test_blank_and_bad_dates_become_none(pension_plan, column):
+    df = read_fixture(f"{pension_plan.lower()}.csv")
+
+    records = frame_to_records(normalize_frame(df, PARSED_DATE, pension_plan))
+
+    # Row 3 is all NaN, rows 5 and 6 hold '31-FEB-2024' and 'TBD', the last row is blank
+    for position in (3, 5, 6, len(records) - 1):
+        assert records[position][column] is None
+    assert all(record["recon_period"] == "2024-04" for record in records)
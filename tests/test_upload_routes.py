@@ -0,0 +1,58 @@
+"""
+The upload routes remove their spool file on every path that does not queue it.
+"""
+import os
+import tempfile
+
+import pytest
+
+from app.config import PASSPHRASE
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+ROUTES = [("/api/import-ice-cube/", "app.routes.recon_import"), ("/upload", "app.routes.ui_router")]
+
+
+@pytest.fixture
+def spooled(tmp_path, monkeypatch):
+    """List the spool files left behind; uploads are spooled under tmp_path."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return lambda: sorted(tmp_path.glob("ice-cube-*"))
+
+
+def upload(client, url: str, pension_plan: str = "STRS", **form):
+    with open(os.path.join(FIXTURES, "strs.csv"), "rb") as stream:
+        return client.post(url, files={"file": ("strs.csv", stream, "text/csv")}, data={
+            "month": "2024-04", "pension_plan": pension_plan, "passphrase": PASSPHRASE, **form,
+        })
+
+
+@pytest.mark.parametrize("url, module", ROUTES)
+def test_rejected_upload_is_removed(client, spooled, url, module):
+    response = upload(client, url, pension_plan="PERS")
+
+    assert response.status_code == 400
+    assert spooled() == []
+
+
+@pytest.mark.parametrize("url, module", ROUTES)
+def test_duplicate_upload_is_removed(client, spooled, monkeypatch, url, module):
+    monkeypatch.setattr(f"{module}.cached_import", lambda *args: {"duplicate_of": 1, "rows_inserted": 0})
+
+    response = upload(client, url)
+
+    assert response.status_code == 200
+    assert spooled() == []
+
+
+@pytest.mark.parametrize("url, module", ROUTES)
+def test_upload_is_removed_when_the_duplicate_check_fails(client, spooled, monkeypatch, url, module):
+    def unavailable(*args):
+        raise RuntimeError("ledger unavailable")
+    monkeypatch.setattr(f"{module}.cached_import", unavailable)
+
+    if module == "app.routes.ui_router":
+        assert upload(client, url).status_code == 400
+    else:
+        with pytest.raises(RuntimeError):
+            upload(client, url)
+    assert spooled() == []